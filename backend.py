@@ -1,11 +1,27 @@
-"""Simple synchronous wrapper around :func:`run_processing_job`."""
+"""Synchronous and background-job wrappers around :func:`run_processing_job`."""
 
+import itertools
 import tempfile
 import shutil
+import threading
+import time
+import uuid
+from collections import deque
 from queue import Queue
 import queue
 
-from processing_engine import run_processing_job
+from config import JOB_MAX_MESSAGES, JOB_TTL_SECONDS, MAX_FINISHED_JOBS
+
+
+def run_processing_job(job_info, progress_queue, cancel_event=None, pause_event=None):
+    """Run :func:`processing_engine.run_processing_job`, importing the engine on first use.
+
+    The engine pulls in the PDF, OCR and Excel libraries; deferring it keeps
+    importing this module (and starting the web server) fast.
+    """
+    from processing_engine import run_processing_job as run_job
+
+    return run_job(job_info, progress_queue, cancel_event, pause_event)
 
 
 def process_job(excel_path: str, pdf_paths: list[str], *, is_rerun: bool = False) -> dict:
@@ -43,3 +59,145 @@ def process_job(excel_path: str, pdf_paths: list[str], *, is_rerun: bool = False
 
     final["output_path"] = excel_path
     return final
+
+
+class Job:
+    """A processing job running on a background thread.
+
+    The job doubles as the ``progress_queue`` handed to :func:`run_processing_job`:
+    the last ``JOB_MAX_MESSAGES`` messages are kept in order so any number of
+    listeners can replay and follow them, and the fields used for status
+    polling (which include the latest progress) are kept up to date.
+    Messages are numbered from 0 across the whole job; ``message_count`` is
+    the number put so far.
+    """
+
+    def __init__(self, excel_path: str, pdf_paths: list[str], *, workdir: str | None = None, is_rerun: bool = False):
+        self.id = uuid.uuid4().hex
+        self.excel_path = excel_path
+        self.pdf_paths = list(pdf_paths)
+        self.workdir = workdir
+        self.is_rerun = is_rerun
+        self.state = "queued"
+        self.status = None
+        self.finished_at = None
+        self.current = 0
+        self.total = len(self.pdf_paths)
+        self.completed = 0
+        self.result_path = None
+        self.review_items = []
+        self.timings = None
+        self.skipped_files = []
+        self.messages = deque(maxlen=JOB_MAX_MESSAGES)
+        self.message_count = 0
+        self.cancel_event = threading.Event()
+        self.pause_event = threading.Event()
+        self._cond = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.state == "finished"
+
+    def put(self, msg: dict):
+        """Record a progress message (``Queue.put`` compatible)."""
+        with self._cond:
+            kind = msg.get("type")
+            if kind == "progress":
+                self.current = msg.get("current", self.current)
+                self.total = msg.get("total", self.total)
+            elif kind == "file_complete":
+                self.completed += 1
+            elif kind == "review_item":
+                self.review_items.append(msg.get("data"))
+            elif kind == "skipped_files":
+                self.skipped_files.extend(msg.get("files", []))
+            elif kind == "job_timings":
+                self.timings = {k: v for k, v in msg.items() if k != "type"}
+            elif kind == "result_path":
+                self.result_path = msg.get("path")
+            elif kind == "finish":
+                self.status = msg.get("status")
+                self.state = "finished"
+                self.finished_at = time.time()
+            self.messages.append(msg)
+            self.message_count += 1
+            self._cond.notify_all()
+
+    def messages_since(self, index: int, timeout: float | None = None) -> tuple:
+        """Return ``(start, messages)`` from message ``index`` on, waiting up to ``timeout`` seconds for new ones.
+
+        ``start`` is the number of the first message returned; it is past
+        ``index`` when the messages in between are no longer kept.
+        """
+        with self._cond:
+            if index >= self.message_count and not self.finished:
+                self._cond.wait(timeout)
+            first = self.message_count - len(self.messages)
+            start = max(index, first)
+            return start, list(itertools.islice(self.messages, start - first, None))
+
+    def to_dict(self) -> dict:
+        with self._cond:
+            return {
+                "id": self.id,
+                "state": self.state,
+                "status": self.status,
+                "current": self.current,
+                "total": self.total,
+                "completed": self.completed,
+                "review_items": list(self.review_items),
+                "result_ready": bool(self.result_path),
+                "timings": self.timings,
+                "skipped_files": list(self.skipped_files),
+            }
+
+    def run(self):
+        job_info = {"excel_path": self.excel_path, "input_path": self.pdf_paths, "is_rerun": self.is_rerun}
+        self.state = "running"
+        try:
+            run_processing_job(job_info, self, self.cancel_event, self.pause_event)
+        except Exception as e:
+            self.put({"type": "log", "tag": "error", "msg": f"Critical job error: {e}"})
+        finally:
+            if not self.finished:
+                self.put({"type": "finish", "status": "Error: job ended without finishing"})
+            if self.workdir:
+                shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+_jobs: dict[str, Job] = {}
+_jobs_lock = threading.Lock()
+
+
+def _evict_jobs():
+    """Forget finished jobs older than ``JOB_TTL_SECONDS`` and all but the newest ``MAX_FINISHED_JOBS``.
+
+    Callers hold ``_jobs_lock``.
+    """
+    now = time.time()
+    finished = sorted((job for job in _jobs.values() if job.finished_at is not None), key=lambda job: job.finished_at)
+    excess = len(finished) - MAX_FINISHED_JOBS
+    for i, job in enumerate(finished):
+        if i < excess or now - job.finished_at > JOB_TTL_SECONDS:
+            del _jobs[job.id]
+
+
+def start_job(excel_path: str, pdf_paths: list[str], *, workdir: str | None = None, is_rerun: bool = False) -> Job:
+    """Start the PDF→Excel pipeline on a background thread and return immediately.
+
+    ``workdir`` is removed once the job finishes; the report itself is written
+    to the output folder and exposed through :attr:`Job.result_path`.
+    """
+    job = Job(excel_path, pdf_paths, workdir=workdir, is_rerun=is_rerun)
+    with _jobs_lock:
+        _evict_jobs()
+        _jobs[job.id] = job
+    threading.Thread(target=job.run, name=f"job-{job.id}", daemon=True).start()
+    return job
+
+
+def get_job(job_id: str) -> Job | None:
+    """Return the job with ``job_id`` or ``None`` (also once it has been evicted)."""
+    with _jobs_lock:
+        _evict_jobs()
+        return _jobs.get(job_id)
@@ -1,7 +1,7 @@
 # debug_harvester.py
 import sys
 from pathlib import Path
-from ocr_utils import extract_text_from_pdf, TESSERACT_AVAILABLE
+from ocr_utils import extract_text_from_pdf, tesseract_available
 from data_harvesters import harvest_all_data
 from config import MODEL_PATTERNS
 import time
@@ -16,7 +16,7 @@ def test_model_extraction(pdf_path: Path):
 
     # 1. Check for Tesseract (from ocr_utils.py)
     print("\n[Step 1: OCR Check]")
-    if TESSERACT_AVAILABLE:
+    if tesseract_available():
         print("✅ Tesseract OCR is available.")
     else:
         print("⚠️ Tesseract OCR not found. Extraction will rely on embedded text only.")
@@ -0,0 +1,96 @@
+"""Benchmark: per-pattern ``findall`` vs the single-pass :class:`PatternScanner`.
+
+Builds a ~200 KB OCR-like text and times both approaches as the pattern count
+grows, checking on every run that they return the same matches.
+
+    python benchmarks/bench_pattern_scanner.py [--size 200000] [--repeat 5] [--json out.json]
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import custom_patterns  # noqa: E402
+from config import MODEL_PATTERNS, QA_NUMBER_PATTERNS  # noqa: E402
+from pattern_scanner import PatternScanner  # noqa: E402
+
+WORDS = (
+    "the printer machine paper feed tray service bulletin replace unit model manual page error "
+    "code firmware update procedure maintenance kit drum developer fuser toner cassette"
+).split()
+MODELS = ["TASKalfa 8000i", "ECOSYS P3055dn", "PF-740", "KM-2560", "FS-C8025DN", "M3655idn", "DV-1150", "QA-12345"]
+
+
+def build_text(size: int, seed: int = 1) -> str:
+    rng = random.Random(seed)
+    tokens, length = [], 0
+    while length < size:
+        token = rng.choice(MODELS) if rng.random() < 0.01 else rng.choice(WORDS)
+        tokens.append(token)
+        length += len(token) + 1
+    return " ".join(tokens)
+
+
+def build_patterns(count: int) -> list:
+    """Shipped patterns first, padded with synthetic accessory-code patterns."""
+    base = []
+    for pattern in custom_patterns.MODEL_PATTERNS + MODEL_PATTERNS + QA_NUMBER_PATTERNS:
+        if pattern not in base:
+            base.append(pattern)
+    synthetic = [rf"\b{chr(65 + i // 26)}{chr(65 + i % 26)}-\d+[A-Z]*\b" for i in range(count)]
+    return [re.compile(p, re.IGNORECASE) for p in (base + synthetic)[:count]]
+
+
+def best_of(repeat: int, func) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run(size: int, repeat: int, counts) -> list:
+    text = build_text(size)
+    rows = []
+    for count in counts:
+        patterns = build_patterns(count)
+        scanner = PatternScanner(patterns)
+        expected = sorted((m for p in patterns for m in p.findall(text)), key=repr)
+        assert sorted(scanner.findall(text), key=repr) == expected, "scanner output differs from findall"
+
+        per_pattern = best_of(repeat, lambda: [p.findall(text) for p in patterns])
+        single_pass = best_of(repeat, lambda: scanner.findall(text))
+        rows.append({
+            "patterns": count,
+            "text_bytes": len(text),
+            "per_pattern_s": per_pattern,
+            "scanner_s": single_pass,
+            "speedup": per_pattern / single_pass if single_pass else None,
+        })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--counts", type=int, nargs="+", default=[5, 10, 25, 50, 100, 200])
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    rows = run(args.size, args.repeat, args.counts)
+    print(f"{'patterns':>8} {'findall (ms)':>13} {'scanner (ms)':>13} {'speedup':>8}")
+    for row in rows:
+        print(f"{row['patterns']:>8} {row['per_pattern_s'] * 1000:>13.1f} {row['scanner_s'] * 1000:>13.1f} {row['speedup']:>7.1f}x")
+    if args.json:
+        Path(args.json).write_text(json.dumps(rows, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
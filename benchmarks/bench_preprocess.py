@@ -0,0 +1,105 @@
+"""Benchmark: the old RGB render + conversions vs :class:`PagePreprocessor`.
+
+Renders pages of a synthetic scanned PDF (see ``corpus.py``) at OCR resolution
+and times both preprocessing pipelines, together with the peak memory
+allocated per page (NumPy/OpenCV arrays, measured with ``tracemalloc``). Every
+run also checks that both pipelines produce the same image.
+
+    python benchmarks/bench_preprocess.py [--pages 10] [--dpi 300] [--threshold adaptive] [--json out.json]
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+sys.path.insert(0, str(BENCH_DIR))
+
+import cv2  # noqa: E402
+import fitz  # noqa: E402
+import numpy as np  # noqa: E402
+
+from corpus import build_pdf  # noqa: E402
+from ocr_utils import PagePreprocessor  # noqa: E402
+
+
+def legacy_preprocess(page, dpi: int, threshold: str):
+    """The pipeline ``extract_text_with_ocr`` used before: RGB -> BGR -> gray, new arrays per step."""
+    pix = page.get_pixmap(dpi=dpi)
+    img_data = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.h, pix.w, pix.n)
+    code = cv2.COLOR_RGBA2BGR if img_data.shape[2] == 4 else cv2.COLOR_RGB2BGR
+    gray = cv2.cvtColor(cv2.cvtColor(img_data, code), cv2.COLOR_BGR2GRAY)
+    if threshold == "otsu":
+        binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+    else:
+        binary = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+    return cv2.medianBlur(binary, 3)
+
+
+def measure(pages, func) -> dict:
+    """Time ``func`` over all pages and record the largest per-page peak allocation."""
+    peaks = []
+    start = time.perf_counter()
+    for page in pages:
+        tracemalloc.start()
+        func(page)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    elapsed = time.perf_counter() - start
+    return {"total_s": elapsed, "per_page_ms": elapsed / len(pages) * 1000, "peak_alloc_mb": max(peaks) / 2**20}
+
+
+def run(page_count: int, dpi: int, threshold: str) -> dict:
+    with tempfile.TemporaryDirectory(prefix="kyo_bench_pre_") as tmp:
+        pdf_path = Path(tmp) / "scanned.pdf"
+        build_pdf(pdf_path, "scanned", random.Random(7), pages=page_count)
+        with fitz.open(str(pdf_path)) as doc:
+            pages = list(doc)
+            preprocessor = PagePreprocessor(threshold)
+            for page in pages[:2]:
+                expected = legacy_preprocess(page, dpi, threshold)
+                assert np.array_equal(preprocessor.process(page, dpi), expected), "pipelines disagree"
+
+            # Warm up both paths so first-call costs are not counted.
+            legacy_preprocess(pages[0], dpi, threshold)
+            preprocessor.process(pages[0], dpi)
+
+            legacy = measure(pages, lambda page: legacy_preprocess(page, dpi, threshold))
+            grayscale = measure(pages, lambda page: preprocessor.process(page, dpi))
+    return {
+        "pages": page_count,
+        "dpi": dpi,
+        "threshold": threshold,
+        "legacy": legacy,
+        "grayscale": grayscale,
+        "speedup": legacy["total_s"] / grayscale["total_s"] if grayscale["total_s"] else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--threshold", choices=("adaptive", "otsu"), default="adaptive")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    report = run(args.pages, args.dpi, args.threshold)
+    print(f"{report['pages']} pages at {report['dpi']} DPI, {report['threshold']} threshold")
+    print(f"{'pipeline':<10} {'ms/page':>9} {'peak alloc (MB)':>16}")
+    for label in ("legacy", "grayscale"):
+        row = report[label]
+        print(f"{label:<10} {row['per_page_ms']:>9.1f} {row['peak_alloc_mb']:>16.1f}")
+    if report["speedup"]:
+        print(f"speedup: {report['speedup']:.2f}x")
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
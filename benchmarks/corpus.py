@@ -0,0 +1,139 @@
+"""Synthetic PDF corpus for the benchmark suite.
+
+Builds PDFs with PyMuPDF that look like our service bulletins:
+
+* ``text``      - born-digital bulletins with a text layer
+* ``scanned``   - image-only pages (rendered text placed as a picture), so OCR is needed
+* ``protected`` - AES-256 encrypted with a user password
+* ``manual``    - large multi-page manuals with the models on the first pages
+* ``mixed``     - text pages with scanned pages in between
+
+plus a kb_knowledge-style template whose Short description rows reference the files.
+
+    python benchmarks/corpus.py OUT_DIR [--count 5] [--manual-pages 80]
+"""
+import argparse
+import json
+import random
+from pathlib import Path
+
+import fitz  # PyMuPDF
+
+MODELS = [
+    "TASKalfa 8000i", "TASKalfa 3212i", "ECOSYS P3055dn", "ECOSYS MA2100cfx",
+    "FS-C8025DN", "KM-2560", "PF-740", "DF-780", "MK-726", "DV-1150",
+]
+FILLER = (
+    "Replace the unit according to the procedure below. Check the firmware version before "
+    "the update and confirm the paper feed operates normally after the maintenance kit is "
+    "installed. If the error code persists, contact the service center with the log file."
+).split()
+
+PAGE_RECT = fitz.paper_rect("letter")
+MARGIN = 54
+
+
+def _page_lines(rng: random.Random, page_num: int, models: list, qa_number: str, header: bool) -> list:
+    lines = []
+    if header:
+        lines += [f"Service Bulletin {qa_number}", "Author: Field Engineering", f"Models: {', '.join(models)}", ""]
+    for _ in range(38 if not header else 34):
+        lines.append(" ".join(rng.choice(FILLER) for _ in range(11)))
+    lines.append(f"- page {page_num + 1} -")
+    return lines
+
+
+def _add_text_page(doc, lines: list):
+    page = doc.new_page(width=PAGE_RECT.width, height=PAGE_RECT.height)
+    page.insert_text((MARGIN, MARGIN), "\n".join(lines), fontsize=9.5)
+    return page
+
+
+def _add_scanned_page(doc, lines: list, dpi: int = 150):
+    """Render a text page to an image and place only the image on a new page."""
+    scratch = fitz.open()
+    _add_text_page(scratch, lines)
+    pix = scratch[0].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+    scratch.close()
+    page = doc.new_page(width=PAGE_RECT.width, height=PAGE_RECT.height)
+    page.insert_image(page.rect, stream=pix.tobytes("png"))
+    return page
+
+
+def build_pdf(path: Path, kind: str, rng: random.Random, pages: int = 2) -> dict:
+    """Write one synthetic PDF of ``kind`` and return its ground truth."""
+    models = rng.sample(MODELS, 2)
+    qa_number = f"QA-{rng.randint(10000, 99999)}"
+    doc = fitz.open()
+    for page_num in range(pages):
+        lines = _page_lines(rng, page_num, models, qa_number, header=page_num == 0)
+        scanned = kind == "scanned" or (kind == "mixed" and page_num % 2 == 1)
+        if scanned:
+            _add_scanned_page(doc, lines)
+        else:
+            _add_text_page(doc, lines)
+
+    save_kwargs = {"garbage": 3, "deflate": True}
+    if kind == "protected":
+        save_kwargs.update(encryption=fitz.PDF_ENCRYPT_AES_256, owner_pw="owner", user_pw="secret")
+    doc.save(str(path), **save_kwargs)
+    doc.close()
+    return {"file": path.name, "kind": kind, "pages": pages, "models": models, "qa_number": qa_number}
+
+
+def build_template(path: Path, file_names: list, extra_rows: int = 0):
+    """Write a kb_knowledge-style template with one Short description row per file."""
+    import openpyxl
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Page 1"
+    ws.append(["Active", "Author", "Meta", "Short description", "Article body", "QA Numbers"])
+    for name in file_names:
+        ws.append([True, "", "", f"Processed: {name}", "", ""])
+    for i in range(extra_rows):
+        ws.append([True, "", "", f"Unrelated article {i}", "", ""])
+    wb.save(path)
+
+
+def build_corpus(out_dir, count: int = 5, manual_pages: int = 80, seed: int = 1234, template_rows: int = 0) -> dict:
+    """
+    Build the full corpus in ``out_dir`` and return a manifest.
+
+    The manifest (also written as ``manifest.json``) lists every PDF by kind with
+    its ground truth, plus the template path.
+    """
+    out_dir = Path(out_dir)
+    pdf_dir = out_dir / "pdfs"
+    pdf_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+
+    plan = [("text", 2)] * count + [("scanned", 2)] * count + [("protected", 1)] * max(1, count // 2)
+    plan += [("mixed", 6)] * max(1, count // 2) + [("manual", manual_pages)]
+
+    files = []
+    for i, (kind, pages) in enumerate(plan):
+        files.append(build_pdf(pdf_dir / f"{kind}_{i:03d}.pdf", kind, rng, pages=pages))
+
+    template = out_dir / "kb_knowledge_bench.xlsx"
+    build_template(template, [f["file"] for f in files], extra_rows=template_rows)
+
+    manifest = {"pdf_dir": str(pdf_dir), "template": str(template), "seed": seed, "files": files}
+    (out_dir / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the synthetic benchmark corpus.")
+    parser.add_argument("out_dir")
+    parser.add_argument("--count", type=int, default=5, help="Text and scanned PDFs to build")
+    parser.add_argument("--manual-pages", type=int, default=80)
+    parser.add_argument("--template-rows", type=int, default=0, help="Extra unrelated template rows")
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args(argv)
+    manifest = build_corpus(args.out_dir, args.count, args.manual_pages, args.seed, args.template_rows)
+    print(f"Wrote {len(manifest['files'])} PDFs to {manifest['pdf_dir']}")
+
+
+if __name__ == "__main__":
+    main()
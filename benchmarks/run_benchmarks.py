@@ -0,0 +1,286 @@
+"""End-to-end benchmark suite.
+
+Builds (or reuses) the synthetic corpus from ``corpus.py`` and times each stage
+of the pipeline separately and together:
+
+* ``process_single_pdf`` per document kind, cold and on a cache hit
+* ``harvest_all_data`` on extracted text
+* ``extract_text_with_ocr`` on scanned documents (skipped without Tesseract)
+* ``generate_excel`` in the standard and streaming modes, with both style modes,
+  and with the template patched in place
+* ``run_processing_job`` end to end
+
+Results are written as JSON so runs can be compared between versions:
+
+    python benchmarks/run_benchmarks.py [--corpus DIR] [--count 5] [--manual-pages 80]
+                                       [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+sys.path.insert(0, str(BENCH_DIR))
+
+from version import VERSION  # noqa: E402
+
+RESULTS_DIR = BENCH_DIR / "results"
+
+
+class _NullQueue:
+    """Progress queue that drops messages but keeps a count per type."""
+
+    def __init__(self):
+        self.counts = defaultdict(int)
+
+    def put(self, msg):
+        self.counts[msg.get("type")] += 1
+
+
+def _summary(timings: list, pages: int = 0) -> dict:
+    total = sum(timings)
+    summary = {
+        "runs": len(timings),
+        "total_s": total,
+        "mean_s": statistics.mean(timings) if timings else 0.0,
+        "min_s": min(timings) if timings else 0.0,
+        "max_s": max(timings) if timings else 0.0,
+    }
+    if pages:
+        summary["pages"] = pages
+        summary["pages_per_s"] = pages / total if total else None
+    return summary
+
+
+@contextlib.contextmanager
+def _quiet():
+    """Silence the harvesters' prints and INFO logging while timing."""
+    logging.disable(logging.INFO)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+def _isolate_engine(work_dir: Path):
+    """Point the engine's cache, review and output folders at ``work_dir``."""
+    import processing_engine
+    from result_cache import open_result_cache
+
+    for name in ("cache", "review", "output"):
+        (work_dir / name).mkdir(parents=True, exist_ok=True)
+    processing_engine.CACHE_DIR = work_dir / "cache"
+    processing_engine.PDF_TXT_DIR = work_dir / "review"
+    processing_engine.OUTPUT_DIR = work_dir / "output"
+    processing_engine._result_cache = open_result_cache(work_dir / "cache")
+    return processing_engine
+
+
+def bench_process_single_pdf(engine, files: list, pdf_dir: Path) -> tuple:
+    """Time cold runs and cache hits per document kind; returns (metrics, results)."""
+    cold, hits, pages = defaultdict(list), defaultdict(list), defaultdict(int)
+    results = []
+    for entry in files:
+        path = pdf_dir / entry["file"]
+        start = time.perf_counter()
+        results.append(engine.process_single_pdf(path, _NullQueue(), ignore_cache=True))
+        cold[entry["kind"]].append(time.perf_counter() - start)
+        pages[entry["kind"]] += entry["pages"]
+
+        start = time.perf_counter()
+        engine.process_single_pdf(path, _NullQueue())
+        hits[entry["kind"]].append(time.perf_counter() - start)
+
+    metrics = {}
+    for kind in cold:
+        metrics[f"process_single_pdf.{kind}.cold"] = _summary(cold[kind], pages[kind])
+        metrics[f"process_single_pdf.{kind}.cache_hit"] = _summary(hits[kind])
+    return metrics, results
+
+
+def bench_harvest(files: list, pdf_dir: Path, repeat: int) -> dict:
+    from data_harvesters import harvest_all_data
+    from ocr_utils import PDFDocumentSession
+
+    texts = []
+    for entry in files:
+        if entry["kind"] in ("text", "manual", "mixed"):
+            with PDFDocumentSession(pdf_dir / entry["file"]) as session:
+                texts.append((entry["file"], "".join(session.page_texts())))
+
+    timings = []
+    for _ in range(repeat):
+        for name, text in texts:
+            start = time.perf_counter()
+            harvest_all_data(text, name)
+            timings.append(time.perf_counter() - start)
+    summary = _summary(timings)
+    summary["text_bytes"] = sum(len(t) for _, t in texts)
+    return {"harvest_all_data": summary}
+
+
+def bench_ocr(files: list, pdf_dir: Path) -> dict:
+    import ocr_utils
+
+    if not ocr_utils.tesseract_available():
+        return {"extract_text_with_ocr": {"skipped": "Tesseract OCR is not available"}}
+
+    timings, pages = [], 0
+    for entry in files:
+        if entry["kind"] == "scanned":
+            start = time.perf_counter()
+            ocr_utils.extract_text_with_ocr(pdf_dir / entry["file"])
+            timings.append(time.perf_counter() - start)
+            pages += entry["pages"]
+    return {"extract_text_with_ocr": _summary(timings, pages)}
+
+
+def bench_generate_excel(results: list, template: Path, work_dir: Path, repeat: int) -> dict:
+    import excel_generator
+
+    if excel_generator.openpyxl is None:
+        return {"generate_excel": {"skipped": "openpyxl is not installed"}}
+
+    metrics = {}
+    for label, streaming, style_mode, patch in (
+        ("standard", False, "fills", False), ("streaming", True, "fills", False),
+        ("standard_conditional", False, "conditional", False), ("streaming_conditional", True, "conditional", False),
+        ("patched", False, "fills", True),
+    ):
+        timings = []
+        for i in range(repeat):
+            output = work_dir / "output" / f"bench_{label}_{i}.xlsx"
+            start = time.perf_counter()
+            excel_generator.generate_excel(results, output, template_path=template, streaming=streaming,
+                                           style_mode=style_mode, patch=patch)
+            timings.append(time.perf_counter() - start)
+        metrics[f"generate_excel.{label}"] = _summary(timings)
+    return metrics
+
+
+def bench_end_to_end(engine, pdf_dir: Path, template: Path, total_pages: int, parallel: bool) -> dict:
+    label = "parallel" if parallel else "sequential"
+    q = _NullQueue()
+    job = {"excel_path": str(template), "input_path": str(pdf_dir), "is_rerun": True, "parallel": parallel}
+    start = time.perf_counter()
+    engine.run_processing_job(job, q, threading.Event(), threading.Event())
+    elapsed = time.perf_counter() - start
+    summary = _summary([elapsed], total_pages)
+    summary["messages"] = dict(q.counts)
+    return {f"run_processing_job.{label}": summary}
+
+
+def environment() -> dict:
+    env = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+    for module in ("fitz", "openpyxl", "cv2", "pytesseract", "pikepdf"):
+        try:
+            mod = __import__(module)
+            env[module] = getattr(mod, "__version__", getattr(mod, "VersionBind", "unknown"))
+        except Exception:
+            env[module] = None
+    return env
+
+
+def compare(baseline: dict, current: dict) -> list:
+    """Return ``(metric, baseline_s, current_s, ratio)`` for metrics present in both runs."""
+    rows = []
+    for name, metric in current["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if not old or "mean_s" not in old or "mean_s" not in metric:
+            continue
+        ratio = metric["mean_s"] / old["mean_s"] if old["mean_s"] else None
+        rows.append((name, old["mean_s"], metric["mean_s"], ratio))
+    return rows
+
+
+def run(args) -> dict:
+    from corpus import build_corpus
+
+    work_dir = Path(tempfile.mkdtemp(prefix="kyo_bench_"))
+    if args.corpus and (Path(args.corpus) / "manifest.json").exists():
+        manifest = json.loads((Path(args.corpus) / "manifest.json").read_text(encoding="utf-8"))
+    else:
+        manifest = build_corpus(args.corpus or work_dir / "corpus", args.count, args.manual_pages)
+    pdf_dir = Path(manifest["pdf_dir"])
+    template = Path(manifest["template"])
+    files = manifest["files"]
+    total_pages = sum(f["pages"] for f in files)
+
+    engine = _isolate_engine(work_dir)
+    metrics = {}
+    try:
+        with _quiet():
+            stage_metrics, results = bench_process_single_pdf(engine, files, pdf_dir)
+            metrics.update(stage_metrics)
+            metrics.update(bench_harvest(files, pdf_dir, args.repeat))
+            metrics.update(bench_ocr(files, pdf_dir))
+            metrics.update(bench_generate_excel(results, template, work_dir, args.repeat))
+            metrics.update(bench_end_to_end(engine, pdf_dir, template, total_pages, parallel=False))
+            if args.parallel:
+                metrics.update(bench_end_to_end(engine, pdf_dir, template, total_pages, parallel=True))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "version": VERSION,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": environment(),
+        "corpus": {"files": len(files), "pages": total_pages, "seed": manifest.get("seed")},
+        "results": metrics,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the KYO QA benchmark suite.")
+    parser.add_argument("--corpus", help="Corpus directory (built there if it has no manifest.json)")
+    parser.add_argument("--count", type=int, default=5, help="Text and scanned PDFs in a new corpus")
+    parser.add_argument("--manual-pages", type=int, default=80)
+    parser.add_argument("--repeat", type=int, default=3, help="Repeats for the cheaper stages")
+    parser.add_argument("--parallel", action="store_true", help="Also time the parallel job mode")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/bench_<version>_<time>.json)")
+    parser.add_argument("--compare", help="Baseline results file to compare against")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    output = Path(args.output) if args.output else RESULTS_DIR / f"bench_{VERSION}_{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    print(f"{'metric':<45} {'mean (s)':>10} {'pages/s':>9}")
+    for name, metric in report["results"].items():
+        if "skipped" in metric:
+            print(f"{name:<45} {'skipped: ' + metric['skipped']}")
+            continue
+        pages_per_s = metric.get("pages_per_s")
+        pages_column = f"{pages_per_s:>9.1f}" if pages_per_s else ""
+        print(f"{name:<45} {metric['mean_s']:>10.4f} {pages_column}")
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        print(f"\nCompared with {args.compare} (version {baseline.get('version')}):")
+        for name, old, new, ratio in compare(baseline, report):
+            ratio_text = f"{ratio:.2f}x" if ratio is not None else "n/a"
+            print(f"{name:<45} {old:>10.4f} -> {new:>10.4f}  ({ratio_text})")
+
+
+if __name__ == "__main__":
+    main()
@@ -41,10 +41,47 @@ QA_NUMBER_PATTERNS = [r'\bQA[-_]?[\w-]+', r'\bSB[-_]?[\w-]+']
 UNWANTED_AUTHORS = ["Knowledge Import"]
 STANDARDIZATION_RULES = {"TASKalfa-": "TASKalfa ", "ECOSYS-": "ECOSYS "}
 
+# --- PERFORMANCE ---
+RESULT_CACHE_BACKEND = "sqlite"  # "sqlite": one WAL-mode database in CACHE_DIR; "json": one file per PDF (legacy)
+CACHE_PREFETCH_FILES = 500  # Cached results a sequential job reads per batched query, just ahead of processing them
+PARALLEL_PROCESSING = False  # Send PDFs to a process pool instead of one at a time
+MAX_WORKERS = None  # Worker processes for parallel mode; None uses all CPU cores
+OCR_PAGE_WORKERS = 1  # Worker processes for the pages of one scanned PDF; None uses all CPU cores
+OCR_MODE = "document"  # "document": OCR every page only when the whole file lacks text; "hybrid": OCR only thin pages
+MIN_TEXT_LENGTH_PER_PAGE = 50  # Hybrid mode OCRs pages whose own text layer has no more characters than this
+OCR_DPI = 300  # Render resolution for OCR when adaptive DPI is off
+OCR_ADAPTIVE_DPI = False  # Start OCR at a low DPI and re-render only pages Tesseract is unsure about
+OCR_DPI_STEPS = (150, 200, 300)  # Resolutions tried in order by adaptive DPI
+OCR_MIN_CONFIDENCE = 70  # Mean Tesseract word confidence (0-100) a page needs before escalation stops
+OCR_BATCH_SIZE = 0  # Off (one tesseract process per page); e.g. 16 hands that many pages to one process via an image list file
+OCR_THRESHOLD = "adaptive"  # Binarization before OCR: "adaptive" (Gaussian, local) or "otsu" (global)
+OCR_PAGE_CACHE = True  # Reuse the OCR text of identical page images (kept in the result cache)
+LAZY_EXTRACTION = False  # Read pages in order and stop once models, QA numbers and author are all found
+LAZY_MIN_PAGES = 3  # Pages always read in lazy mode before it may stop
+RESULT_MEMORY_BUDGET_MB = 256  # Approximate memory for a job's results; past it they spill to a temporary SQLite file
+RESULT_SPILL_DIR = None  # Folder for that spill file; None uses the system temp folder
+TEMPLATE_FILTER = False  # Process only PDFs named in the template's Short description column; list the rest as skipped
+EXCEL_STREAMING = False  # Write the output workbook row by row (read-only template + write-only workbook)
+EXCEL_WIDTH_SAMPLE_ROWS = 500  # Rows sampled to size columns when streaming or in the "conditional" style mode
+EXCEL_STYLE_MODE = "fills"  # "fills": fill every cell of a matched row; "conditional": one conditional-format rule per status
+EXCEL_PATCH_TEMPLATE = False  # Patch results into a copy of the template's XML instead of rewriting it with openpyxl
+
+# --- WEB JOBS ---
+JOB_TTL_SECONDS = 3600  # Finished background jobs (status and message history) are forgotten this long after they end
+MAX_FINISHED_JOBS = 50  # At most this many finished jobs are kept; the oldest are forgotten first
+UPLOAD_DIR_PREFIX = "qa_tool_"  # Per-request upload folders in the temp dir; their files get no persistent fingerprints
+JOB_MAX_MESSAGES = 1000  # Progress messages a job keeps for replay; event streams further behind resync from the job status
+
+# --- WATCH FOLDER ---
+WATCH_POLL_SECONDS = 5  # Longest wait between checks of the watched folder (polling interval without inotify)
+WATCH_SETTLE_SECONDS = 3  # A PDF must keep the same size and mtime this long before it is processed
+WATCH_FLUSH_SECONDS = 60  # Minimum time between rewrites of the rolling output workbook
+
 # --- EXCEL MAPPING ---
 META_COLUMN_NAME = "Meta"
 AUTHOR_COLUMN_NAME = "Author"
 QA_COLUMN_NAME = "QA Numbers"
 DESCRIPTION_COLUMN_NAME = "Short description"
 STATUS_COLUMN_NAME = "Processing Status"
+STATUS_COLUMN_ALIASES = ["Process Status"]  # Template headers used as the status column instead of adding STATUS_COLUMN_NAME
 QA_NUMBERS_COLUMN_NAME = "QA Numbers"
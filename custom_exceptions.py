@@ -38,4 +38,7 @@ class ConfigurationError(KYOQAToolError):
 
 class TesseractNotFoundError(KYOQAToolError):
     """Raised when Tesseract OCR is not available."""
-    pass
\ No newline at end of file
+    pass
+class XlsxPatchError(ExcelGenerationError):
+    """Raised when a template uses XLSX features the in-place patcher does not handle."""
+    pass
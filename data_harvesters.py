@@ -1,12 +1,15 @@
 # data_harvesters.py - Enhanced model detection with post-processing filter and forced pattern reloading
 # Updated: 2024-07-09 - FIX: Corrected regex syntax in the default pattern file creation.
+# Patterns are compiled once by PatternRegistry and only reloaded when custom_patterns.py changes.
 import re
+import hashlib
 import importlib
 import sys
 from pathlib import Path
 
 # Import the custom_patterns module here so we can reload it
 import custom_patterns
+from pattern_scanner import PatternScanner
 from config import (
     MODEL_PATTERNS as DEFAULT_MODEL_PATTERNS,
     QA_NUMBER_PATTERNS as DEFAULT_QA_PATTERNS,
@@ -67,28 +70,8 @@ QA_NUMBER_PATTERNS = [
 
     return True
 
-def get_combined_patterns(pattern_name: str, default_patterns: list) -> list:
-    """
-    Loads patterns from custom_patterns.py, forcing a reload to get the latest changes.
-    """
-    custom_patterns_list = []
-    
-    if not ensure_custom_patterns_file():
-        print(f"⚠️ Using only default patterns for {pattern_name}")
-        return default_patterns
-    
-    try:
-        # Force a reload of the custom_patterns module to ensure the latest
-        # patterns from the file are used, especially during re-runs.
-        importlib.reload(custom_patterns)
-        
-        custom_patterns_list = getattr(custom_patterns, pattern_name, [])
-        print(f"✅ Reloaded and loaded {len(custom_patterns_list)} custom {pattern_name}")
-            
-    except Exception as e:
-        print(f"❌ Unexpected error reloading custom patterns: {e}")
-    
-    # Combine patterns: custom patterns first, then default patterns not already in custom
+def _combine_patterns(custom_patterns_list: list, default_patterns: list) -> list:
+    """Custom patterns first, then default patterns not already in custom."""
     combined_patterns = []
     for pattern in custom_patterns_list:
         if pattern and pattern not in combined_patterns:
@@ -97,10 +80,88 @@ def get_combined_patterns(pattern_name: str, default_patterns: list) -> list:
     for pattern in default_patterns:
         if pattern and pattern not in combined_patterns:
             combined_patterns.append(pattern)
-    
-    print(f"📊 Pattern summary for {pattern_name}: {len(custom_patterns_list)} custom + {len(default_patterns)} default = {len(combined_patterns)} total")
     return combined_patterns
 
+class PatternRegistry:
+    """
+    Combined default and custom patterns, compiled once.
+
+    custom_patterns.py is only reloaded when its mtime or size changes and its
+    content hash differs from the last load, so harvesting a document no longer
+    reloads the module or recompiles patterns.
+    """
+
+    def __init__(self, patterns_path=None):
+        self.patterns_path = Path(patterns_path or custom_patterns.__file__)
+        self._stat_signature = None
+        self._content_hash = None
+        self._loaded = False
+        self._cache = {}
+
+    def _read_signature(self):
+        try:
+            stat = self.patterns_path.stat()
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def refresh(self, force: bool = False) -> bool:
+        """Reload custom patterns if the file changed. Returns ``True`` if a reload happened."""
+        signature = self._read_signature()
+        if not force and self._loaded and signature == self._stat_signature:
+            return False
+        self._stat_signature = signature
+
+        try:
+            content_hash = hashlib.sha256(self.patterns_path.read_bytes()).hexdigest()
+        except OSError:
+            content_hash = None
+        if not force and self._loaded and content_hash == self._content_hash:
+            return False  # Touched but not edited.
+
+        self._content_hash = content_hash
+        self._loaded = ensure_custom_patterns_file()
+        if not self._loaded:
+            print("⚠️ Using only default patterns until custom_patterns.py loads")
+        self._cache.clear()
+        return True
+
+    def _entry(self, pattern_name: str, default_patterns: list) -> tuple:
+        self.refresh()
+        key = (pattern_name, tuple(default_patterns))
+        if key not in self._cache:
+            custom_patterns_list = getattr(custom_patterns, pattern_name, []) if self._loaded else []
+            combined = _combine_patterns(custom_patterns_list, default_patterns)
+            compiled = []
+            for pattern in combined:
+                try:
+                    compiled.append(re.compile(pattern, re.IGNORECASE))
+                except re.error as e:
+                    print(f"❌ Invalid regex pattern '{pattern}': {e}")
+            print(f"📊 Pattern summary for {pattern_name}: {len(custom_patterns_list)} custom + {len(default_patterns)} default = {len(combined)} total")
+            self._cache[key] = (combined, compiled, PatternScanner(compiled))
+        return self._cache[key]
+
+    def combined(self, pattern_name: str, default_patterns: list) -> list:
+        """Return the combined pattern strings for ``pattern_name``."""
+        return list(self._entry(pattern_name, default_patterns)[0])
+
+    def compiled(self, pattern_name: str, default_patterns: list) -> list:
+        """Return the combined patterns for ``pattern_name`` compiled with ``re.IGNORECASE``."""
+        return self._entry(pattern_name, default_patterns)[1]
+
+    def scanner(self, pattern_name: str, default_patterns: list) -> PatternScanner:
+        """Return a single-pass scanner over the compiled patterns for ``pattern_name``."""
+        return self._entry(pattern_name, default_patterns)[2]
+
+pattern_registry = PatternRegistry()
+
+def get_combined_patterns(pattern_name: str, default_patterns: list) -> list:
+    """
+    Returns custom patterns followed by defaults, picking up edits to custom_patterns.py.
+    """
+    return pattern_registry.combined(pattern_name, default_patterns)
+
 def is_excluded(text: str) -> bool:
     """Checks if a string contains any of the unwanted exclusion patterns."""
     return any(p.lower() in text.lower() for p in EXCLUSION_PATTERNS)
@@ -115,25 +176,19 @@ def clean_model_string(model_str: str) -> str:
 def extract_models_with_fallback_patterns(text: str, filename: str) -> set:
     """Enhanced model extraction with fallback patterns for better coverage."""
     models = set()
-    patterns = get_combined_patterns("MODEL_PATTERNS", DEFAULT_MODEL_PATTERNS)
+    scanner = pattern_registry.scanner("MODEL_PATTERNS", DEFAULT_MODEL_PATTERNS)
     search_contents = [text, filename.replace("_", " ")]
     
     for content in search_contents:
         if not content:
             continue
-        for pattern in patterns:
-            try:
-                matches = re.findall(pattern, content, re.IGNORECASE)
-                for match in matches:
-                    if isinstance(match, tuple):
-                        match = match[0] if match else ""
-                    if match and not is_excluded(match):
-                        cleaned_match = clean_model_string(match)
-                        if cleaned_match:
-                            models.add(cleaned_match)
-            except re.error as e:
-                print(f"❌ Invalid regex pattern '{pattern}': {e}")
-                continue
+        for match in scanner.findall(content):
+            if isinstance(match, tuple):
+                match = match[0] if match else ""
+            if match and not is_excluded(match):
+                cleaned_match = clean_model_string(match)
+                if cleaned_match:
+                    models.add(cleaned_match)
     
     if not models:
         # This fallback logic is intentionally left out of the main fix for now
@@ -142,6 +197,14 @@ def extract_models_with_fallback_patterns(text: str, filename: str) -> set:
     
     return models
 
+def _model_rejection(model: str):
+    """Return why a stripped model match is not a valid model, or ``None`` if it is."""
+    if len(model) <= 2:
+        return "short model"
+    if not any(char.isdigit() for char in model) and '-' not in model:
+        return "model with no digits or hyphen"
+    return None
+
 def harvest_models(text: str, filename: str) -> list:
     """
     Enhanced model harvesting with a post-processing filter to remove invalid results.
@@ -154,15 +217,9 @@ def harvest_models(text: str, filename: str) -> list:
     for model in all_found_models:
         model_stripped = model.strip()
         
-        if len(model_stripped) <= 2:
-            print(f"   - Filtering out short model: '{model_stripped}'")
-            continue
-
-        has_digit = any(char.isdigit() for char in model_stripped)
-        has_hyphen = '-' in model_stripped
-
-        if not has_digit and not has_hyphen:
-            print(f"   - Filtering out model with no digits or hyphen: '{model_stripped}'")
+        rejection = _model_rejection(model_stripped)
+        if rejection:
+            print(f"   - Filtering out {rejection}: '{model_stripped}'")
             continue
         
         final_models.add(model_stripped)
@@ -181,26 +238,20 @@ def harvest_models(text: str, filename: str) -> list:
 def harvest_qa_numbers(text: str, filename: str) -> list:
     """Finds all unique QA numbers from text and filename."""
     qa_numbers = set()
-    patterns = get_combined_patterns("QA_NUMBER_PATTERNS", DEFAULT_QA_PATTERNS)
+    scanner = pattern_registry.scanner("QA_NUMBER_PATTERNS", DEFAULT_QA_PATTERNS)
     
-    if not patterns:
+    if not scanner.patterns:
         return []
     
     search_contents = [text, filename.replace("_", " ")]
     for content in search_contents:
         if not content:
             continue
-        for pattern in patterns:
-            try:
-                matches = re.findall(pattern, content, re.IGNORECASE)
-                for match in matches:
-                    if isinstance(match, tuple):
-                        match = match[0] if match else ""
-                    if match and not is_excluded(match):
-                        qa_numbers.add(match.strip())
-            except re.error as e:
-                print(f"❌ Invalid regex pattern '{pattern}': {e}")
-                continue
+        for match in scanner.findall(content):
+            if isinstance(match, tuple):
+                match = match[0] if match else ""
+            if match and not is_excluded(match):
+                qa_numbers.add(match.strip())
     
     return sorted(list(qa_numbers))
 
@@ -213,6 +264,24 @@ def harvest_author(text: str) -> str:
             return author
     return ""
 
+HARVEST_FIELDS = frozenset({"models", "qa_numbers", "author"})
+
+def found_fields(text: str, filename: str = "") -> set:
+    """
+    Return which of ``HARVEST_FIELDS`` ``text`` (and ``filename``) would yield.
+
+    A quiet check for deciding whether more text is needed; the values
+    themselves still come from :func:`harvest_all_data`.
+    """
+    found = set()
+    if any(_model_rejection(model.strip()) is None for model in extract_models_with_fallback_patterns(text, filename)):
+        found.add("models")
+    if harvest_qa_numbers(text, filename):
+        found.add("qa_numbers")
+    if harvest_author(text):
+        found.add("author")
+    return found
+
 def harvest_all_data(text: str, filename: str) -> dict:
     """Main harvester function that orchestrates the data extraction and filtering."""
     models_list = harvest_models(text, filename)
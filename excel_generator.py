@@ -2,31 +2,32 @@
 # This version correctly preserves all data from the original template.
 import logging
 logging.getLogger(__name__).setLevel(logging.DEBUG)
-
-try:
-    import pandas as pd
-except Exception:  # pragma: no cover - library optional in test env
-    pd = None
-try:
-    import openpyxl
-    from openpyxl.styles import Font, PatternFill, Alignment
-    from openpyxl.utils import get_column_letter
-except Exception:  # pragma: no cover - library optional in test env
-    openpyxl = None
-    class _Dummy:
-        def __init__(self, *a, **k):
-            pass
-
-    Font = PatternFill = Alignment = _Dummy
-
-    def get_column_letter(i):
-        return "A"
-import re
-from pathlib import Path
-import shutil
-
+
+try:
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.formatting.rule import FormulaRule
+    from openpyxl.styles import Font, PatternFill, Alignment, NamedStyle
+    from openpyxl.utils import get_column_letter
+except Exception:  # pragma: no cover - library optional in test env
+    openpyxl = None
+    class _Dummy:
+        def __init__(self, *a, **k):
+            pass
+
+    Font = PatternFill = Alignment = NamedStyle = WriteOnlyCell = FormulaRule = _Dummy
+
+    def get_column_letter(i):
+        return "A"
+import re
+import itertools
+from copy import copy
+from pathlib import Path
+import shutil
+
 from logging_utils import setup_logger, log_info, log_warning, log_error
-from custom_exceptions import ExcelGenerationError
+from custom_exceptions import ExcelGenerationError, XlsxPatchError
+from xlsx_patcher import SHEET_NS, active_sheet_part, has_conditional_formatting, patch_workbook, read_shared_strings
 import importlib, sys
 
 try:
@@ -53,211 +54,815 @@ except Exception:  # pragma: no cover - allow stubs in tests
     ):
         setattr(_cfg, n, v)
     sys.modules['config'] = _cfg
-
-logger = setup_logger("excel_generator")
-
-ILLEGAL_CHARACTERS_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
-
-# --- Style Definitions - Restored to match original flair ---
-HEADER_FONT = Font(bold=True, color="FFFFFF", name="Calibri", size=11)
-HEADER_FILL = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
-CELL_FONT = Font(name="Calibri", size=11)
-STATUS_FILLS = {
-    "Success": PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid"),
-    "Needs Review": PatternFill(
-        start_color="FFEB9C", end_color="FFEB9C", fill_type="solid"
-    ),
-    "Failed": PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid"),
-    "Protected": PatternFill(
-        start_color="D9D9D9", end_color="D9D9D9", fill_type="solid"
-    ),
-    "Corrupted": PatternFill(
-        start_color="FFC7CE", end_color="FFC7CE", fill_type="solid"
-    ),
-    "OCR Failed": PatternFill(
-        start_color="FFC7CE", end_color="FFC7CE", fill_type="solid"
-    ),
-    "No Text Found": PatternFill(
-        start_color="FFC7CE", end_color="FFC7CE", fill_type="solid"
-    ),
-}
-
-DEFAULT_TEMPLATE_PATH = Path("Sample_Set/kb_knowledge_Template.xlsx")
-
-def _load_default_headers(path=DEFAULT_TEMPLATE_PATH):
-    try:
-        import zipfile, xml.etree.ElementTree as ET
-        with zipfile.ZipFile(path) as z:
-            shared = ET.fromstring(z.read("xl/sharedStrings.xml"))
-            strings = [t.text for t in shared.iter('{http://schemas.openxmlformats.org/spreadsheetml/2006/main}t')]
-            sheet = ET.fromstring(z.read("xl/worksheets/sheet1.xml"))
-            ns = {'m': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
-            first_row = sheet.find('.//m:sheetData/m:row', ns)
-            headers = []
-            for c in first_row:
-                v = c.find('m:v', ns)
-                if v is None:
-                    headers.append("")
-                elif c.get('t') == 's':
-                    headers.append(strings[int(v.text)])
-                else:
-                    headers.append(v.text)
-            return headers
-    except Exception:
-        return []
-
-DEFAULT_TEMPLATE_HEADERS = _load_default_headers()
-
-# Basic headers used when generating a new template workbook
-DEFAULT_TEMPLATE_HEADERS = [
-    DESCRIPTION_COLUMN_NAME,
-    "Article body",
-    META_COLUMN_NAME,
-    AUTHOR_COLUMN_NAME,
-    QA_NUMBERS_COLUMN_NAME,
-    STATUS_COLUMN_NAME,
-]
-
-class ExcelWriter:
-    """Minimal Excel writer used for unit tests."""
-
-    def __init__(self, file_path: str, headers=None):
-        self.file_path = file_path
-        self.headers = headers or []
-        self.rows = []
-
-    def add_row(self, row: dict):
-        self.rows.append(row)
-
-    def save(self):
-        with open(self.file_path, "w", encoding="utf-8") as f:
-            if self.headers:
-                f.write(",".join(self.headers) + "\n")
-            for row in self.rows:
-                f.write(",".join(str(row.get(h, "")) for h in self.headers) + "\n")
-
-
-def sanitize_for_excel(value):
-    """Sanitizes a value to be safely written to an Excel cell."""
-    if isinstance(value, str):
-        return ILLEGAL_CHARACTERS_RE.sub("", value)
-    return value
-
-
-def apply_styles(worksheet):
-    """Applies all formatting and conditional coloring."""
-    log_info(logger, "Applying professional formatting and styles...")
-
-    header_row = worksheet[1]
-    for cell in header_row:
-        cell.font = HEADER_FONT
-        cell.fill = HEADER_FILL
-        cell.alignment = Alignment(horizontal="center", vertical="center")
-
-    for row in worksheet.iter_rows(min_row=2):
-        for cell in row:
-            cell.font = CELL_FONT
-            cell.alignment = Alignment(
-                wrap_text=True, vertical="top", horizontal="left"
-            )
-
-    for i, column in enumerate(worksheet.columns, 1):
-        max_length = 0
-        for cell in column:
-            if cell.value:
-                try:
-                    max_length = max(max_length, len(str(cell.value)))
-                except:
-                    pass
-        adjusted_width = max_length + 2
-        worksheet.column_dimensions[get_column_letter(i)].width = min(
-            adjusted_width, 70
-        )
-
-
-def generate_excel(all_results, output_path, template_path=Path("Sample_Set/kb_knowledge_Template.xlsx")):
-    """
-    Generates a formatted Excel file by cloning the template and merging new data.
-    """
-    try:
-        if pd is None or openpyxl is None:
-            raise ExcelGenerationError("Required libraries not installed")
-
-        if not all_results:
-            raise ExcelGenerationError(
-                "No data was processed to generate an Excel file."
-            )
-
-        new_data_df = pd.DataFrame(all_results).applymap(sanitize_for_excel)
-        cols = getattr(new_data_df, 'columns', [])
-        if 'qa_numbers' in cols and QA_NUMBERS_COLUMN_NAME not in cols:
-            new_data_df.rename(columns={'qa_numbers': QA_NUMBERS_COLUMN_NAME}, inplace=True)
-        new_data_df['merge_key'] = new_data_df['file_name'].apply(lambda x: Path(x).stem)
-        new_data_df.set_index('merge_key', inplace=True)
-
-
-        if not template_path.exists():
-            raise ExcelGenerationError(f"Template file not found at: {template_path}")
-
-        shutil.copy(template_path, output_path)
-
-        workbook = openpyxl.load_workbook(output_path)
-        worksheet = workbook.active
-        header = [cell.value for cell in worksheet[1]]
-        desc_col_idx = header.index(DESCRIPTION_COLUMN_NAME) if DESCRIPTION_COLUMN_NAME in header else -1
-        meta_col_idx = header.index(META_COLUMN_NAME) if META_COLUMN_NAME in header else -1
-        author_col_idx = header.index(AUTHOR_COLUMN_NAME) if AUTHOR_COLUMN_NAME in header else -1
-        qa_col_idx = header.index(QA_NUMBERS_COLUMN_NAME) if QA_NUMBERS_COLUMN_NAME in header else -1
-
-        if desc_col_idx == -1:
-            raise ExcelGenerationError(
-                f"Template missing required column: '{DESCRIPTION_COLUMN_NAME}'"
-            )
-
-        for row_num, row_cells in enumerate(worksheet.iter_rows(min_row=2), start=2):
-            desc_val = row_cells[desc_col_idx].value
-            if not desc_val:
-                continue
-
-            # Allow template short descriptions prefixed with "Processed:" (case-insensitive) to
-            # merge correctly with new data indexed by file name.
-            row_text = re.sub(r"^Processed:\s*", "", str(desc_val), flags=re.IGNORECASE)
-            row_key = Path(row_text).stem
-            if row_key in new_data_df.index:
-                new_row_data = new_data_df.loc[row_key]
-
-                if meta_col_idx != -1 and META_COLUMN_NAME in new_row_data:
-                    worksheet.cell(row=row_num, column=meta_col_idx + 1).value = new_row_data[META_COLUMN_NAME]
-
-                if qa_col_idx != -1 and "qa_numbers" in new_row_data and new_row_data["qa_numbers"]:
-                    worksheet.cell(row=row_num, column=qa_col_idx + 1).value = new_row_data["qa_numbers"]
-                elif meta_col_idx != -1 and "qa_numbers" in new_row_data and new_row_data["qa_numbers"]:
-                    existing = worksheet.cell(row=row_num, column=meta_col_idx + 1).value or ""
-                    sep = " | " if existing else ""
-                    worksheet.cell(row=row_num, column=meta_col_idx + 1).value = f"{existing}{sep}{new_row_data['qa_numbers']}"
-
-                if author_col_idx != -1 and AUTHOR_COLUMN_NAME in new_row_data:
-                    worksheet.cell(row=row_num, column=author_col_idx + 1).value = (
-                        new_row_data[AUTHOR_COLUMN_NAME]
-                    )
-
-                if fill := STATUS_FILLS.get(new_row_data["processing_status"]):
-                    for cell in row_cells:
-                        cell.fill = fill
-            else:
-                log_warning(
-                    logger,
-                    f"Skipped template row {row_num} ({desc_val}) - no processed data found",
-                )
-
-        apply_styles(worksheet)
-        workbook.save(output_path)
-
-        log_info(
-            logger, f"Successfully created cloned and updated Excel file: {output_path}"
-        )
-        return str(output_path)
-
+
+_config = importlib.import_module('config')
+EXCEL_STREAMING = getattr(_config, 'EXCEL_STREAMING', False)
+EXCEL_WIDTH_SAMPLE_ROWS = getattr(_config, 'EXCEL_WIDTH_SAMPLE_ROWS', 500)
+EXCEL_STYLE_MODE = getattr(_config, 'EXCEL_STYLE_MODE', 'fills')
+STATUS_COLUMN_ALIASES = getattr(_config, 'STATUS_COLUMN_ALIASES', [])
+EXCEL_STYLE_MODES = ("fills", "conditional")
+EXCEL_PATCH_TEMPLATE = getattr(_config, 'EXCEL_PATCH_TEMPLATE', False)
+# Template rows whose results are looked up together when streaming.
+LOOKUP_CHUNK_ROWS = 1000
+
+logger = setup_logger("excel_generator")
+
+ILLEGAL_CHARACTERS_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+# --- Style Definitions - Restored to match original flair ---
+HEADER_FONT = Font(bold=True, color="FFFFFF", name="Calibri", size=11)
+HEADER_FILL = PatternFill(start_color="4F81BD", end_color="4F81BD", fill_type="solid")
+CELL_FONT = Font(name="Calibri", size=11)
+STATUS_FILLS = {
+    "Success": PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid"),
+    "Needs Review": PatternFill(
+        start_color="FFEB9C", end_color="FFEB9C", fill_type="solid"
+    ),
+    "Failed": PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid"),
+    "Protected": PatternFill(
+        start_color="D9D9D9", end_color="D9D9D9", fill_type="solid"
+    ),
+    "Corrupted": PatternFill(
+        start_color="FFC7CE", end_color="FFC7CE", fill_type="solid"
+    ),
+    "OCR Failed": PatternFill(
+        start_color="FFC7CE", end_color="FFC7CE", fill_type="solid"
+    ),
+    "No Text Found": PatternFill(
+        start_color="FFC7CE", end_color="FFC7CE", fill_type="solid"
+    ),
+}
+
+DEFAULT_TEMPLATE_PATH = Path("Sample_Set/kb_knowledge_Template.xlsx")
+
+def _load_default_headers(path=DEFAULT_TEMPLATE_PATH):
+    try:
+        import zipfile, xml.etree.ElementTree as ET
+        with zipfile.ZipFile(path) as z:
+            shared = ET.fromstring(z.read("xl/sharedStrings.xml"))
+            strings = [t.text for t in shared.iter('{http://schemas.openxmlformats.org/spreadsheetml/2006/main}t')]
+            sheet = ET.fromstring(z.read("xl/worksheets/sheet1.xml"))
+            ns = {'m': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+            first_row = sheet.find('.//m:sheetData/m:row', ns)
+            headers = []
+            for c in first_row:
+                v = c.find('m:v', ns)
+                if v is None:
+                    headers.append("")
+                elif c.get('t') == 's':
+                    headers.append(strings[int(v.text)])
+                else:
+                    headers.append(v.text)
+            return headers
+    except Exception:
+        return []
+
+DEFAULT_TEMPLATE_HEADERS = _load_default_headers()
+
+# Basic headers used when generating a new template workbook
+DEFAULT_TEMPLATE_HEADERS = [
+    DESCRIPTION_COLUMN_NAME,
+    "Article body",
+    META_COLUMN_NAME,
+    AUTHOR_COLUMN_NAME,
+    QA_NUMBERS_COLUMN_NAME,
+    STATUS_COLUMN_NAME,
+]
+
+class ExcelWriter:
+    """Minimal Excel writer used for unit tests."""
+
+    def __init__(self, file_path: str, headers=None):
+        self.file_path = file_path
+        self.headers = headers or []
+        self.rows = []
+
+    def add_row(self, row: dict):
+        self.rows.append(row)
+
+    def save(self):
+        with open(self.file_path, "w", encoding="utf-8") as f:
+            if self.headers:
+                f.write(",".join(self.headers) + "\n")
+            for row in self.rows:
+                f.write(",".join(str(row.get(h, "")) for h in self.headers) + "\n")
+
+
+def sanitize_for_excel(value):
+    """Sanitizes a value to be safely written to an Excel cell."""
+    if isinstance(value, str):
+        return ILLEGAL_CHARACTERS_RE.sub("", value)
+    return value
+
+
+def apply_styles(worksheet):
+    """Applies all formatting and conditional coloring."""
+    log_info(logger, "Applying professional formatting and styles...")
+
+    header_row = worksheet[1]
+    for cell in header_row:
+        cell.font = HEADER_FONT
+        cell.fill = HEADER_FILL
+        cell.alignment = Alignment(horizontal="center", vertical="center")
+
+    for row in worksheet.iter_rows(min_row=2):
+        for cell in row:
+            cell.font = CELL_FONT
+            cell.alignment = Alignment(
+                wrap_text=True, vertical="top", horizontal="left"
+            )
+
+    for i, column in enumerate(worksheet.columns, 1):
+        max_length = 0
+        for cell in column:
+            if cell.value:
+                try:
+                    max_length = max(max_length, len(str(cell.value)))
+                except:
+                    pass
+        adjusted_width = max_length + 2
+        worksheet.column_dimensions[get_column_letter(i)].width = min(
+            adjusted_width, 70
+        )
+
+
+# Template short descriptions may be prefixed with "Processed:" (any case).
+PROCESSED_PREFIX_RE = re.compile(r"^\s*Processed:\s*", re.IGNORECASE)
+
+
+def _template_row_key(desc_val) -> str:
+    """Return the merge key (file stem) for a template row's short description."""
+    return Path(PROCESSED_PREFIX_RE.sub("", str(desc_val)).strip()).stem
+
+
+def _result_key(file_name) -> str:
+    """Return the merge key (file stem) for a result's file name."""
+    return Path(str(file_name).strip()).stem
+
+
+HEADER_STYLE_NAME = "kyo_header"
+CELL_STYLE_NAME = "kyo_cell"
+
+
+def _status_style_name(status: str) -> str:
+    return f"{CELL_STYLE_NAME}_{status.lower().replace(' ', '_')}"
+
+
+def _register_named_styles(workbook):
+    """Add the shared header, cell and per-status named styles to ``workbook``."""
+    if HEADER_STYLE_NAME in workbook.named_styles:
+        return  # A template saved from an earlier output already has them.
+    header_style = NamedStyle(name=HEADER_STYLE_NAME)
+    header_style.font = HEADER_FONT
+    header_style.fill = HEADER_FILL
+    header_style.alignment = Alignment(horizontal="center", vertical="center")
+    workbook.add_named_style(header_style)
+
+    cell_alignment = Alignment(wrap_text=True, vertical="top", horizontal="left")
+    cell_style = NamedStyle(name=CELL_STYLE_NAME)
+    cell_style.font = CELL_FONT
+    cell_style.alignment = cell_alignment
+    workbook.add_named_style(cell_style)
+
+    for status, fill in STATUS_FILLS.items():
+        status_style = NamedStyle(name=_status_style_name(status))
+        status_style.font = CELL_FONT
+        status_style.alignment = cell_alignment
+        status_style.fill = fill
+        workbook.add_named_style(status_style)
+
+
+def _apply_named_styles(workbook, worksheet):
+    """
+    Style a loaded sheet through the shared named styles and sampled column widths.
+
+    The cheaper counterpart of :func:`apply_styles`: every cell points at one
+    of two registered styles instead of getting its own font and alignment,
+    and widths come from the first ``EXCEL_WIDTH_SAMPLE_ROWS`` rows. Like
+    :func:`apply_styles` only the font and alignment (and the header fill)
+    change; a styled cell keeps its border, fill and number format.
+    """
+    _register_named_styles(workbook)
+    for row_num, row in enumerate(worksheet.iter_rows(), start=1):
+        style_name = HEADER_STYLE_NAME if row_num == 1 else CELL_STYLE_NAME
+        for cell in row:
+            if not cell.has_style:
+                cell.style = style_name
+                continue
+            # The named style brings its own border, fill and number format; put the template's back.
+            border, fill, number_format = copy(cell.border), copy(cell.fill), cell.number_format
+            cell.style = style_name
+            cell.border = border
+            if row_num > 1:
+                cell.fill = fill
+            cell.number_format = number_format
+    # iter_rows creates missing cells, so stay within the rows that exist.
+    rows = worksheet.iter_rows(max_row=min(worksheet.max_row, EXCEL_WIDTH_SAMPLE_ROWS + 1), values_only=True)
+    for i, width in enumerate(_sample_column_widths(rows, EXCEL_WIDTH_SAMPLE_ROWS + 1), 1):
+        worksheet.column_dimensions[get_column_letter(i)].width = width
+
+
+def _add_status_rules(worksheet, status_col_idx: int, columns: int, last_row: int):
+    """
+    Colour data rows by status with one conditional-formatting rule per status.
+
+    Each rule compares the row's ``status_col_idx`` cell with a status name,
+    so the fills cost a handful of rules instead of one style per cell. Rules
+    the sheet already has over the range (a previous output used as the
+    template) are not added again.
+    """
+    if last_row < 2:
+        return
+    status_col = get_column_letter(status_col_idx + 1)
+    cell_range = f"A2:{get_column_letter(columns)}{last_row}"
+    existing = {
+        rule.formula[0]
+        for formatting in worksheet.conditional_formatting
+        if cell_range in formatting.sqref
+        for rule in formatting.rules
+        if rule.formula
+    }
+    for status, fill in STATUS_FILLS.items():
+        if f'${status_col}2="{status}"' in existing:
+            continue
+        worksheet.conditional_formatting.add(
+            cell_range, FormulaRule(formula=[f'${status_col}2="{status}"'], fill=fill, stopIfTrue=True)
+        )
+
+
+def _find_status_column(header: list) -> int:
+    """Return the index of the ``STATUS_COLUMN_NAME`` column, or of one of ``STATUS_COLUMN_ALIASES``; -1 if none."""
+    for name in (STATUS_COLUMN_NAME, *STATUS_COLUMN_ALIASES):
+        if name in header:
+            return header.index(name)
+    return -1
+
+
+def _status_column(header: list) -> int:
+    """Return the index of the status column, appending ``STATUS_COLUMN_NAME`` to ``header`` if the template has none."""
+    status_col_idx = _find_status_column(header)
+    if status_col_idx < 0:
+        header.append(STATUS_COLUMN_NAME)
+        status_col_idx = len(header) - 1
+    return status_col_idx
+
+
+def _sample_column_widths(rows, sample_rows: int) -> list:
+    """Estimate column widths from the first ``sample_rows`` rows, capped like :func:`apply_styles`."""
+    widths = []
+    for row_num, row in enumerate(rows):
+        if row_num >= sample_rows:
+            break
+        for i, value in enumerate(row):
+            if i >= len(widths):
+                widths.append(0)
+            if value:
+                widths[i] = max(widths[i], len(str(value)))
+    return [min(width + 2, 70) for width in widths]
+
+
+class ResultIndex:
+    """
+    Results indexed by merge key, built once per workbook.
+
+    When several results share a key (the same file name in two folders, or a
+    file listed twice) the last one in ``results`` wins, the same order a
+    :class:`result_store.ResultSpillStore` uses (highest index wins).
+    """
+
+    def __init__(self, results):
+        self._by_key = {}
+        self._counts = {}
+        for result in results:
+            key = _result_key(result["file_name"])
+            self._by_key[key] = result
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def get_many(self, keys) -> dict:
+        return {key: self._by_key[key] for key in keys if key in self._by_key}
+
+    def key_counts(self) -> dict:
+        """Return ``{merge_key: number of results}`` in first-seen order."""
+        return dict(self._counts)
+
+
+class MergeReport:
+    """What a template merge matched and what it left over."""
+
+    def __init__(self):
+        self.matched_rows = 0
+        self.unmatched_rows = []  # (row number, short description) without a result
+        self.unmatched_results = []  # merge keys no template row refers to
+        self.duplicate_keys = {}  # merge key -> results sharing it; the last one was used
+
+    def log(self):
+        log_info(
+            logger,
+            f"Merged {self.matched_rows} template rows; "
+            f"{len(self.unmatched_rows)} rows had no processed data",
+        )
+        if self.unmatched_results:
+            shown = ", ".join(self.unmatched_results[:10])
+            more = f" and {len(self.unmatched_results) - 10} more" if len(self.unmatched_results) > 10 else ""
+            log_warning(logger, f"{len(self.unmatched_results)} results matched no template row: {shown}{more}")
+        for key, count in self.duplicate_keys.items():
+            log_warning(logger, f"{count} results share the name '{key}'; the last one was used")
+
+
+class TemplateMerger:
+    """
+    Matches template rows to results and works out the cell updates.
+
+    ``all_results`` is a list of result dicts or anything with ``get_many`` and
+    ``key_counts`` (a :class:`result_store.ResultSpillStore`). Rows are looked
+    up ``LOOKUP_CHUNK_ROWS`` at a time, and only the fields that are written
+    are sanitized. The ``report`` is filled in while rows are merged and
+    completed by :meth:`finish`.
+    """
+
+    def __init__(self, all_results, header):
+        self._source = all_results if hasattr(all_results, "get_many") else ResultIndex(all_results)
+        if DESCRIPTION_COLUMN_NAME not in header:
+            raise ExcelGenerationError(
+                f"Template missing required column: '{DESCRIPTION_COLUMN_NAME}'"
+            )
+        self.width = len(header)
+        self.desc_col_idx = header.index(DESCRIPTION_COLUMN_NAME)
+        self.meta_col_idx = header.index(META_COLUMN_NAME) if META_COLUMN_NAME in header else -1
+        self.author_col_idx = header.index(AUTHOR_COLUMN_NAME) if AUTHOR_COLUMN_NAME in header else -1
+        self.qa_col_idx = header.index(QA_NUMBERS_COLUMN_NAME) if QA_NUMBERS_COLUMN_NAME in header else -1
+        self.report = MergeReport()
+        self._matched = set()
+
+    def merge(self, rows, record: bool = True):
+        """
+        Yield ``(row_num, values, updates, status)`` for each ``(row_num, values)`` in ``rows``.
+
+        ``values`` is padded to the header width, ``updates`` maps column
+        indexes to new values and ``status`` is the matched result's
+        processing status (``None`` without a match). With ``record`` false
+        (a sampling pass) the report is left alone.
+        """
+        rows = iter(rows)
+        for chunk in iter(lambda: list(itertools.islice(rows, LOOKUP_CHUNK_ROWS)), []):
+            keyed = []
+            for row_num, values in chunk:
+                values = list(values) + [None] * (self.width - len(values))
+                desc_val = values[self.desc_col_idx]
+                keyed.append((row_num, values, desc_val, _template_row_key(desc_val) if desc_val else None))
+            found = self._source.get_many([key for *_, key in keyed if key is not None])
+
+            for row_num, values, desc_val, key in keyed:
+                new_row_data = found.get(key) if key is not None else None
+                if new_row_data is None:
+                    if desc_val and record:
+                        self._unmatched_row(row_num, desc_val)
+                    yield row_num, values, {}, None
+                    continue
+                if record:
+                    self.report.matched_rows += 1
+                    self._matched.add(key)
+                yield row_num, values, self._updates(values, new_row_data), self._status(new_row_data)
+
+    def _unmatched_row(self, row_num, desc_val):
+        self.report.unmatched_rows.append((row_num, desc_val))
+        log_warning(logger, f"Skipped template row {row_num} ({desc_val}) - no processed data found")
+
+    def _status(self, new_row_data):
+        return new_row_data.get("processing_status")
+
+    def _updates(self, values, new_row_data) -> dict:
+        updates = {}
+        qa_numbers = sanitize_for_excel(new_row_data.get("qa_numbers"))
+        if self.meta_col_idx != -1 and META_COLUMN_NAME in new_row_data:
+            updates[self.meta_col_idx] = sanitize_for_excel(new_row_data[META_COLUMN_NAME])
+        if self.qa_col_idx != -1 and qa_numbers:
+            updates[self.qa_col_idx] = qa_numbers
+        elif self.meta_col_idx != -1 and qa_numbers:
+            existing = updates.get(self.meta_col_idx, values[self.meta_col_idx]) or ""
+            sep = " | " if existing else ""
+            updates[self.meta_col_idx] = f"{existing}{sep}{qa_numbers}"
+        if self.author_col_idx != -1 and AUTHOR_COLUMN_NAME in new_row_data:
+            updates[self.author_col_idx] = sanitize_for_excel(new_row_data[AUTHOR_COLUMN_NAME])
+        return updates
+
+    def finish(self) -> MergeReport:
+        """Add the results no row matched and the duplicate names to the report."""
+        for key, count in self._source.key_counts().items():
+            if key not in self._matched:
+                self.report.unmatched_results.append(key)
+            if count > 1:
+                self.report.duplicate_keys[key] = count
+        return self.report
+
+
+# Status reported for a refreshed row whose result has no status colour; its old fill is cleared.
+NO_FILL_STATUS = ""
+
+
+class RefreshMerger(TemplateMerger):
+    """
+    :class:`TemplateMerger` for :func:`refresh_excel`.
+
+    Only the changed results are known, so rows without one are expected and
+    not reported. A matched row whose status has no colour comes back as
+    ``NO_FILL_STATUS`` so a fill left from its previous status is removed.
+    With ``conditional`` (a report written in the ``"conditional"`` style
+    mode) the status goes into the status column instead and rows get no fill.
+    """
+
+    def __init__(self, all_results, header, conditional: bool = False):
+        super().__init__(all_results, header)
+        self.status_col_idx = _find_status_column(header) if conditional else -1
+        self.conditional = conditional
+
+    def _unmatched_row(self, row_num, desc_val):
+        pass
+
+    def _updates(self, values, new_row_data) -> dict:
+        updates = super()._updates(values, new_row_data)
+        status = new_row_data.get("processing_status")
+        if self.status_col_idx >= 0 and status:
+            updates[self.status_col_idx] = status
+        return updates
+
+    def _status(self, new_row_data):
+        if self.conditional:
+            return None
+        status = new_row_data.get("processing_status")
+        return status if status in STATUS_FILLS else NO_FILL_STATUS
+
+
+_CELL_REF_RE = re.compile(r"([A-Z]+)")
+
+
+def _cell_text(cell, shared_strings) -> str | None:
+    kind = cell.get("t")
+    if kind == "inlineStr":
+        return "".join(t.text or "" for t in cell.iter(f"{SHEET_NS}t"))
+    value = cell.find(f"{SHEET_NS}v")
+    if value is None or value.text is None:
+        return None
+    return shared_strings[int(value.text)] if kind == "s" else value.text
+
+
+def read_template_keys(template_path) -> set:
+    """
+    Return the merge keys of every Short description in the template's active sheet.
+
+    Reads the workbook XML straight from the zip, like
+    :func:`_load_default_headers`, and parses the sheet incrementally, so it is
+    cheap enough to run before a job starts. The keys match the file stems
+    :class:`TemplateMerger` merges on.
+    """
+    import zipfile
+    import xml.etree.ElementTree as ET
+
+    try:
+        with zipfile.ZipFile(template_path) as archive:
+            shared_strings = read_shared_strings(archive)
+            keys, desc_col = set(), None
+            with archive.open(active_sheet_part(archive)) as sheet:
+                for _, row in ET.iterparse(sheet):
+                    if row.tag != f"{SHEET_NS}row":
+                        continue
+                    for cell in row.iter(f"{SHEET_NS}c"):
+                        column = _CELL_REF_RE.match(cell.get("r", "")).group(1) if cell.get("r") else None
+                        text = _cell_text(cell, shared_strings)
+                        if desc_col is None:
+                            if text == DESCRIPTION_COLUMN_NAME:
+                                desc_col = column
+                        elif column == desc_col and text:
+                            keys.add(_template_row_key(text))
+                    if desc_col is None:
+                        raise ExcelGenerationError(
+                            f"Template missing required column: '{DESCRIPTION_COLUMN_NAME}'"
+                        )
+                    row.clear()
+            return keys
+    except ExcelGenerationError:
+        raise
+    except Exception as e:
+        raise ExcelGenerationError(f"Could not read template keys from {template_path}: {e}")
+
+
+def filter_files_by_template(files, template_path) -> tuple:
+    """Split ``files`` into ``(used, skipped)`` by whether the template refers to their stem."""
+    keys = read_template_keys(template_path)
+    used, skipped = [], []
+    for pdf_path in files:
+        (used if _result_key(Path(pdf_path).name) in keys else skipped).append(pdf_path)
+    return used, skipped
+
+
+def _write_only_cell(worksheet, value, style_name=None, number_format=None):
+    """A write-only cell with a named style that keeps the source cell's number format."""
+    cell = WriteOnlyCell(worksheet, value=value)
+    if style_name:
+        cell.style = style_name
+    if number_format and number_format != "General":
+        cell.number_format = number_format
+    return cell
+
+
+def _copy_sheet_streaming(source, target):
+    """Copy the values and number formats of a read-only sheet into a write-only one."""
+    for row in source.iter_rows():
+        target.append([_write_only_cell(target, cell.value, number_format=getattr(cell, "number_format", None))
+                       for cell in row])
+
+
+def _generate_excel_streaming(all_results, output_path, template_path, style_mode: str = "fills") -> MergeReport:
+    """
+    Streams the template into a new workbook one row at a time.
+
+    The template is read with ``read_only=True`` and rows go out through a
+    write-only workbook using shared named styles, so memory use does not
+    grow with the number of template rows. Results are looked up for
+    ``LOOKUP_CHUNK_ROWS`` template rows at a time, so a spilled result store is
+    never loaded whole. Cells keep their values and number formats (dates stay
+    dates) and the other sheets are copied across in their original order;
+    fonts, fills and column widths are replaced by the standard styles. In the
+    ``"conditional"`` style mode every data cell shares one named style and
+    statuses are coloured by :func:`_add_status_rules`.
+    """
+    conditional = style_mode == "conditional"
+    template_wb = openpyxl.load_workbook(template_path, read_only=True)
+    try:
+        template_ws = template_wb.active
+        header = list(next(template_ws.iter_rows(max_row=1, values_only=True), ()))
+        merger = TemplateMerger(all_results, header)
+        status_col_idx = _status_column(header) if conditional else -1
+
+        def merged_rows(record: bool):
+            """Yield ``(values, number_formats, style_name)`` for each data row with new data merged in."""
+            formats_by_row = {}
+
+            def rows():
+                for row_num, cells in enumerate(template_ws.iter_rows(min_row=2), start=2):
+                    formats_by_row[row_num] = [getattr(cell, "number_format", None) for cell in cells]
+                    yield row_num, [cell.value for cell in cells]
+
+            for row_num, values, updates, status in merger.merge(rows(), record=record):
+                formats = formats_by_row.pop(row_num)
+                for col_idx, value in updates.items():
+                    values[col_idx] = value
+                if conditional:
+                    values += [None] * (len(header) - len(values))
+                    if status:
+                        values[status_col_idx] = status
+                    yield values, formats, CELL_STYLE_NAME
+                else:
+                    yield values, formats, _status_style_name(status) if status in STATUS_FILLS else CELL_STYLE_NAME
+
+        # Widths have to be known before the first row is written in write-only mode,
+        # so they come from a sample of the merged rows rather than the finished sheet.
+        sample = (values for values, _, _ in merged_rows(record=False))
+        widths = _sample_column_widths(itertools.chain([header], sample), EXCEL_WIDTH_SAMPLE_ROWS)
+
+        workbook = openpyxl.Workbook(write_only=True)
+        _register_named_styles(workbook)
+        for source in template_wb.worksheets:
+            if source.title != template_ws.title:
+                _copy_sheet_streaming(source, workbook.create_sheet(title=source.title))
+                continue
+            worksheet = workbook.create_sheet(title=template_ws.title)
+            for i, width in enumerate(widths, 1):
+                worksheet.column_dimensions[get_column_letter(i)].width = width
+
+            worksheet.append([_write_only_cell(worksheet, value, HEADER_STYLE_NAME) for value in header])
+            last_row = 1
+            for values, formats, style_name in merged_rows(record=True):
+                formats += [None] * (len(values) - len(formats))
+                worksheet.append([_write_only_cell(worksheet, value, style_name, number_format)
+                                  for value, number_format in zip(values, formats)])
+                last_row += 1
+            if conditional:
+                _add_status_rules(worksheet, status_col_idx, len(header), last_row)
+        workbook.active = template_wb.worksheets.index(template_ws)
+    finally:
+        template_wb.close()
+
+    workbook.save(output_path)
+    return merger.finish()
+
+
+def _generate_excel_patched(all_results, output_path, template_path) -> MergeReport:
+    """
+    Writes results straight into a copy of the template's XML; see :func:`xlsx_patcher.patch_workbook`.
+
+    Only Meta, Author, QA Numbers and the status fill of matched rows change;
+    the template's own formatting, column widths and other sheets are kept.
+    """
+    colors = {status: fill.start_color.rgb for status, fill in STATUS_FILLS.items()}
+    merger = patch_workbook(template_path, output_path, lambda header: TemplateMerger(all_results, header), colors)
+    return merger.finish()
+
+
+def generate_excel(all_results, output_path, template_path=Path("Sample_Set/kb_knowledge_Template.xlsx"), streaming=None,
+                   style_mode=None, patch=None):
+    """
+    Generates a formatted Excel file by cloning the template and merging new data.
+
+    Template rows are matched to results by file stem through
+    :class:`TemplateMerger`; unmatched rows, unmatched results and duplicate
+    file names are logged once the merge is done. With ``streaming`` (default
+    ``EXCEL_STREAMING``) the output is written row by row instead of loading
+    the whole workbook; see :func:`_generate_excel_streaming`.
+
+    ``style_mode`` (default ``EXCEL_STYLE_MODE``) picks how rows are styled:
+    ``"fills"`` fills each cell of a matched row and restyles the sheet with
+    :func:`apply_styles`; ``"conditional"`` writes the status into the
+    Processing Status column (an existing ``STATUS_COLUMN_ALIASES`` header
+    such as "Process Status" is reused; otherwise it is added), colours rows
+    with one conditional-formatting rule per status, styles cells through
+    shared named styles and sizes columns from a sample of rows.
+
+    With ``patch`` (default ``EXCEL_PATCH_TEMPLATE``) the template's XML is
+    patched in place instead (:func:`_generate_excel_patched`), which skips
+    openpyxl entirely and keeps the template's own styling; ``streaming`` and
+    ``style_mode`` then only apply if the template cannot be patched.
+    """
+    try:
+        if streaming is None:
+            streaming = EXCEL_STREAMING
+        if style_mode is None:
+            style_mode = EXCEL_STYLE_MODE
+        if patch is None:
+            patch = EXCEL_PATCH_TEMPLATE
+        if style_mode not in EXCEL_STYLE_MODES:
+            raise ExcelGenerationError(f"Unknown Excel style mode: {style_mode!r}")
+
+        if openpyxl is None:
+            raise ExcelGenerationError("Required libraries not installed")
+
+        if not all_results:
+            raise ExcelGenerationError(
+                "No data was processed to generate an Excel file."
+            )
+
+        template_path = Path(template_path)
+        if not template_path.exists():
+            raise ExcelGenerationError(f"Template file not found at: {template_path}")
+
+        if patch:
+            try:
+                report = _generate_excel_patched(all_results, output_path, template_path)
+                report.log()
+                log_info(logger, f"Successfully patched updated Excel file: {output_path}")
+                return str(output_path)
+            except XlsxPatchError as e:
+                log_warning(logger, f"Template cannot be patched in place ({e}); writing it with openpyxl instead.")
+
+        if streaming:
+            report = _generate_excel_streaming(all_results, output_path, template_path, style_mode)
+            report.log()
+            log_info(logger, f"Successfully streamed updated Excel file: {output_path}")
+            return str(output_path)
+
+        shutil.copy(template_path, output_path)
+
+        workbook = openpyxl.load_workbook(output_path)
+        worksheet = workbook.active
+        header = [cell.value for cell in worksheet[1]]
+        merger = TemplateMerger(all_results, header)
+        conditional = style_mode == "conditional"
+        if conditional:
+            status_col_idx = _status_column(header)
+            worksheet.cell(row=1, column=status_col_idx + 1).value = header[status_col_idx]
+
+        # The merger reads a chunk of rows ahead; keep their cells until they come back.
+        # (worksheet[row_num] would recount the sheet's columns on every row.)
+        pending_cells = {}
+
+        def rows():
+            for row_num, row_cells in enumerate(worksheet.iter_rows(min_row=2), start=2):
+                pending_cells[row_num] = row_cells
+                yield row_num, [cell.value for cell in row_cells]
+
+        for row_num, _, updates, status in merger.merge(rows()):
+            row_cells = pending_cells.pop(row_num)
+            for col_idx, value in updates.items():
+                worksheet.cell(row=row_num, column=col_idx + 1).value = value
+            if conditional:
+                if status:
+                    worksheet.cell(row=row_num, column=status_col_idx + 1).value = status
+            elif fill := STATUS_FILLS.get(status):
+                for cell in row_cells:
+                    cell.fill = fill
+
+        if conditional:
+            _apply_named_styles(workbook, worksheet)
+            _add_status_rules(worksheet, status_col_idx, len(header), worksheet.max_row)
+        else:
+            apply_styles(worksheet)
+        workbook.save(output_path)
+        merger.finish().log()
+
+        log_info(
+            logger, f"Successfully created cloned and updated Excel file: {output_path}"
+        )
+        return str(output_path)
+
     except Exception as e:
         log_error(logger, f"Excel generation failed: {e}")
-        raise ExcelGenerationError(f"Failed to generate Excel file: {e}")
+        raise ExcelGenerationError(f"Failed to generate Excel file: {e}")
+
+
+def _refresh_excel_openpyxl(previous_output, changed_results, output_path, conditional: bool) -> int:
+    """:func:`refresh_excel` through openpyxl, for workbooks the XML patcher cannot handle; returns the rows updated."""
+    workbook = openpyxl.load_workbook(previous_output)
+    worksheet = workbook.active
+    header = [cell.value for cell in worksheet[1]]
+    merger = RefreshMerger(changed_results, header, conditional)
+
+    no_fill = PatternFill(fill_type=None)
+    rows = ((row_num, list(values)) for row_num, values in enumerate(worksheet.iter_rows(min_row=2, values_only=True), start=2))
+    for row_num, _, updates, status in merger.merge(rows):
+        for col_idx, value in updates.items():
+            worksheet.cell(row=row_num, column=col_idx + 1).value = value
+            if value:
+                dimension = worksheet.column_dimensions[get_column_letter(col_idx + 1)]
+                if (dimension.width or 0) < min(len(str(value)) + 2, 70):
+                    dimension.width = min(len(str(value)) + 2, 70)
+        if status is None:
+            continue
+        fill = STATUS_FILLS.get(status, no_fill)
+        for col in range(1, len(header) + 1):
+            worksheet.cell(row=row_num, column=col).fill = fill
+
+    # Save next to the target and swap it in, so a failed save never leaves half a workbook.
+    tmp_path = output_path.with_name(f"~{output_path.stem}.refresh{output_path.suffix}")
+    workbook.save(tmp_path)
+    tmp_path.replace(output_path)
+    return merger.report.matched_rows
+
+
+def refresh_excel(previous_output, changed_results, output_path=None, patch: bool = True, style_mode=None):
+    """
+    Update an earlier :func:`generate_excel` output in place of regenerating it.
+
+    Only the rows whose Short description matches one of ``changed_results``
+    are touched: their Meta, Author and QA Numbers cells and their status
+    fill. The cells are worked out by :class:`RefreshMerger` exactly as
+    :func:`generate_excel` would, so an empty QA result keeps the cell's value.
+    A report written in the ``"conditional"`` style mode (detected from its
+    conditional formatting unless ``style_mode`` says) gets the new status in
+    its status column instead of a fill, and its rules colour the row.
+
+    The workbook is patched at the XML level (:func:`xlsx_patcher.patch_workbook`):
+    unchanged rows are copied as text and nothing is re-serialized or
+    restyled, so the cost follows the number of changed rows rather than the
+    size of the workbook. Column widths are left as they are. Workbooks the
+    patcher cannot handle, or any workbook with ``patch`` false, are loaded
+    and saved through openpyxl instead.
+
+    Args:
+        previous_output: Workbook written by an earlier run
+        changed_results: Result dicts for the files that changed
+        output_path: Where to save; defaults to overwriting ``previous_output``
+        patch: Patch the XML (default) rather than load the workbook with openpyxl
+        style_mode: ``"fills"`` or ``"conditional"``; detected from the workbook by default
+
+    Returns:
+        str: path of the saved workbook
+    """
+    previous_output = Path(previous_output)
+    output_path = Path(output_path) if output_path else previous_output
+    if not previous_output.exists():
+        raise ExcelGenerationError(f"Previous output not found at: {previous_output}")
+
+    try:
+        changed_results = list(changed_results)
+        if style_mode is None:
+            style_mode = "conditional" if has_conditional_formatting(previous_output) else "fills"
+        if style_mode not in EXCEL_STYLE_MODES:
+            raise ExcelGenerationError(f"Unknown Excel style mode: {style_mode!r}")
+        conditional = style_mode == "conditional"
+        refreshed = None
+        if patch:
+            colors = {status: fill.start_color.rgb for status, fill in STATUS_FILLS.items()}
+            colors[NO_FILL_STATUS] = None
+            try:
+                merger = patch_workbook(
+                    previous_output, output_path, lambda header: RefreshMerger(changed_results, header, conditional), colors
+                )
+                refreshed = merger.report.matched_rows
+            except XlsxPatchError as e:
+                log_warning(logger, f"{previous_output.name} cannot be patched in place ({e}); refreshing it with openpyxl.")
+        if refreshed is None:
+            if openpyxl is None:
+                raise ExcelGenerationError("Required libraries not installed")
+            refreshed = _refresh_excel_openpyxl(previous_output, changed_results, output_path, conditional)
+
+        log_info(
+            logger,
+            f"Refreshed {refreshed} rows for {len(changed_results)} changed results in {output_path}",
+        )
+        return str(output_path)
+
+    except ExcelGenerationError:
+        raise
+    except Exception as e:
+        log_error(logger, f"Excel refresh failed: {e}")
+        raise ExcelGenerationError(f"Failed to refresh Excel file: {e}")
@@ -0,0 +1,55 @@
+# lazy_imports.py - Deferred imports for the heavy PDF, OCR and image libraries.
+# PyMuPDF, OpenCV, NumPy and pytesseract (which pulls in pandas) take most of a
+# second to import. Modules that only need them while processing a file bind a
+# LazyModule instead, so importing them - and everything that imports them,
+# such as the web server - stays cheap until the first page is actually read.
+import importlib
+import importlib.util
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+    ``fitz = LazyModule("fitz")`` behaves like ``import fitz`` except that the
+    import happens the first time an attribute is looked up. Setting or
+    deleting attributes is forwarded to the real module, so monkeypatching
+    through the stand-in affects every user of that module.
+    """
+
+    def __init__(self, name: str):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_module", None)
+
+    def _load(self):
+        module = object.__getattribute__(self, "_module")
+        if module is None:
+            module = importlib.import_module(self._name)
+            object.__setattr__(self, "_module", module)
+        return module
+
+    @property
+    def loaded(self) -> bool:
+        """True once the real module has been imported."""
+        return object.__getattribute__(self, "_module") is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __delattr__(self, attr):
+        delattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<LazyModule {self._name!r} ({state})>"
+
+
+def module_available(name: str) -> bool:
+    """Whether ``name`` can be imported, checked without importing it."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
@@ -1,24 +1,38 @@
 # ocr_utils.py - Enhanced OCR utilities with robust error handling and corrected file path handling
-import fitz  # PyMuPDF
 import os
 from pathlib import Path
 from logging_utils import setup_logger, log_info, log_error, log_warning
-import pytesseract
-from PIL import Image
 import io
-import cv2  # OpenCV for image processing
-import numpy as np
+import math
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from custom_exceptions import (
     PDFProtectionError, PDFCorruptionError, OCRProcessingError, 
     TesseractNotFoundError, PDFExtractionError
 )
+from config import (
+    OCR_PAGE_WORKERS, OCR_MODE, MIN_TEXT_LENGTH_PER_PAGE,
+    OCR_DPI, OCR_ADAPTIVE_DPI, OCR_DPI_STEPS, OCR_MIN_CONFIDENCE, OCR_BATCH_SIZE,
+    OCR_THRESHOLD, OCR_PAGE_CACHE, CACHE_DIR, LAZY_MIN_PAGES,
+)
+from lazy_imports import LazyModule, module_available
+from result_cache import open_page_cache
+from timing_utils import StageTimer
+
+# The PDF and image libraries are imported the first time a document is read,
+# so importing this module (and the engine and server above it) stays fast.
+fitz = LazyModule("fitz")  # PyMuPDF
+pytesseract = LazyModule("pytesseract")
+cv2 = LazyModule("cv2")  # OpenCV for image processing
+np = LazyModule("numpy")
 
-# Try to import pikepdf for robust PDF protection detection
-try:
-    import pikepdf
-    PIKEPDF_AVAILABLE = True
-except ImportError:
-    PIKEPDF_AVAILABLE = False
+# pikepdf is optional and gives more robust PDF protection detection
+pikepdf = LazyModule("pikepdf")
+PIKEPDF_AVAILABLE = module_available("pikepdf")
 
 logger = setup_logger("ocr_utils")
 
@@ -59,7 +73,19 @@ def init_tesseract():
         log_error(logger, f"An unexpected error occurred during Tesseract initialization: {e}")
         return False
 
-TESSERACT_AVAILABLE = init_tesseract()
+# None until Tesseract is first needed; tesseract_available() fills it in.
+TESSERACT_AVAILABLE = None
+_tesseract_lock = threading.Lock()
+
+
+def tesseract_available() -> bool:
+    """Whether Tesseract can be used; detected on first call and then cached."""
+    global TESSERACT_AVAILABLE
+    if TESSERACT_AVAILABLE is None:
+        with _tesseract_lock:
+            if TESSERACT_AVAILABLE is None:
+                TESSERACT_AVAILABLE = init_tesseract()
+    return TESSERACT_AVAILABLE
 
 def check_pdf_protection(pdf_path):
     """
@@ -103,6 +129,305 @@ def check_pdf_protection(pdf_path):
     
     return False, "none", None
 
+class PDFDocumentSession:
+    """
+    Single-open view of one PDF document.
+
+    The file is read from disk once; the protection check, text-layer inspection,
+    text extraction and OCR decision all share the same bytes and PyMuPDF handle.
+    Use it as a context manager so the handle is closed when processing is done.
+
+    Time spent in each step is recorded on ``timer`` (a :class:`StageTimer`),
+    ``ocr_page_count`` counts the pages that went through OCR and
+    ``ocr_page_stats`` holds the DPI and confidence each of them was read at.
+
+    ``ocr_mode`` is ``"document"`` (OCR every page when the whole file has too
+    little text) or ``"hybrid"`` (OCR only the pages whose own text layer is
+    thin and keep the native text of the rest); defaults to ``OCR_MODE``.
+    """
+
+    def __init__(self, pdf_path, timer=None, ocr_mode=None):
+        self.pdf_path = Path(pdf_path)
+        self.name = self.pdf_path.name
+        self.timer = timer or StageTimer()
+        self.ocr_mode = ocr_mode or OCR_MODE
+        self.ocr_page_count = 0
+        self.ocr_page_stats = []
+        self._pages_read = None
+        self._data = None
+        self._doc = None
+        self._protection = None
+        self._page_texts = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Release the PyMuPDF handle and the in-memory file bytes."""
+        if self._doc is not None:
+            try:
+                self._doc.close()
+            except Exception:
+                pass
+        self._doc = None
+        self._data = None
+
+    @property
+    def data(self) -> bytes:
+        """Raw file bytes, read on first access."""
+        if self._data is None:
+            with self.timer.stage("open"):
+                self._data = self.pdf_path.read_bytes()
+        return self._data
+
+    @property
+    def document(self):
+        """PyMuPDF document opened from the in-memory bytes, opened on first access."""
+        if self._doc is None:
+            with self.timer.stage("open"):
+                self._doc = fitz.open(stream=self.data, filetype="pdf")
+        return self._doc
+
+    @property
+    def page_count(self) -> int:
+        return len(self.document)
+
+    @property
+    def pages_read(self) -> int:
+        """Pages whose text was read: all of them unless :meth:`extract_text_lazy` stopped early."""
+        return self._pages_read if self._pages_read is not None else self.opened_page_count
+
+    @property
+    def opened_page_count(self) -> int:
+        """Page count if the document has been opened, else 0 (never opens it)."""
+        return len(self._doc) if self._doc is not None else 0
+
+    def check_protection(self):
+        """
+        Same checks as :func:`check_pdf_protection`, run once against the in-memory bytes.
+
+        Returns:
+            tuple: (is_protected, protection_type, error_message)
+        """
+        if self._protection is None:
+            with self.timer.stage("protection_check"):
+                self._protection = self._check_protection()
+        return self._protection
+
+    def _check_protection(self):
+        if PIKEPDF_AVAILABLE:
+            try:
+                with pikepdf.open(io.BytesIO(self.data)) as pdf:
+                    if pdf.is_encrypted:
+                        return True, "encrypted", "PDF is password-protected (detected by pikepdf)"
+                    return False, "none", None
+            except pikepdf.PasswordError:
+                return True, "password", "PDF requires password to open"
+            except pikepdf.PdfError as e:
+                if "password" in str(e).lower() or "encrypt" in str(e).lower():
+                    return True, "encrypted", f"PDF is protected: {str(e)}"
+            except Exception as e:
+                log_warning(logger, f"pikepdf check failed for {self.name}: {e}")
+
+        try:
+            doc = self.document
+            if doc.is_encrypted:
+                return True, "encrypted", "PDF is encrypted (detected by PyMuPDF)"
+            if hasattr(doc, 'needs_pass') and doc.needs_pass:
+                return True, "password", "PDF requires password (detected by PyMuPDF)"
+            return False, "none", None
+        except Exception as e:
+            if "password" in str(e).lower() or "encrypt" in str(e).lower():
+                return True, "unknown", f"PDF appears protected: {str(e)}"
+            return False, "none", None
+
+    def page_texts(self) -> list:
+        """Text layer of every page, extracted once."""
+        if self._page_texts is None:
+            with self.timer.stage("text_extraction"):
+                self._page_texts = [page.get_text() for page in self.document]
+        return self._page_texts
+
+    def thin_pages(self) -> list:
+        """Indices of pages whose text layer has at most ``MIN_TEXT_LENGTH_PER_PAGE`` characters."""
+        return [i for i, text in enumerate(self.page_texts()) if len(text.strip()) <= MIN_TEXT_LENGTH_PER_PAGE]
+
+    def ocr_needed(self) -> bool:
+        """Pre-checks the document to see if it's image-based and likely requires OCR."""
+        with self.timer.stage("ocr_check"):
+            return self._ocr_needed()
+
+    def _ocr_needed(self) -> bool:
+        try:
+            is_protected, _, error_msg = self.check_protection()
+            if is_protected:
+                raise PDFProtectionError(error_msg)
+
+            if not self.document.is_pdf:
+                raise PDFCorruptionError(f"File {self.name} is not a valid PDF")
+
+            if self.ocr_mode == "hybrid":
+                return bool(self.thin_pages())
+
+            text_length = sum(len(text) for text in self.page_texts())
+            if text_length < 150:
+                return True
+        except PDFProtectionError:
+            raise
+        except Exception as e:
+            log_warning(logger, f"Could not pre-check PDF {self.name} for OCR needs: {e}")
+            return True
+        return False
+
+    def extract_text(self, ocr_workers=None):
+        """
+        Extract the document text, falling back to OCR when the text layer is empty.
+
+        Args:
+            ocr_workers: Worker processes for page-level OCR; see :func:`extract_text_with_ocr`.
+
+        Returns:
+            tuple: (status, failure_reason, extracted_text)
+        """
+        try:
+            is_protected, protection_type, error_msg = self.check_protection()
+            if is_protected:
+                log_warning(logger, f"Protected PDF detected: {self.name} - {error_msg}")
+                return "protected", f"File is password protected: {error_msg}", ""
+
+            try:
+                if not self.document.is_pdf:
+                    return "corrupted", "File is not a valid PDF document", ""
+
+                if self.ocr_mode == "hybrid":
+                    return self._extract_text_hybrid(ocr_workers)
+
+                text = "".join(self.page_texts())
+
+                if text and len(text.strip()) > 50:
+                    log_info(logger, f"Direct text extraction successful for {self.name}")
+                    return "success", None, text
+
+            except Exception as e:
+                if "password" in str(e).lower() or "encrypt" in str(e).lower():
+                    return "protected", f"PDF requires password: {str(e)}", ""
+                elif "corrupt" in str(e).lower() or "damaged" in str(e).lower():
+                    return "corrupted", f"PDF file appears corrupted: {str(e)}", ""
+                else:
+                    log_warning(logger, f"Direct text extraction failed for {self.name}: {e}")
+
+            if not tesseract_available():
+                return "ocr_failed", "No text found in PDF and Tesseract OCR is not available", ""
+
+            log_info(logger, f"Attempting OCR on {self.name}")
+            with self.timer.stage("ocr"):
+                self.ocr_page_count = self.opened_page_count
+                ocr_text, ocr_failure = extract_text_with_ocr(
+                    self.pdf_path, doc=self._doc, workers=ocr_workers, page_stats=self.ocr_page_stats
+                )
+
+            if ocr_failure:
+                return "ocr_failed", ocr_failure, ""
+            elif not ocr_text or len(ocr_text.strip()) < 10:
+                return "no_text", "OCR completed but no readable text was found", ""
+            else:
+                log_info(logger, f"OCR extraction successful for {self.name}")
+                return "success", None, ocr_text
+
+        except PDFProtectionError as e:
+            return "protected", str(e), ""
+        except PDFCorruptionError as e:
+            return "corrupted", str(e), ""
+        except Exception as e:
+            log_error(logger, f"Unexpected error processing {self.name}: {e}")
+            return "error", f"Unexpected processing error: {str(e)}", ""
+
+    def _extract_text_hybrid(self, ocr_workers=None):
+        """Keep the native text of every page and OCR only the thin ones."""
+        page_texts = list(self.page_texts())
+        thin = self.thin_pages()
+
+        if thin and tesseract_available():
+            log_info(logger, f"Hybrid OCR of {self.name}: {len(thin)} of {len(page_texts)} pages")
+            with self.timer.stage("ocr"):
+                self.ocr_page_count = len(thin)
+                try:
+                    ocr_texts = ocr_pages(self.pdf_path, thin, doc=self._doc, workers=ocr_workers,
+                                          page_stats=self.ocr_page_stats)
+                except Exception as e:
+                    log_error(logger, f"OCR extraction failed for {self.name}: {e}")
+                    ocr_texts = {}
+            for page_num, ocr_text in ocr_texts.items():
+                # A page whose OCR came back empty keeps whatever text layer it had.
+                if ocr_text:
+                    page_texts[page_num] = ocr_text
+
+        text = "\n".join(page_text.strip() for page_text in page_texts if page_text.strip())
+        if text and len(text) > 50:
+            return "success", None, text
+        if thin and not tesseract_available():
+            return "ocr_failed", "No text found in PDF and Tesseract OCR is not available", ""
+        return "no_text", "OCR completed but no readable text was found", ""
+
+    def extract_text_lazy(self, enough, min_pages=None):
+        """
+        Read pages in order and stop as soon as ``enough`` is satisfied.
+
+        Each page's text layer is read on its own; a thin page is OCR'd on its
+        own as in hybrid mode. ``enough(page_text)`` is called for every page and
+        returns ``True`` once everything wanted has been seen; reading stops
+        there, but never before ``min_pages`` (default ``LAZY_MIN_PAGES``) pages.
+        :attr:`pages_read` tells how far it got.
+
+        Returns:
+            tuple: (status, failure_reason, extracted_text)
+        """
+        min_pages = LAZY_MIN_PAGES if min_pages is None else min_pages
+        try:
+            is_protected, _, error_msg = self.check_protection()
+            if is_protected:
+                log_warning(logger, f"Protected PDF detected: {self.name} - {error_msg}")
+                return "protected", f"File is password protected: {error_msg}", ""
+            if not self.document.is_pdf:
+                return "corrupted", "File is not a valid PDF document", ""
+
+            page_texts, had_thin, done = [], False, False
+            for page_num, page in enumerate(self.document):
+                with self.timer.stage("text_extraction"):
+                    page_text = page.get_text().strip()
+                if len(page_text) <= MIN_TEXT_LENGTH_PER_PAGE:
+                    had_thin = True
+                    if tesseract_available():
+                        with self.timer.stage("ocr"):
+                            self.ocr_page_count += 1
+                            ocr_text = ocr_pages(self.pdf_path, [page_num], doc=self._doc, workers=1,
+                                                 page_stats=self.ocr_page_stats).get(page_num, "")
+                        page_text = ocr_text or page_text
+                page_texts.append(page_text)
+                done = enough(page_text)
+                if done and page_num + 1 >= min_pages:
+                    break
+            self._pages_read = len(page_texts)
+            log_info(logger, f"Lazy extraction of {self.name}: read {self._pages_read} of {self.page_count} pages")
+
+            text = "\n".join(page_text for page_text in page_texts if page_text)
+            if text and len(text) > 50:
+                return "success", None, text
+            if had_thin and not tesseract_available():
+                return "ocr_failed", "No text found in PDF and Tesseract OCR is not available", ""
+            return "no_text", "OCR completed but no readable text was found", ""
+
+        except PDFProtectionError as e:
+            return "protected", str(e), ""
+        except PDFCorruptionError as e:
+            return "corrupted", str(e), ""
+        except Exception as e:
+            log_error(logger, f"Unexpected error processing {self.name}: {e}")
+            return "error", f"Unexpected processing error: {str(e)}", ""
+
 def process_single_document(pdf_path):
     """
     Process a single PDF document with comprehensive error handling.
@@ -113,75 +438,13 @@ def process_single_document(pdf_path):
     Returns:
         tuple: (status, failure_reason, extracted_text)
     """
-    pdf_path = Path(pdf_path)
-    
-    try:
-        is_protected, protection_type, error_msg = check_pdf_protection(pdf_path)
-        if is_protected:
-            log_warning(logger, f"Protected PDF detected: {pdf_path.name} - {error_msg}")
-            return "protected", f"File is password protected: {error_msg}", ""
-        
-        try:
-            with fitz.open(str(pdf_path.resolve())) as doc:
-                if not doc.is_pdf:
-                    return "corrupted", "File is not a valid PDF document", ""
-                
-                text = "".join(page.get_text() for page in doc)
-                
-                if text and len(text.strip()) > 50:
-                    log_info(logger, f"Direct text extraction successful for {pdf_path.name}")
-                    return "success", None, text
-                    
-        except Exception as e:
-            if "password" in str(e).lower() or "encrypt" in str(e).lower():
-                return "protected", f"PDF requires password: {str(e)}", ""
-            elif "corrupt" in str(e).lower() or "damaged" in str(e).lower():
-                return "corrupted", f"PDF file appears corrupted: {str(e)}", ""
-            else:
-                log_warning(logger, f"Direct text extraction failed for {pdf_path.name}: {e}")
-        
-        if not TESSERACT_AVAILABLE:
-            return "ocr_failed", "No text found in PDF and Tesseract OCR is not available", ""
-        
-        log_info(logger, f"Attempting OCR on {pdf_path.name}")
-        ocr_text, ocr_failure = extract_text_with_ocr(pdf_path)
-        
-        if ocr_failure:
-            return "ocr_failed", ocr_failure, ""
-        elif not ocr_text or len(ocr_text.strip()) < 10:
-            return "no_text", "OCR completed but no readable text was found", ""
-        else:
-            log_info(logger, f"OCR extraction successful for {pdf_path.name}")
-            return "success", None, ocr_text
-            
-    except PDFProtectionError as e:
-        return "protected", str(e), ""
-    except PDFCorruptionError as e:
-        return "corrupted", str(e), ""
-    except Exception as e:
-        log_error(logger, f"Unexpected error processing {pdf_path.name}: {e}")
-        return "error", f"Unexpected processing error: {str(e)}", ""
+    with PDFDocumentSession(pdf_path) as session:
+        return session.extract_text()
 
 def _is_ocr_needed(pdf_path_str: str):
     """Pre-checks a PDF to see if it's image-based and likely requires OCR."""
-    try:
-        is_protected, _, error_msg = check_pdf_protection(pdf_path_str)
-        if is_protected:
-            raise PDFProtectionError(error_msg)
-        
-        with fitz.open(pdf_path_str) as doc:
-            if not doc.is_pdf:
-                raise PDFCorruptionError(f"File {Path(pdf_path_str).name} is not a valid PDF")
-            
-            text_length = sum(len(page.get_text("text")) for page in doc)
-            if text_length < 150:
-                return True
-    except PDFProtectionError:
-        raise
-    except Exception as e:
-        log_warning(logger, f"Could not pre-check PDF {Path(pdf_path_str).name} for OCR needs: {e}")
-        return True
-    return False
+    with PDFDocumentSession(pdf_path_str) as session:
+        return session.ocr_needed()
 
 def extract_text_from_pdf(pdf_path):
     """
@@ -196,46 +459,358 @@ def extract_text_from_pdf(pdf_path):
         log_error(logger, f"Failed to extract text from {Path(pdf_path).name}: {failure_reason}")
         return ""
 
-def extract_text_with_ocr(pdf_path):
+@contextmanager
+def _open_or_reuse(pdf_path_str: str, doc=None):
+    """Yield ``doc`` untouched if given, otherwise open (and later close) the file."""
+    if doc is not None:
+        yield doc
+        return
+    with fitz.open(pdf_path_str) as opened:
+        yield opened
+
+TESSERACT_CONFIG = r'--oem 3 --psm 6'
+
+class PagePreprocessor:
+    """
+    Renders pages straight to 8-bit grayscale and binarizes them for Tesseract.
+
+    The threshold and median-blur steps write into buffers that are kept and
+    reused for every page of the same size, so a run over many pages does not
+    allocate new full-page arrays per step. The returned array is one of those
+    buffers: use it (or copy it) before preprocessing the next page.
+
+    ``threshold`` is ``"adaptive"`` (Gaussian adaptive threshold) or ``"otsu"``
+    (global Otsu threshold); defaults to ``OCR_THRESHOLD``.
+    """
+
+    def __init__(self, threshold=None):
+        self.threshold = threshold or OCR_THRESHOLD
+        if self.threshold not in ("adaptive", "otsu"):
+            raise ValueError(f"Unknown OCR threshold mode: {self.threshold!r}")
+        self._binary = None
+        self._output = None
+
+    def _buffers(self, shape):
+        if self._binary is None or self._binary.shape != shape:
+            self._binary = np.empty(shape, dtype=np.uint8)
+            self._output = np.empty(shape, dtype=np.uint8)
+        return self._binary, self._output
+
+    def render(self, page, dpi: int):
+        """Render ``page`` at ``dpi`` as a grayscale array that shares the pixmap's memory."""
+        pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+        gray = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.h, pix.stride)
+        return pix, gray[:, :pix.w]
+
+    def process(self, page, dpi: int):
+        """Return the binarized, denoised page image for OCR."""
+        pix, gray = self.render(page, dpi)
+        binary, output = self._buffers(gray.shape)
+        if self.threshold == "otsu":
+            cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=binary)
+        else:
+            cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2, dst=binary)
+        del gray, pix  # The pixmap is not needed once thresholded.
+        cv2.medianBlur(binary, 3, dst=output)
+        return output
+
+_thread_state = threading.local()
+
+def _preprocessor() -> PagePreprocessor:
+    """Per-thread preprocessor, so concurrent jobs never share buffers."""
+    preprocessor = getattr(_thread_state, "preprocessor", None)
+    if preprocessor is None or preprocessor.threshold != OCR_THRESHOLD:
+        preprocessor = _thread_state.preprocessor = PagePreprocessor(OCR_THRESHOLD)
+    return preprocessor
+
+def _render_for_ocr(page, dpi: int):
+    """Render one page at ``dpi`` and clean it up for Tesseract (valid until the next call)."""
+    return _preprocessor().process(page, dpi)
+
+_page_cache = open_page_cache(CACHE_DIR)
+
+def _page_cache_lookup(image, settings: str, info=None):
+    """
+    Look up a preprocessed page image in the page OCR cache.
+
+    Returns ``(key, entry)``; both are ``None`` when ``OCR_PAGE_CACHE`` is off.
+    ``info`` (a page stats dict) gets ``cache`` ("hit"/"miss") and, on a hit,
+    ``saved_s``: the OCR time the cached entry originally took.
+    """
+    if not OCR_PAGE_CACHE:
+        return None, None
+    key = _page_cache.key(image, f"eng|{TESSERACT_CONFIG}|{OCR_THRESHOLD}|{settings}")
+    entry = _page_cache.get(key)
+    if info is not None:
+        info["cache"] = "hit" if entry is not None else "miss"
+        if entry is not None:
+            info["saved_s"] = entry.get("seconds", 0.0)
+    return key, entry
+
+def _page_cache_store(key, entry: dict):
+    if key is not None:
+        _page_cache.put(key, entry)
+
+def _ocr_page(page, dpi: int = OCR_DPI, info=None) -> str:
+    """Render one page at ``dpi``, clean it up for Tesseract and return its stripped text."""
+    image = _render_for_ocr(page, dpi)
+    key, cached = _page_cache_lookup(image, f"string|{dpi}", info)
+    if cached is not None:
+        return cached["text"]
+    start = time.perf_counter()
+    page_text = pytesseract.image_to_string(image, lang='eng', config=TESSERACT_CONFIG).strip()
+    _page_cache_store(key, {"text": page_text, "seconds": time.perf_counter() - start})
+    return page_text
+
+def _tesseract_batch(pages, dpi: int = OCR_DPI, infos=None) -> list:
+    """
+    OCR several pages with a single tesseract process.
+
+    Each preprocessed page is written to a temporary PNG as soon as it is
+    rendered, the paths go into a list file and tesseract reads them all in
+    one run, so the process start-up and language model load happen once per
+    batch instead of once per page. The text output separates pages with a
+    form feed, which is used to split it back up. Pages found in the page OCR
+    cache are not sent to tesseract; ``infos`` (one stats dict per page)
+    records the cache outcome.
+
+    Raises:
+        OCRProcessingError: if tesseract fails or its output does not split into one part per page
+    """
+    with tempfile.TemporaryDirectory(prefix="kyo_ocr_") as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        texts, image_paths, pending = [], [], []  # pending: (index into texts, cache key)
+        for i, page in enumerate(pages):
+            image = _render_for_ocr(page, dpi)
+            key, cached = _page_cache_lookup(image, f"string|{dpi}", infos[i] if infos else None)
+            if cached is not None:
+                texts.append(cached["text"])
+                continue
+            image_path = tmp_dir / f"page_{i:04d}.png"
+            if not cv2.imwrite(str(image_path), image, [cv2.IMWRITE_PNG_COMPRESSION, 1]):
+                raise OCRProcessingError(f"Could not write OCR image {image_path.name}")
+            texts.append(None)
+            image_paths.append(str(image_path))
+            pending.append((i, key))
+        if not image_paths:
+            return texts
+        list_path = tmp_dir / "pages.txt"
+        list_path.write_text("\n".join(image_paths) + "\n", encoding="utf-8")
+
+        out_base = tmp_dir / "out"
+        command = [pytesseract.pytesseract.tesseract_cmd, str(list_path), str(out_base),
+                   "-l", "eng", *TESSERACT_CONFIG.split()]
+        start = time.perf_counter()
+        try:
+            completed = subprocess.run(command, capture_output=True, text=True)
+        except OSError as e:
+            raise OCRProcessingError(f"Could not start tesseract: {e}") from e
+        if completed.returncode != 0:
+            raise OCRProcessingError(f"tesseract exited with {completed.returncode}: {completed.stderr.strip()}")
+
+        output = out_base.with_suffix(".txt").read_text(encoding="utf-8")
+        seconds_per_page = (time.perf_counter() - start) / len(image_paths)
+
+    parts = output.split("\f")
+    if len(parts) == len(image_paths) + 1 and not parts[-1].strip():
+        parts.pop()  # Trailing separator after the last page.
+    if len(parts) != len(image_paths):
+        raise OCRProcessingError(f"tesseract returned {len(parts)} pages for a batch of {len(image_paths)}")
+    for (i, key), part in zip(pending, parts):
+        texts[i] = part.strip()
+        _page_cache_store(key, {"text": texts[i], "seconds": seconds_per_page})
+    return texts
+
+def _text_and_confidence(data: dict) -> tuple:
+    """
+    Rebuild the page text from ``image_to_data`` output and compute its mean word confidence.
+
+    Lines are joined with newlines and paragraphs with a blank line, as
+    ``image_to_string`` does. The confidence is ``None`` when no words were found.
+    """
+    lines, confidences = [], []
+    current_key, current_par, words = None, None, []
+    for i, word in enumerate(data.get("text", [])):
+        word = (word or "").strip()
+        try:
+            conf = float(data["conf"][i])
+        except (TypeError, ValueError):
+            conf = -1.0
+        if not word or conf < 0:
+            continue
+        confidences.append(conf)
+        par_key = (data["block_num"][i], data["par_num"][i])
+        line_key = par_key + (data["line_num"][i],)
+        if line_key != current_key:
+            if words:
+                lines.append(" ".join(words))
+            if current_par is not None and par_key != current_par:
+                lines.append("")
+            current_key, current_par, words = line_key, par_key, []
+        words.append(word)
+    if words:
+        lines.append(" ".join(words))
+    confidence = sum(confidences) / len(confidences) if confidences else None
+    return "\n".join(lines).strip(), confidence
+
+def _ocr_page_adaptive(page, info=None) -> tuple:
+    """
+    OCR one page at the lowest of ``OCR_DPI_STEPS`` that Tesseract is confident about.
+
+    Each step re-renders the page at the next resolution until the mean word
+    confidence reaches ``OCR_MIN_CONFIDENCE``; the most confident attempt wins.
+    The page OCR cache is keyed by the image at the first step.
+
+    Returns:
+        tuple: (page_text, dpi, confidence)
+    """
+    best = ("", OCR_DPI_STEPS[-1], None)
+    key = None
+    start = time.perf_counter()
+    for step, dpi in enumerate(OCR_DPI_STEPS):
+        image = _render_for_ocr(page, dpi)
+        if step == 0:
+            key, cached = _page_cache_lookup(
+                image, f"adaptive|{tuple(OCR_DPI_STEPS)}|{OCR_MIN_CONFIDENCE}", info
+            )
+            if cached is not None:
+                return cached["text"], cached["dpi"], cached["confidence"]
+        data = pytesseract.image_to_data(
+            image, lang='eng', config=TESSERACT_CONFIG, output_type=pytesseract.Output.DICT
+        )
+        text, confidence = _text_and_confidence(data)
+        if best[2] is None or (confidence is not None and confidence > best[2]):
+            best = (text, dpi, confidence)
+        if confidence is not None and confidence >= OCR_MIN_CONFIDENCE:
+            break
+    _page_cache_store(key, {"text": best[0], "dpi": best[1], "confidence": best[2],
+                            "seconds": time.perf_counter() - start})
+    return best
+
+def _ocr_page_range(pdf_path_str: str, page_numbers, doc=None) -> list:
+    """
+    OCR the given pages of one document.
+
+    Runs in a worker process when page-level parallelism is on, so it opens its
+    own handle unless ``doc`` is passed. A failing page yields empty text rather
+    than aborting the rest of the range.
+
+    Returns:
+        list: (page_number, page_text, page_info) tuples in the order requested, where
+        ``page_info`` is ``{"page": 1-based number, "dpi": ..., "confidence": ...}``
+        (the confidence is only measured with ``OCR_ADAPTIVE_DPI``)
+    """
+    page_numbers = list(page_numbers)
+    if OCR_BATCH_SIZE > 1 and not OCR_ADAPTIVE_DPI and len(page_numbers) > 1:
+        # Adaptive DPI needs per-page confidences from image_to_data, so it always goes page by page.
+        return _ocr_page_range_batched(pdf_path_str, page_numbers, doc)
+
+    page_results = []
+    with _open_or_reuse(pdf_path_str, doc) as doc:
+        for page_num in page_numbers:
+            info = {"page": page_num + 1, "dpi": OCR_DPI, "confidence": None}
+            try:
+                if OCR_ADAPTIVE_DPI:
+                    text, info["dpi"], info["confidence"] = _ocr_page_adaptive(doc[page_num], info)
+                else:
+                    text = _ocr_page(doc[page_num], info=info)
+            except Exception as e:
+                log_warning(logger, f"OCR failed for page {page_num+1} of {Path(pdf_path_str).name}: {e}")
+                text = ""
+            page_results.append((page_num, text, info))
+    return page_results
+
+def _ocr_page_range_batched(pdf_path_str: str, page_numbers: list, doc=None) -> list:
+    """
+    Same as :func:`_ocr_page_range`, but ``OCR_BATCH_SIZE`` pages per tesseract run.
+
+    A batch that fails (no usable tesseract binary, unexpected output) is
+    retried page by page through ``pytesseract``.
+    """
+    page_results = []
+    with _open_or_reuse(pdf_path_str, doc) as doc:
+        for start in range(0, len(page_numbers), OCR_BATCH_SIZE):
+            batch = page_numbers[start:start + OCR_BATCH_SIZE]
+            infos = [{"page": page_num + 1, "dpi": OCR_DPI, "confidence": None} for page_num in batch]
+            try:
+                texts = _tesseract_batch([doc[page_num] for page_num in batch], infos=infos)
+            except Exception as e:
+                log_warning(logger, f"Batched OCR failed for {Path(pdf_path_str).name}, falling back to per-page OCR: {e}")
+                texts = None
+            if texts is None:
+                texts = []
+                for page_num, info in zip(batch, infos):
+                    try:
+                        texts.append(_ocr_page(doc[page_num], info=info))
+                    except Exception as e:
+                        log_warning(logger, f"OCR failed for page {page_num+1} of {Path(pdf_path_str).name}: {e}")
+                        texts.append("")
+            page_results.extend(zip(batch, texts, infos))
+    return page_results
+
+def _ocr_pages_parallel(pdf_path_str: str, page_numbers: list, workers: int) -> list:
+    """Spread pages over a process pool and return ``_ocr_page_range`` tuples in page order."""
+    # Several small chunks per worker keep the pool busy when some pages are much slower than others.
+    chunk_size = max(1, math.ceil(len(page_numbers) / (workers * 4)))
+    chunks = [page_numbers[i:i + chunk_size] for i in range(0, len(page_numbers), chunk_size)]
+    page_results = []
+    # Workers locate Tesseract once at start-up, as importing this module no longer does.
+    with ProcessPoolExecutor(max_workers=workers, initializer=tesseract_available) as executor:
+        for chunk_results in executor.map(_ocr_page_range, [pdf_path_str] * len(chunks), chunks):
+            page_results.extend(chunk_results)
+    return sorted(page_results, key=lambda item: item[0])
+
+def ocr_pages(pdf_path, page_numbers, doc=None, workers=None, page_stats=None) -> dict:
+    """
+    OCR only ``page_numbers`` (0-based) of a PDF.
+
+    Args:
+        pdf_path: Path to the PDF file
+        page_numbers: Pages to OCR
+        doc: Optional already-open PyMuPDF document to OCR instead of reopening the file
+        workers: Worker processes to spread the pages over; defaults to ``OCR_PAGE_WORKERS``
+        page_stats: Optional list that receives a ``{"page", "dpi", "confidence"}`` dict per page
+
+    Returns:
+        dict: page number -> stripped page text ("" for pages that failed)
+    """
+    pdf_path_str = str(Path(pdf_path).resolve())
+    page_numbers = list(page_numbers)
+    workers = OCR_PAGE_WORKERS if workers is None else workers
+    workers = min(workers or os.cpu_count() or 1, len(page_numbers))
+    if workers > 1:
+        log_info(logger, f"OCR of {Path(pdf_path).name}: {len(page_numbers)} pages on {workers} workers")
+        page_results = _ocr_pages_parallel(pdf_path_str, page_numbers, workers)
+    else:
+        page_results = _ocr_page_range(pdf_path_str, page_numbers, doc)
+    if page_stats is not None:
+        page_stats.extend(info for _, _, info in page_results)
+    return {page_num: text for page_num, text, _ in page_results}
+
+def extract_text_with_ocr(pdf_path, doc=None, workers=None, page_stats=None):
     """
     Extract text from a PDF using advanced OCR preprocessing.
+
+    Args:
+        pdf_path: Path to the PDF file
+        doc: Optional already-open PyMuPDF document to OCR instead of reopening the file
+        workers: Worker processes to spread the pages over; defaults to ``OCR_PAGE_WORKERS``.
+            With more than one worker each process opens its own copy of the file.
+        page_stats: Optional list that receives the DPI and confidence of every page
     
     Returns:
         tuple: (extracted_text, failure_reason)
     """
-    if not TESSERACT_AVAILABLE:
+    if not tesseract_available():
         return "", "Tesseract OCR is not available on this system"
         
-    all_text = []
     pdf_path_str = str(Path(pdf_path).resolve())
-    
+
     try:
-        with fitz.open(pdf_path_str) as doc:
-            for page_num, page in enumerate(doc):
-                try:
-                    pix = page.get_pixmap(dpi=300)
-                    img_data = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.h, pix.w, pix.n)
-                    
-                    if img_data.shape[2] == 4:
-                        img_cv = cv2.cvtColor(img_data, cv2.COLOR_RGBA2BGR)
-                    else:
-                        img_cv = cv2.cvtColor(img_data, cv2.COLOR_RGB2BGR)
-
-                    gray = cv2.cvtColor(img_cv, cv2.COLOR_BGR2GRAY)
-                    binary_img = cv2.adaptiveThreshold(
-                        gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
-                    )
-                    denoised = cv2.medianBlur(binary_img, 3)
-                    
-                    custom_config = r'--oem 3 --psm 6'
-                    page_text = pytesseract.image_to_string(denoised, lang='eng', config=custom_config)
-                    
-                    if page_text.strip():
-                        all_text.append(page_text.strip())
-                except Exception as e:
-                    log_warning(logger, f"OCR failed for page {page_num+1} of {Path(pdf_path).name}: {e}")
-                    continue
-                
+        with _open_or_reuse(pdf_path_str, doc) as doc:
+            page_results = ocr_pages(pdf_path_str, range(len(doc)), doc=doc, workers=workers, page_stats=page_stats)
+
+        all_text = [page_results[page_num] for page_num in sorted(page_results) if page_results[page_num]]
         result = "\n\n".join(all_text)
         
         if result.strip():
@@ -0,0 +1,153 @@
+# pattern_scanner.py - Single-pass multi-pattern scanner for model and QA harvesting.
+# Instead of running every pattern over the whole text, one combined prefilter
+# walks the text once looking for the literal prefix each pattern must start
+# with (e.g. "TASKalfa", "KM-"). Only the patterns whose prefix occurs at a
+# candidate position are verified there, and each match is tagged with the
+# pattern that produced it. The result is identical to calling ``findall``
+# for every pattern in turn.
+import re
+
+try:  # Python 3.11+
+    from re import _parser as sre_parse
+    from re import _constants as sre_constants
+except ImportError:  # pragma: no cover - older interpreters
+    import sre_parse
+    import sre_constants
+
+
+def _literal_prefix(pattern: re.Pattern) -> tuple:
+    """
+    Return ``(needs_word_boundary, literal)`` that every match of ``pattern`` starts with.
+
+    An empty literal means the pattern has no usable prefix and must be scanned on its own.
+    """
+    try:
+        parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    except Exception:
+        return False, ""
+
+    items = list(parsed)
+    boundary = False
+    if items and items[0] == (sre_constants.AT, sre_constants.AT_BOUNDARY):
+        # ASCII/LOCALE patterns define \b differently from the prefilter, so only use it for the default mode.
+        boundary = not (pattern.flags & (re.ASCII | re.LOCALE))
+        items = items[1:]
+
+    chars = []
+    for op, av in items:
+        if op is not sre_constants.LITERAL:
+            break
+        chars.append(chr(av))
+    literal = "".join(chars)
+
+    # Case folding outside ASCII does not line up with str.lower(); leave those patterns unindexed.
+    if not literal.isascii():
+        return False, ""
+    return boundary, literal
+
+
+def findall_value(match: re.Match, group_count: int):
+    """Return what ``re.findall`` would report for ``match``."""
+    if group_count == 0:
+        return match.group(0)
+    if group_count == 1:
+        return match.group(1) or ""
+    return tuple(g or "" for g in match.groups())
+
+
+# Non-ASCII characters that re.IGNORECASE matches against an ASCII letter but that str.lower()
+# leaves alone. (U+212A KELVIN SIGN already lowers to "k"; U+0130 lowers to two characters and
+# is handled by the length check in PatternScanner._candidate_positions.)
+_CASEFOLD_FIXES = str.maketrans({"\u0131": "i", "\u017f": "s"})
+
+
+class PatternScanner:
+    """Scan text once for a set of compiled patterns, tagging each match with its pattern index."""
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._standalone = []
+        keys = {}  # lowered literal -> pattern indices
+        boundaries = {}  # lowered literal -> True if every pattern under it starts with \b
+        for index, pattern in enumerate(self.patterns):
+            boundary, literal = _literal_prefix(pattern)
+            if literal:
+                literal = literal.lower()
+                keys.setdefault(literal, []).append(index)
+                boundaries[literal] = boundaries.get(literal, True) and boundary
+            else:
+                self._standalone.append(index)
+
+        # Longest literal first: the alternative the prefilter reports at a position is then the
+        # longest one present, and every other literal present there is a prefix of it.
+        ordered = sorted(keys, key=lambda literal: (-len(literal), literal))
+        self._candidates = {}  # literal -> (pattern indices to verify, all of them need \b)
+        for literal in ordered:
+            shorter = [other for other in keys if literal.startswith(other)]
+            self._candidates[literal] = (
+                sorted(index for other in shorter for index in keys[other]),
+                all(boundaries[other] for other in shorter),
+            )
+        self._all_indexed = (sorted(index for indices in keys.values() for index in indices), False)
+
+        # A plain case-sensitive literal alternation (no groups) over lower-cased text lets the
+        # regex engine skip ahead on first characters. The IGNORECASE lookahead form is the
+        # fallback for text whose lower-cased form does not line up character for character.
+        alternatives = "|".join(re.escape(literal) for literal in ordered)
+        self._prefilter = re.compile(alternatives) if ordered else None
+        self._prefilter_ci = re.compile(f"(?=(?:{alternatives}))", re.IGNORECASE) if ordered else None
+
+    def _candidate_positions(self, text: str):
+        """Yield ``(position, pattern_indices)`` wherever any literal prefix starts, overlaps included."""
+        folded = text.lower()
+        if len(folded) != len(text):
+            for candidate in self._prefilter_ci.finditer(text):
+                yield candidate.start(), self._all_indexed[0]
+            return
+
+        folded = folded.translate(_CASEFOLD_FIXES)
+        search = self._prefilter.search
+        candidates = self._candidates
+        candidate = search(folded)
+        while candidate:
+            pos = candidate.start()
+            indices, needs_boundary = candidates[candidate.group()]
+            # Cheap \b pre-check; the verifying match in scan() is still authoritative.
+            if not (needs_boundary and pos and (folded[pos - 1].isalnum() or folded[pos - 1] == "_")):
+                yield pos, indices
+            candidate = search(folded, pos + 1)
+
+    def scan(self, text: str) -> list:
+        """
+        Return ``(pattern_index, value)`` for every match of every pattern, ordered by position.
+
+        ``value`` is exactly what ``patterns[pattern_index].findall(text)`` reports for that match.
+        """
+        found = []
+        if self._prefilter is not None:
+            next_allowed = [0] * len(self.patterns)
+            patterns = self.patterns
+            for pos, indices in self._candidate_positions(text):
+                for index in indices:
+                    if pos < next_allowed[index]:
+                        continue  # Still inside this pattern's previous match, as findall would be.
+                    pattern = patterns[index]
+                    match = pattern.match(text, pos)
+                    if match:
+                        next_allowed[index] = max(match.end(), pos + 1)
+                        found.append((pos, index, findall_value(match, pattern.groups)))
+
+        for index in self._standalone:
+            pattern = self.patterns[index]
+            for match in pattern.finditer(text):
+                found.append((match.start(), index, findall_value(match, pattern.groups)))
+
+        found.sort(key=lambda item: (item[0], item[1]))
+        return [(index, value) for _, index, value in found]
+
+    def findall(self, text: str) -> list:
+        """Return the matches of all patterns, like concatenating each pattern's ``findall`` results."""
+        by_pattern = [[] for _ in self.patterns]
+        for index, value in self.scan(text):
+            by_pattern[index].append(value)
+        return [value for values in by_pattern for value in values]
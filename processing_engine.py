@@ -1,17 +1,26 @@
 # processing_engine.py - Definitive fix for data pipeline and review process.
 
+import os
 import time
 import json
+import sqlite3
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
 import shutil
 
 # Local Imports
-from ocr_utils import process_single_document, _is_ocr_needed
-from data_harvesters import harvest_all_data
-from excel_generator import generate_excel
+from ocr_utils import PDFDocumentSession
+from data_harvesters import harvest_all_data, found_fields, HARVEST_FIELDS
 from custom_exceptions import FileLockError
+from result_cache import open_result_cache
+from result_store import ResultSpillStore
+from timing_utils import StageTimer, sum_stage_timings
 from config import (
-    PDF_TXT_DIR, CACHE_DIR, OUTPUT_DIR, META_COLUMN_NAME, AUTHOR_COLUMN_NAME
+    PDF_TXT_DIR, CACHE_DIR, OUTPUT_DIR, META_COLUMN_NAME, AUTHOR_COLUMN_NAME,
+    PARALLEL_PROCESSING, MAX_WORKERS, OCR_PAGE_WORKERS, OCR_MODE, LAZY_EXTRACTION, TEMPLATE_FILTER,
+    CACHE_PREFETCH_FILES,
 )
 
 def clear_review_folder():
@@ -21,59 +30,122 @@ def clear_review_folder():
             try: f.unlink()
             except OSError as e: print(f"Error deleting review file {f}: {e}")
 
-def get_cache_path(pdf_path: Path) -> Path:
-    """Generate a unique cache file path for a given PDF."""
-    try: return CACHE_DIR / f"{pdf_path.stem}_{pdf_path.stat().st_size}.json"
-    except FileNotFoundError: return CACHE_DIR / f"{pdf_path.stem}_unknown.json"
+_result_cache = open_result_cache(CACHE_DIR)
 
-def process_single_pdf(pdf_path: Path, progress_queue, ignore_cache: bool = False) -> dict:
-    """Processes a single PDF, with robust error handling and review file creation."""
+def _rebind_cached_result(cached_data: dict, pdf_path: Path) -> dict:
+    """Point a cached result at ``pdf_path``; identical content may have been cached under another name."""
+    filename = pdf_path.name
+    cached_data["file_name"] = filename
+    cached_data["Short description"] = f"Processed: {filename}"
+    if cached_data.get("review_info"):
+        cached_data["review_info"]["filename"] = filename
+        cached_data["review_info"]["pdf_path"] = str(pdf_path.resolve())
+    return cached_data
+
+def _new_result(filename: str) -> dict:
+    """Return the default result record for a file before any processing."""
+    return {
+        "file_name": filename,
+        META_COLUMN_NAME: "",
+        AUTHOR_COLUMN_NAME: "",
+        "qa_numbers": "",
+        "processing_status": "Failed",
+        "failure_reason": "",
+        "ocr_used": False,
+        "review_info": None,
+        "Short description": f"Processed: {filename}",
+    }
+
+def process_single_pdf(pdf_path: Path, progress_queue, ignore_cache: bool = False, ocr_workers: int | None = None,
+                       ocr_mode: str | None = None, lazy: bool | None = None) -> dict:
+    """Processes a single PDF, with robust error handling and review file creation.
+
+    ``ocr_workers`` spreads the pages of a scanned PDF over that many processes.
+    ``ocr_mode`` ("document" or "hybrid", default ``OCR_MODE``) picks how OCR is
+    applied; a cached result produced in another mode is not reused.
+    ``lazy`` (default ``LAZY_EXTRACTION``) reads pages in order and stops once
+    models, QA numbers and author have all been seen; ``result["pages_read"]``
+    records how many pages were read either way.
+    Seconds spent per stage are stored in ``result["stage_timings"]`` and sent
+    as a ``stage_timings`` message.
+    """
     pdf_path = Path(pdf_path)
     filename = pdf_path.name
-    cache_path = get_cache_path(pdf_path)
+    timer = StageTimer()
+    ocr_mode = ocr_mode or OCR_MODE
+    lazy = LAZY_EXTRACTION if lazy is None else lazy
 
     progress_queue.put({"type": "log", "msg": f"Starting: {filename}"})
 
-    if not ignore_cache and cache_path.exists():
+    with timer.stage("cache_lookup"):
+        cached_data = None
+        if not ignore_cache:
+            try:
+                cached_data = _result_cache.get(pdf_path)
+            except json.JSONDecodeError:
+                progress_queue.put({"type": "log", "msg": f"Cache corrupt for {filename}, reprocessing."})
+            except (OSError, sqlite3.Error) as e:
+                progress_queue.put({"type": "log", "tag": "warning", "msg": f"Cache lookup failed for {filename}: {e}"})
+
+    if cached_data is not None:
         try:
-            cached_data = json.loads(cache_path.read_text(encoding='utf-8'))
-            if "processing_status" in cached_data and META_COLUMN_NAME in cached_data:
+            if ("processing_status" in cached_data and META_COLUMN_NAME in cached_data
+                    and cached_data.get("ocr_mode", "document") == ocr_mode
+                    and cached_data.get("lazy_extraction", False) == lazy):
                 progress_queue.put({"type": "log", "msg": f"Cache hit for: {filename}"})
+                cached_data = _rebind_cached_result(cached_data, pdf_path)
+                cached_data["stage_timings"] = dict(timer.timings)
+                cached_data.pop("ocr_cache", None)  # No page was OCR'd (or looked up) this time.
+                _report_stage_timings(progress_queue, cached_data)
                 if cached_data.get("review_info"):
                     progress_queue.put({"type": "review_item", "data": cached_data["review_info"]})
                 if cached_data.get("ocr_used"):
                     progress_queue.put({"type": "increment_counter", "counter": "ocr"})
                 progress_queue.put({"type": "file_complete", "status": cached_data["processing_status"]})
                 return cached_data
-        except (json.JSONDecodeError, KeyError):
+        except KeyError:
             progress_queue.put({"type": "log", "msg": f"Cache corrupt for {filename}, reprocessing."})
 
-    result = {
-        "file_name": filename,
-        META_COLUMN_NAME: "",
-        AUTHOR_COLUMN_NAME: "",
-        "qa_numbers": "",
-        "processing_status": "Failed",
-        "failure_reason": "",
-        "ocr_used": False,
-        "review_info": None,
-        "qa_numbers": "",
-        "Short description": f"Processed: {filename}",
-    }
+    result = _new_result(filename)
+    result["ocr_mode"] = ocr_mode
+    result["lazy_extraction"] = lazy
     start_time = time.time()
 
     try:
-        ocr_needed = _is_ocr_needed(str(pdf_path.resolve()))
-        result['ocr_used'] = ocr_needed
-        led_status = "OCR" if ocr_needed else "Processing"
-        progress_queue.put({"type": "status", "msg": f"{led_status}: {filename}", "led": led_status})
-        if ocr_needed: progress_queue.put({"type": "increment_counter", "counter": "ocr"})
+        # One session per file: the PDF is read and parsed once for every check below.
+        with PDFDocumentSession(pdf_path.resolve(), timer=timer, ocr_mode=ocr_mode) as session:
+            is_protected, _, _ = session.check_protection()
+            if lazy:
+                # The OCR decision is made page by page, so nothing is known up front.
+                progress_queue.put({"type": "status", "msg": f"Processing: {filename}", "led": "Processing"})
+                found = found_fields("", filename)
+
+                def enough(page_text):
+                    found.update(found_fields(page_text))
+                    return found >= HARVEST_FIELDS
 
-        status, reason, text = process_single_document(pdf_path)
+                status, reason, text = session.extract_text_lazy(enough)
+                result['ocr_used'] = session.ocr_page_count > 0
+                if result['ocr_used']: progress_queue.put({"type": "increment_counter", "counter": "ocr"})
+            else:
+                ocr_needed = not is_protected and session.ocr_needed()
+                result['ocr_used'] = ocr_needed
+                led_status = "OCR" if ocr_needed else "Processing"
+                progress_queue.put({"type": "status", "msg": f"{led_status}: {filename}", "led": led_status})
+                if ocr_needed: progress_queue.put({"type": "increment_counter", "counter": "ocr"})
+
+                status, reason, text = session.extract_text(ocr_workers=ocr_workers)
+            result["page_count"] = session.opened_page_count
+            result["pages_read"] = session.pages_read
+            result["ocr_page_count"] = session.ocr_page_count
+            if session.ocr_page_stats:
+                result["ocr_pages"] = session.ocr_page_stats
+                result["ocr_cache"] = _page_cache_summary(session.ocr_page_stats)
 
         if status == "success":
             progress_queue.put({"type": "status", "msg": f"Extracting data: {filename}", "led": "AI"})
-            data = harvest_all_data(text, filename)
+            with timer.stage("harvest"):
+                data = harvest_all_data(text, filename)
             result[META_COLUMN_NAME] = data["models"]
             result[AUTHOR_COLUMN_NAME] = data["author"]
             result["qa_numbers"] = data["qa_numbers"]
@@ -84,7 +156,8 @@ def process_single_pdf(pdf_path: Path, progress_queue, ignore_cache: bool = Fals
                 
                 # --- DEFINITIVE FIX: Reliably create the text file for review ---
                 review_txt_path = PDF_TXT_DIR / f"{pdf_path.stem}.txt"
-                review_txt_path.write_text(text, encoding='utf-8')
+                with timer.stage("review_write"):
+                    review_txt_path.write_text(text, encoding='utf-8')
                 
                 # Pass the full path to the text file in the review info
                 result["review_info"] = {
@@ -108,19 +181,159 @@ def process_single_pdf(pdf_path: Path, progress_queue, ignore_cache: bool = Fals
         progress_queue.put({"type": "log", "tag": "error", "msg": f"CRITICAL ERROR on {filename}: {e}"})
 
     result['processing_time'] = time.time() - start_time
+    result["stage_timings"] = timer.timings
     
-    try: cache_path.write_text(json.dumps(result, indent=2), encoding='utf-8')
+    try:
+        with timer.stage("cache_write"): _result_cache.put(pdf_path, result)
     except Exception as e: progress_queue.put({"type": "log", "tag": "warning", "msg": f"Failed to write cache for {filename}: {e}"})
     
+    _report_stage_timings(progress_queue, result)
     progress_queue.put({"type": "file_complete", "status": result["processing_status"]})
     return result
 
+def _report_stage_timings(progress_queue, result: dict):
+    """Send the per-stage timings of one file to the progress queue."""
+    progress_queue.put({
+        "type": "stage_timings", "file": result["file_name"], "timings": result.get("stage_timings", {}),
+        "page_count": result.get("page_count", 0), "ocr_page_count": result.get("ocr_page_count", 0),
+        "pages_read": result.get("pages_read", 0),
+    })
+
+def _page_cache_summary(page_stats: list) -> dict:
+    """Count page OCR cache hits and misses and the OCR time the hits saved."""
+    hits = [info for info in page_stats if info.get("cache") == "hit"]
+    return {
+        "hits": len(hits),
+        "misses": sum(1 for info in page_stats if info.get("cache") == "miss"),
+        "saved_s": sum(info.get("saved_s", 0.0) for info in hits),
+    }
+
+def _report_job_timings(progress_queue, all_results):
+    """Send the stage timings summed over the whole job and log the slowest stage."""
+    counts = {"files": 0, "pages": 0, "pages_read": 0, "ocr_pages": 0}
+    page_cache = {"hits": 0, "misses": 0, "saved_s": 0.0}
+
+    def tally(results):
+        # One pass over the results: a spilled store is read back from disk.
+        for result in results:
+            counts["files"] += 1
+            counts["pages"] += result.get("page_count", 0)
+            counts["pages_read"] += result.get("pages_read", 0)
+            counts["ocr_pages"] += result.get("ocr_page_count", 0)
+            for key, value in (result.get("ocr_cache") or {}).items():
+                page_cache[key] = page_cache.get(key, 0) + value
+            yield result
+
+    totals = sum_stage_timings(tally(all_results))
+    slowest = max(totals, key=totals.get) if totals else None
+    lookups = page_cache["hits"] + page_cache["misses"]
+    page_cache["hit_rate"] = page_cache["hits"] / lookups if lookups else None
+    progress_queue.put({
+        "type": "job_timings", "timings": totals, **counts, "slowest_stage": slowest, "ocr_page_cache": page_cache,
+    })
+    if lookups:
+        progress_queue.put({"type": "log", "msg": (
+            f"OCR page cache: {page_cache['hits']}/{lookups} pages served from cache "
+            f"({page_cache['hit_rate']:.0%}), about {page_cache['saved_s']:.1f}s of OCR saved"
+        )})
+    if slowest:
+        summary = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in sorted(totals.items(), key=lambda kv: -kv[1]))
+        progress_queue.put({"type": "log", "msg": f"Stage timings: {summary}"})
+
+def _process_pdf_worker(pdf_file, relay_queue, ignore_cache: bool, ocr_workers: int | None, ocr_mode: str | None,
+                        lazy: bool | None) -> dict:
+    """Process-pool entry point; progress messages travel back through ``relay_queue``."""
+    return process_single_pdf(pdf_file, relay_queue, ignore_cache=ignore_cache, ocr_workers=ocr_workers,
+                              ocr_mode=ocr_mode, lazy=lazy)
+
+def _relay_messages(relay_queue, progress_queue):
+    """Forward messages from worker processes to the job's progress queue until ``None`` arrives."""
+    while True:
+        msg = relay_queue.get()
+        if msg is None:
+            break
+        progress_queue.put(msg)
+
+def process_files_parallel(files_to_process, progress_queue, cancel_event, pause_event,
+                           ignore_cache: bool = False, workers: int | None = None,
+                           ocr_workers: int | None = 1, ocr_mode: str | None = None,
+                           lazy: bool | None = None, store=None):
+    """
+    Processes PDFs on a process pool and returns their results in input order.
+
+    If ``store`` is a :class:`ResultSpillStore`, each result is appended to it
+    at its input index as soon as it completes and the store is returned.
+    """
+    workers = max(1, workers or os.cpu_count() or 1)
+    total = len(files_to_process)
+    results = [None] * total if store is None else None
+    completed = 0
+
+    manager = multiprocessing.Manager()
+    relay_queue = manager.Queue()
+    relay = threading.Thread(target=_relay_messages, args=(relay_queue, progress_queue), daemon=True)
+    relay.start()
+    progress_queue.put({"type": "log", "msg": f"Parallel mode: {workers} worker processes."})
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = {}
+            next_index = 0
+            # Keep only a small window of submitted files so pause and cancel take effect quickly.
+            while next_index < total or pending:
+                while pause_event.is_set() and not cancel_event.is_set(): time.sleep(0.5)
+                if cancel_event.is_set():
+                    progress_queue.put({"type": "log", "msg": "Job cancelled."})
+                    for future in pending: future.cancel()
+                    break
+                while next_index < total and len(pending) < workers * 2:
+                    future = executor.submit(
+                        _process_pdf_worker, files_to_process[next_index], relay_queue, ignore_cache, ocr_workers, ocr_mode, lazy
+                    )
+                    pending[future] = next_index
+                    next_index += 1
+
+                done, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = pending.pop(future)
+                    pdf_file = Path(files_to_process[index])
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = _new_result(pdf_file.name)
+                        result["failure_reason"] = f"A critical error occurred: {e}"
+                        result[META_COLUMN_NAME] = "Error: Critical Failure"
+                        progress_queue.put({"type": "log", "tag": "error", "msg": f"CRITICAL ERROR on {pdf_file.name}: {e}"})
+                        progress_queue.put({"type": "file_complete", "status": result["processing_status"]})
+                    if store is None: results[index] = result
+                    else: store.append(result, index=index)
+                    completed += 1
+                    progress_queue.put({"type": "progress", "current": completed, "total": total})
+    finally:
+        # Workers have finished putting messages by now, so the sentinel arrives last.
+        relay_queue.put(None)
+        relay.join()
+        manager.shutdown()
+
+    return store if store is not None else [r for r in results if r is not None]
+
 def run_processing_job(job_info, progress_queue, cancel_event, pause_event):
     """The main orchestrator for a processing job."""
+    # openpyxl is only needed once a job runs; importing it here keeps the engine
+    # (and the worker processes that import it) quick to start.
+    from excel_generator import generate_excel, filter_files_by_template
+
+    # Results go to a spill store so a huge batch does not have to fit in memory.
+    all_results = ResultSpillStore()
     try:
         excel_path = Path(job_info["excel_path"])
         input_path = job_info["input_path"]
         is_rerun = job_info.get("is_rerun", False)
+        parallel = job_info.get("parallel", PARALLEL_PROCESSING)
+        ocr_workers = job_info.get("ocr_workers", OCR_PAGE_WORKERS)
+        ocr_mode = job_info.get("ocr_mode", OCR_MODE)
+        lazy = job_info.get("lazy", LAZY_EXTRACTION)
+        template_filter = job_info.get("template_filter", TEMPLATE_FILTER)
         
         if not is_rerun: clear_review_folder()
         
@@ -131,16 +344,44 @@ def run_processing_job(job_info, progress_queue, cancel_event, pause_event):
 
         progress_queue.put({"type": "log", "msg": f"Found {len(files_to_process)} files."})
 
-        all_results = []
-        for i, pdf_file in enumerate(files_to_process):
-            if cancel_event.is_set(): progress_queue.put({"type": "log", "msg": "Job cancelled."}); break
-            while pause_event.is_set(): time.sleep(0.5)
-            progress_queue.put({"type": "progress", "current": i + 1, "total": len(files_to_process)})
-            result = process_single_pdf(pdf_file, progress_queue, ignore_cache=is_rerun)
-            all_results.append(result)
+        if template_filter:
+            # Files no template row refers to would be processed only to be dropped from the report.
+            files_to_process, skipped = filter_files_by_template(files_to_process, excel_path)
+            if skipped:
+                progress_queue.put({"type": "skipped_files", "files": [Path(f).name for f in skipped]})
+                progress_queue.put({"type": "log", "msg": f"Skipping {len(skipped)} files the template does not refer to."})
+            if not files_to_process:
+                progress_queue.put({"type": "log", "msg": "No PDF files are referenced by the template."}); progress_queue.put({"type": "finish", "status": "No Files"}); return
+
+        if parallel and len(files_to_process) > 1:
+            total_workers = job_info.get("workers") or MAX_WORKERS or os.cpu_count() or 1
+            workers = min(total_workers, len(files_to_process))
+            if "ocr_workers" not in job_info:
+                # A short batch of large scans leaves cores idle; hand them to page-level OCR.
+                ocr_workers = max(1, total_workers // workers)
+            process_files_parallel(
+                files_to_process, progress_queue, cancel_event, pause_event,
+                ignore_cache=is_rerun, workers=workers, ocr_workers=ocr_workers, ocr_mode=ocr_mode, lazy=lazy,
+                store=all_results,
+            )
+        else:
+            for i, pdf_file in enumerate(files_to_process):
+                if cancel_event.is_set(): progress_queue.put({"type": "log", "msg": "Job cancelled."}); break
+                while pause_event.is_set(): time.sleep(0.5)
+                if not is_rerun and i % CACHE_PREFETCH_FILES == 0:
+                    # One batched query per CACHE_PREFETCH_FILES files instead of a lookup per file.
+                    try: _result_cache.prefetch(files_to_process[i:i + CACHE_PREFETCH_FILES])
+                    except (OSError, sqlite3.Error) as e: progress_queue.put({"type": "log", "tag": "warning", "msg": f"Cache prefetch failed: {e}"})
+                progress_queue.put({"type": "progress", "current": i + 1, "total": len(files_to_process)})
+                result = process_single_pdf(pdf_file, progress_queue, ignore_cache=is_rerun, ocr_workers=ocr_workers,
+                                            ocr_mode=ocr_mode, lazy=lazy)
+                all_results.append(result)
 
         if cancel_event.is_set(): progress_queue.put({"type": "finish", "status": "Cancelled"}); return
 
+        if all_results.spilled:
+            progress_queue.put({"type": "log", "msg": f"{len(all_results)} results exceeded the memory budget and were spilled to disk."})
+        _report_job_timings(progress_queue, all_results)
         progress_queue.put({"type": "status", "msg": "Generating Excel report...", "led": "Saving"})
         
         ts = time.strftime("%Y%m%d-%H%M%S")
@@ -159,3 +400,5 @@ def run_processing_job(job_info, progress_queue, cancel_event, pause_event):
     except Exception as e:
         import traceback
         progress_queue.put({"type": "log", "tag": "error", "msg": f"Critical job error: {e}\n{traceback.format_exc()}"}); progress_queue.put({"type": "finish", "status": f"Error: {e}"})
+    finally:
+        all_results.close()
@@ -0,0 +1,487 @@
+# result_cache.py - Content-addressed cache of per-PDF processing results.
+# Results are keyed by a SHA-256 of the file contents, so renamed, copied or
+# re-uploaded PDFs hit the cache while different files that merely share a
+# name and size never collide. A stat-based fingerprint (path, size, mtime)
+# is checked first so unchanged files are not re-hashed on every run; files
+# in the web server's temporary upload folders are fingerprinted in memory only.
+#
+# SQLiteCacheStore keeps results, fingerprints and page OCR text in one
+# database (WAL mode) instead of one JSON file each; open_result_cache() and
+# open_page_cache() pick the backend from RESULT_CACHE_BACKEND and migrate an
+# existing JSON cache into a new database (the JSON files are kept).
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from config import CACHE_DIR, RESULT_CACHE_BACKEND, UPLOAD_DIR_PREFIX
+from logging_utils import setup_logger, log_info
+
+logger = setup_logger("result_cache")
+
+FINGERPRINT_DIR_NAME = "fingerprints"
+HASH_CHUNK_SIZE = 1024 * 1024
+# Fingerprint -> content hash lookups kept in memory; older ones are read back from disk.
+HASH_MEMO_SIZE = 4096
+
+
+def file_fingerprint(pdf_path) -> str:
+    """Return a cheap identity for a file built from its resolved path, size and mtime."""
+    pdf_path = Path(pdf_path).resolve()
+    stat = pdf_path.stat()
+    key = f"{pdf_path}|{stat.st_size}|{stat.st_mtime_ns}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def is_upload_path(pdf_path) -> bool:
+    """Whether ``pdf_path`` is in one of the web server's per-request upload folders, which are deleted after the job.
+
+    Such a path never comes back, so a stored fingerprint for it would never
+    be read again; the caches keep those in memory only.
+    """
+    parent = Path(pdf_path).resolve().parent
+    return parent.name.startswith(UPLOAD_DIR_PREFIX) and parent.parent == Path(tempfile.gettempdir()).resolve()
+
+
+def content_hash(pdf_path) -> str:
+    """Return the SHA-256 hex digest of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _atomic_write_text(path: Path, text: str):
+    """Write ``text`` to ``path`` so concurrent readers never see a partial file."""
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(text, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+class _HashMemo(OrderedDict):
+    """The most recently used ``HASH_MEMO_SIZE`` fingerprint -> content hash pairs."""
+
+    def lookup(self, fingerprint):
+        digest = self.get(fingerprint)
+        if digest is not None:
+            self.move_to_end(fingerprint)
+        return digest
+
+    def remember(self, fingerprint, digest):
+        self[fingerprint] = digest
+        self.move_to_end(fingerprint)
+        if len(self) > HASH_MEMO_SIZE:
+            self.popitem(last=False)
+
+
+class ResultCache:
+    """JSON result cache stored under ``cache_dir`` as ``<content hash>.json``."""
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.fingerprint_dir = self.cache_dir / FINGERPRINT_DIR_NAME
+        self._hashes = _HashMemo()
+
+    def hash_for(self, pdf_path) -> str:
+        """Return the content hash of ``pdf_path``, hashing only when its fingerprint is new."""
+        fingerprint = file_fingerprint(pdf_path)
+        digest = self._hashes.lookup(fingerprint)
+        if digest is not None:
+            return digest
+
+        if is_upload_path(pdf_path):
+            digest = content_hash(pdf_path)
+            self._hashes.remember(fingerprint, digest)
+            return digest
+
+        fingerprint_path = self.fingerprint_dir / fingerprint
+        try:
+            digest = fingerprint_path.read_text(encoding="utf-8").strip()
+        except OSError:
+            digest = ""
+        if len(digest) != 64:
+            digest = content_hash(pdf_path)
+            try:
+                self.fingerprint_dir.mkdir(parents=True, exist_ok=True)
+                _atomic_write_text(fingerprint_path, digest)
+            except OSError:
+                pass  # The fingerprint only saves re-hashing; the cache still works without it.
+
+        self._hashes.remember(fingerprint, digest)
+        return digest
+
+    def path_for(self, pdf_path) -> Path:
+        """Return the cache file that holds the result for ``pdf_path``'s contents."""
+        return self.cache_dir / f"{self.hash_for(pdf_path)}.json"
+
+    def get(self, pdf_path):
+        """Return the cached result for ``pdf_path`` or ``None`` on a miss.
+
+        Raises ``json.JSONDecodeError`` if the cache entry is corrupt.
+        """
+        cache_path = self.path_for(pdf_path)
+        if not cache_path.exists():
+            return None
+        return json.loads(cache_path.read_text(encoding="utf-8"))
+
+    def get_many(self, pdf_paths) -> dict:
+        """Return ``{pdf_path: result}`` for every path with a readable cached result."""
+        found = {}
+        for pdf_path in pdf_paths:
+            try:
+                result = self.get(pdf_path)
+            except (OSError, ValueError):
+                continue
+            if result is not None:
+                found[pdf_path] = result
+        return found
+
+    def prefetch(self, pdf_paths) -> int:
+        """Nothing to batch with one file per entry; lookups stay per file."""
+        return 0
+
+    def put(self, pdf_path, result: dict):
+        """Store ``result`` for ``pdf_path``'s contents."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        _atomic_write_text(self.path_for(pdf_path), json.dumps(result, indent=2))
+
+
+class PageTextCache:
+    """
+    OCR text of single page images, stored under ``cache_dir`` as ``<key[:2]>/<key>.json``.
+
+    Keys come from :meth:`key`: a SHA-256 of the preprocessed page image plus a
+    settings string, so identical pages (cover sheets, disclaimers) OCR'd with
+    the same settings are read back instead of being sent to Tesseract again.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+
+    @staticmethod
+    def key(image, settings: str) -> str:
+        """Return the cache key for a page image (a NumPy array) OCR'd with ``settings``."""
+        digest = hashlib.sha256()
+        digest.update(f"{settings}|{image.shape}|{image.dtype}|".encode("utf-8"))
+        digest.update(memoryview(image).cast("B") if image.flags.c_contiguous else image.tobytes())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str):
+        """Return the stored entry for ``key`` or ``None`` (also for unreadable entries)."""
+        try:
+            return json.loads(self._path(key).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, entry: dict):
+        """Store ``entry`` (at least ``text`` and the OCR ``seconds`` it took) under ``key``."""
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _atomic_write_text(path, json.dumps(entry))
+        except OSError:
+            pass  # A page that cannot be cached is simply OCR'd again next time.
+
+
+CACHE_DB_NAME = "cache.sqlite3"
+SQLITE_BUSY_TIMEOUT_S = 30
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    content_hash TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fingerprints (
+    fingerprint TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS page_texts (
+    page_key TEXT PRIMARY KEY,
+    entry TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+# Set in ``settings`` once a JSON cache folder has been imported into the database.
+MIGRATED_SETTING = "json_cache_migrated"
+
+
+class SQLiteCacheStore:
+    """
+    Results, file fingerprints and page OCR text in a single SQLite database.
+
+    The database runs in WAL mode so readers never block the writer, and every
+    write is its own short transaction, which makes it safe to share between
+    threads and between the worker processes of a parallel job. Connections
+    are opened per process and thread.
+
+    If ``migrate_from`` names a JSON cache folder and the database does not
+    exist yet, that folder is imported on first use. The import is recorded
+    in the database and runs under its write lock, so worker processes that
+    connect at the same time wait for one import instead of each running
+    their own. The JSON files are kept; ``python result_cache.py --remove``
+    deletes them.
+    """
+
+    def __init__(self, db_path, migrate_from=None):
+        self.db_path = Path(db_path)
+        self._migrate_from = migrate_from if not self.db_path.exists() else None
+        self._local = threading.local()
+        self._hashes = _HashMemo()
+        self._prefetched = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), timeout=SQLITE_BUSY_TIMEOUT_S)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        self._local.conn, self._local.pid = conn, os.getpid()
+        if self._migrate_from is not None:
+            cache_dir, self._migrate_from = self._migrate_from, None
+            counts = self._migrate_once(conn, cache_dir)
+            if counts and any(counts.values()):
+                log_info(logger, f"Migrated JSON cache in {cache_dir} into {self.db_path.name}: {counts}")
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
+
+    # --- results ---
+
+    def hash_for(self, pdf_path) -> str:
+        """Return the content hash of ``pdf_path``, hashing only when its fingerprint is new."""
+        fingerprint = file_fingerprint(pdf_path)
+        digest = self._hashes.lookup(fingerprint)
+        if digest is not None:
+            return digest
+        if is_upload_path(pdf_path):
+            digest = content_hash(pdf_path)
+            self._hashes.remember(fingerprint, digest)
+            return digest
+        conn = self._connect()
+        row = conn.execute("SELECT content_hash FROM fingerprints WHERE fingerprint = ?", (fingerprint,)).fetchone()
+        if row:
+            digest = row[0]
+        else:
+            digest = content_hash(pdf_path)
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO fingerprints VALUES (?, ?)", (fingerprint, digest))
+        self._hashes.remember(fingerprint, digest)
+        return digest
+
+    def get(self, pdf_path):
+        """Return the cached result for ``pdf_path`` or ``None`` on a miss.
+
+        Raises ``json.JSONDecodeError`` if the cache entry is corrupt.
+        """
+        digest = self.hash_for(pdf_path)
+        if digest in self._prefetched:
+            text = self._prefetched.pop(digest)
+        else:
+            row = self._connect().execute("SELECT result FROM results WHERE content_hash = ?", (digest,)).fetchone()
+            text = row[0] if row else None
+        return json.loads(text) if text is not None else None
+
+    def get_many(self, pdf_paths) -> dict:
+        """Return ``{pdf_path: result}`` for every path with a cached result, in one query per 500 paths."""
+        digests = {}
+        for pdf_path in pdf_paths:
+            try:
+                digests[pdf_path] = self.hash_for(pdf_path)
+            except OSError:
+                continue
+        found = {}
+        unique = list(set(digests.values()))
+        conn = self._connect()
+        for start in range(0, len(unique), 500):
+            chunk = unique[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            found.update(conn.execute(
+                f"SELECT content_hash, result FROM results WHERE content_hash IN ({placeholders})", chunk
+            ).fetchall())
+        return {pdf_path: json.loads(found[digest]) for pdf_path, digest in digests.items() if digest in found}
+
+    def prefetch(self, pdf_paths) -> int:
+        """
+        Load the cached results of the next batch of files at once; their :meth:`get` calls are served from memory.
+
+        Whatever an earlier batch left unread is dropped, so memory holds one
+        batch at most; callers pass the files they are about to process
+        (``CACHE_PREFETCH_FILES`` at a time), not a whole job.
+        """
+        self._prefetched.clear()
+        found = self.get_many(pdf_paths)
+        for pdf_path, result in found.items():
+            self._prefetched[self.hash_for(pdf_path)] = json.dumps(result)
+        return len(self._prefetched)
+
+    def put(self, pdf_path, result: dict):
+        """Store ``result`` for ``pdf_path``'s contents."""
+        digest = self.hash_for(pdf_path)
+        self._prefetched.pop(digest, None)
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?)", (digest, json.dumps(result), time.time())
+            )
+
+    # --- page OCR text ---
+
+    def get_page(self, key: str):
+        try:
+            row = self._connect().execute("SELECT entry FROM page_texts WHERE page_key = ?", (key,)).fetchone()
+            return json.loads(row[0]) if row else None
+        except (sqlite3.Error, ValueError):
+            return None
+
+    def put_page(self, key: str, entry: dict):
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO page_texts VALUES (?, ?)", (key, json.dumps(entry)))
+        except sqlite3.Error:
+            pass  # A page that cannot be cached is simply OCR'd again next time.
+
+    # --- migration ---
+
+    def _migrate_once(self, conn, cache_dir):
+        """Import ``cache_dir`` unless this database already has; returns the counts, or ``None`` if it was done before."""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM settings WHERE key = ?", (MIGRATED_SETTING,)).fetchone():
+                conn.rollback()
+                return None
+            counts, _ = self._import_json_cache(conn, Path(cache_dir))
+            conn.execute("INSERT OR REPLACE INTO settings VALUES (?, ?)", (MIGRATED_SETTING, str(cache_dir)))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        return counts
+
+    def migrate_json_cache(self, cache_dir, remove: bool = False) -> dict:
+        """
+        Import a JSON cache folder (``<hash>.json``, ``fingerprints/``, ``pages/``).
+
+        Entries already in the database are kept. With ``remove`` the imported
+        files are deleted afterwards. Returns the number of entries read per kind.
+        """
+        conn = self._connect()
+        with conn:
+            counts, imported = self._import_json_cache(conn, Path(cache_dir))
+        if remove:
+            for path in imported:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+        return counts
+
+    @staticmethod
+    def _import_json_cache(conn, cache_dir: Path) -> tuple:
+        """Insert the entries of a JSON cache folder on ``conn``; returns the counts and the files read."""
+        counts = {"results": 0, "fingerprints": 0, "pages": 0}
+        imported = []
+        for path in cache_dir.glob("*.json"):
+            if len(path.stem) != 64:
+                continue  # Not content-addressed (older cache layout); it would never be looked up.
+            try:
+                result = json.loads(path.read_text(encoding="utf-8"))
+                mtime = path.stat().st_mtime
+            except (OSError, ValueError):
+                continue
+            conn.execute("INSERT OR IGNORE INTO results VALUES (?, ?, ?)", (path.stem, json.dumps(result), mtime))
+            counts["results"] += 1
+            imported.append(path)
+        for path in (cache_dir / FINGERPRINT_DIR_NAME).glob("*"):
+            try:
+                digest = path.read_text(encoding="utf-8").strip()
+            except OSError:
+                continue
+            if len(digest) == 64:
+                conn.execute("INSERT OR IGNORE INTO fingerprints VALUES (?, ?)", (path.name, digest))
+                counts["fingerprints"] += 1
+                imported.append(path)
+        for path in (cache_dir / "pages").glob("*/*.json"):
+            try:
+                entry = path.read_text(encoding="utf-8")
+                json.loads(entry)
+            except (OSError, ValueError):
+                continue
+            conn.execute("INSERT OR IGNORE INTO page_texts VALUES (?, ?)", (path.stem, entry))
+            counts["pages"] += 1
+            imported.append(path)
+        return counts, imported
+
+
+class SQLitePageTextCache(PageTextCache):
+    """:class:`PageTextCache` interface on top of a :class:`SQLiteCacheStore`."""
+
+    def __init__(self, store: SQLiteCacheStore):
+        self.store = store
+
+    def get(self, key: str):
+        return self.store.get_page(key)
+
+    def put(self, key: str, entry: dict):
+        self.store.put_page(key, entry)
+
+
+_stores = {}
+
+
+def _sqlite_store(cache_dir) -> SQLiteCacheStore:
+    """Return the shared store for ``cache_dir``; a JSON cache there is imported into a new database."""
+    db_path = Path(cache_dir) / CACHE_DB_NAME
+    if db_path not in _stores:
+        _stores[db_path] = SQLiteCacheStore(db_path, migrate_from=cache_dir)
+    return _stores[db_path]
+
+
+def open_result_cache(cache_dir=CACHE_DIR, backend=None):
+    """Return the result cache for ``cache_dir`` using ``backend`` ("sqlite" or "json", default ``RESULT_CACHE_BACKEND``)."""
+    if (backend or RESULT_CACHE_BACKEND) == "json":
+        return ResultCache(cache_dir)
+    return _sqlite_store(cache_dir)
+
+
+def open_page_cache(cache_dir=CACHE_DIR, backend=None):
+    """Return the page OCR text cache for ``cache_dir`` using the same backend choice."""
+    if (backend or RESULT_CACHE_BACKEND) == "json":
+        return PageTextCache(Path(cache_dir) / "pages")
+    return SQLitePageTextCache(_sqlite_store(cache_dir))
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import the JSON result cache into the SQLite cache.")
+    parser.add_argument("--cache-dir", default=str(CACHE_DIR))
+    parser.add_argument("--remove", action="store_true", help="Delete the JSON files once imported")
+    args = parser.parse_args(argv)
+    store = SQLiteCacheStore(Path(args.cache_dir) / CACHE_DB_NAME)
+    counts = store.migrate_json_cache(args.cache_dir, remove=args.remove)
+    print(f"Imported {counts['results']} results, {counts['fingerprints']} fingerprints "
+          f"and {counts['pages']} page texts into {store.db_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# result_store.py - Bounded-memory accumulation of a job's results.
+# A long job used to keep every result dict in a list until the Excel report
+# was written. ResultSpillStore keeps only the fields the report and the job
+# summary read, holds them in memory up to a budget, and past that spills
+# them to a temporary SQLite file that is read back in chunks.
+import json
+import os
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from config import AUTHOR_COLUMN_NAME, META_COLUMN_NAME, RESULT_MEMORY_BUDGET_MB, RESULT_SPILL_DIR
+
+# Fields read by generate_excel and by the job timing summary; everything else is dropped.
+STORED_FIELDS = (
+    "file_name", META_COLUMN_NAME, AUTHOR_COLUMN_NAME, "qa_numbers", "processing_status",
+    "stage_timings", "page_count", "pages_read", "ocr_page_count", "ocr_cache",
+)
+READ_CHUNK_ROWS = 1000
+# SQLite limits the number of "?" placeholders per statement.
+LOOKUP_CHUNK_KEYS = 500
+
+_SCHEMA = """
+CREATE TABLE results (seq INTEGER PRIMARY KEY, merge_key TEXT NOT NULL, data TEXT NOT NULL);
+CREATE INDEX results_merge_key ON results (merge_key);
+"""
+
+
+def merge_key(file_name) -> str:
+    """The key a result is matched to template rows by (the file stem)."""
+    return Path(str(file_name).strip()).stem
+
+
+class ResultSpillStore:
+    """
+    Append-only store of processing results with a memory budget.
+
+    Results are kept in memory while their serialized size stays under
+    ``budget_mb``. Once it is exceeded everything moves to a temporary SQLite
+    file in ``spill_dir`` and later appends are written there in batches of
+    the same size, so memory stays near the budget however many files a job
+    has. Iteration yields results ordered by ``index`` (append order when no
+    index is given); :meth:`get_many` looks results up by merge key, the
+    highest index winning for duplicate file names, and :meth:`key_counts`
+    lists the keys with how many results share each.
+
+    The temporary file is removed by :meth:`close`; use the store as a
+    context manager.
+    """
+
+    def __init__(self, budget_mb=None, spill_dir=None):
+        budget_mb = RESULT_MEMORY_BUDGET_MB if budget_mb is None else budget_mb
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self.spill_dir = spill_dir if spill_dir is not None else RESULT_SPILL_DIR
+        self.db_path = None
+        self._conn = None
+        self._buffer = []  # (seq, merge_key, result) not yet written to disk
+        self._buffer_bytes = 0
+        self._by_key = {}  # merge_key -> (seq, result); only while in memory
+        self._count = 0
+        self._next_seq = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def spilled(self) -> bool:
+        """True once results have been moved to disk."""
+        return self._conn is not None
+
+    def append(self, result: dict, index: int | None = None):
+        """Store the report fields of ``result`` at position ``index``."""
+        seq = self._next_seq if index is None else index
+        self._next_seq = max(self._next_seq, seq + 1)
+        row = {field: result[field] for field in STORED_FIELDS if field in result}
+        key = merge_key(row["file_name"])
+        self._buffer.append((seq, key, row))
+        self._buffer_bytes += len(json.dumps(row, default=str))
+        self._count += 1
+        if not self.spilled:
+            if key not in self._by_key or self._by_key[key][0] < seq:
+                self._by_key[key] = (seq, row)
+            if self._buffer_bytes > self.budget_bytes:
+                self._spill()
+        elif self._buffer_bytes > self.budget_bytes:
+            self._flush()
+
+    def _spill(self):
+        fd, path = tempfile.mkstemp(prefix="kyo_results_", suffix=".sqlite3", dir=self.spill_dir)
+        os.close(fd)
+        self.db_path = Path(path)
+        self._conn = sqlite3.connect(path)
+        # The file only lives for one job, so durability is not needed.
+        self._conn.execute("PRAGMA journal_mode=OFF")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(f"PRAGMA cache_size=-{max(1, self.budget_bytes // 1024)}")
+        self._conn.executescript(_SCHEMA)
+        self._by_key = {}
+        self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+                    ((seq, key, json.dumps(row, default=str)) for seq, key, row in self._buffer),
+                )
+        self._buffer, self._buffer_bytes = [], 0
+
+    def __iter__(self):
+        for chunk in self.iter_chunks():
+            yield from chunk
+
+    def iter_chunks(self, size: int = READ_CHUNK_ROWS):
+        """Yield lists of at most ``size`` results in index order."""
+        if not self.spilled:
+            rows = [row for _, _, row in sorted(self._buffer, key=lambda entry: entry[0])]
+            for start in range(0, len(rows), size):
+                yield rows[start:start + size]
+            return
+        self._flush()
+        last_seq = -1
+        while True:
+            batch = self._conn.execute(
+                "SELECT seq, data FROM results WHERE seq > ? ORDER BY seq LIMIT ?", (last_seq, size)
+            ).fetchall()
+            if not batch:
+                return
+            last_seq = batch[-1][0]
+            yield [json.loads(data) for _, data in batch]
+
+    def get_many(self, keys) -> dict:
+        """Return ``{merge_key: result}`` for the given keys that have a result."""
+        keys = list(dict.fromkeys(keys))
+        if not self.spilled:
+            return {key: self._by_key[key][1] for key in keys if key in self._by_key}
+        self._flush()
+        found = {}
+        for start in range(0, len(keys), LOOKUP_CHUNK_KEYS):
+            chunk = keys[start:start + LOOKUP_CHUNK_KEYS]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT merge_key, data FROM results WHERE merge_key IN ({placeholders}) ORDER BY seq", chunk
+            )
+            for key, data in rows:
+                found[key] = json.loads(data)
+        return found
+
+    def key_counts(self) -> dict:
+        """Return ``{merge_key: number of results}``, ordered by first index."""
+        if not self.spilled:
+            counts = {}
+            for _, key, _ in sorted(self._buffer, key=lambda entry: entry[0]):
+                counts[key] = counts.get(key, 0) + 1
+            return counts
+        self._flush()
+        rows = self._conn.execute("SELECT merge_key, COUNT(*) FROM results GROUP BY merge_key ORDER BY MIN(seq)")
+        return dict(rows)
+
+    def close(self):
+        """Drop the stored results and delete the spill file, if any."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self.db_path is not None:
+            self.db_path.unlink(missing_ok=True)
+            self.db_path = None
+        self._buffer, self._buffer_bytes, self._by_key = [], 0, {}
@@ -1,21 +1,26 @@
 import os
+import json
 import shutil
 import tempfile
-from flask import Flask, request, abort, send_file, render_template
+from flask import Flask, request, abort, send_file, render_template, jsonify, Response, stream_with_context
 from werkzeug.utils import secure_filename
 
-from backend import process_job
+from backend import process_job, start_job, get_job
+from config import UPLOAD_DIR_PREFIX
 
 app = Flask(__name__, static_folder="web", template_folder="web")
 
+# Seconds between keep-alive comments on an idle event stream.
+SSE_KEEPALIVE_SECONDS = 15
+
 
 @app.route("/")
 def index():
     return render_template("index.html")
 
 
-@app.route("/api/process", methods=["POST"])
-def api_process():
+def _get_uploads():
+    """Return the uploaded template and PDFs, aborting with 400 if either is missing."""
     excel = request.files.get("excel")
     pdfs = request.files.getlist("pdfs[]")
     if not excel or not pdfs:
@@ -24,30 +29,132 @@ def api_process():
             missing_fields.append("excel file")
         if not pdfs:
             missing_fields.append("pdfs[] array")
-        return abort(400, f"Required fields missing: {', '.join(missing_fields)}. Ensure you upload an 'excel' file and a 'pdfs[]' array.")
+        abort(400, f"Required fields missing: {', '.join(missing_fields)}. Ensure you upload an 'excel' file and a 'pdfs[]' array.")
+    return excel, pdfs
 
-    workdir = tempfile.mkdtemp(prefix="qa_tool_")
-    try:
-        excel_fname = secure_filename(excel.filename)
-        excel_path = os.path.join(workdir, excel_fname)
-        excel.save(excel_path)
 
-        pdf_paths = []
-        for f in pdfs:
-            p = os.path.join(workdir, secure_filename(f.filename))
-            f.save(p)
-            pdf_paths.append(p)
+def _save_uploads(workdir, excel, pdfs):
+    """Save the uploads into ``workdir`` and return ``(excel_path, pdf_paths)``."""
+    excel_path = os.path.join(workdir, secure_filename(excel.filename))
+    excel.save(excel_path)
+
+    pdf_paths = []
+    for f in pdfs:
+        p = os.path.join(workdir, secure_filename(f.filename))
+        f.save(p)
+        pdf_paths.append(p)
+    return excel_path, pdf_paths
+
+
+@app.route("/api/process", methods=["POST"])
+def api_process():
+    excel, pdfs = _get_uploads()
+
+    workdir = tempfile.mkdtemp(prefix=UPLOAD_DIR_PREFIX)
+    try:
+        excel_path, pdf_paths = _save_uploads(workdir, excel, pdfs)
 
         _ = process_job(excel_path, pdf_paths)
 
         return send_file(
             excel_path,
             as_attachment=True,
-            download_name=excel_fname,
+            download_name=os.path.basename(excel_path),
         )
     finally:
         shutil.rmtree(workdir, ignore_errors=True)
 
 
+@app.route("/api/jobs", methods=["POST"])
+def api_create_job():
+    """Start a job in the background and return its ID right away."""
+    excel, pdfs = _get_uploads()
+
+    workdir = tempfile.mkdtemp(prefix=UPLOAD_DIR_PREFIX)
+    try:
+        excel_path, pdf_paths = _save_uploads(workdir, excel, pdfs)
+    except Exception:
+        shutil.rmtree(workdir, ignore_errors=True)
+        raise
+
+    job = start_job(excel_path, pdf_paths, workdir=workdir)
+    return jsonify({
+        "job_id": job.id,
+        "status_url": f"/api/jobs/{job.id}",
+        "events_url": f"/api/jobs/{job.id}/events",
+        "result_url": f"/api/jobs/{job.id}/result",
+    }), 202
+
+
+def _job_or_404(job_id):
+    job = get_job(job_id)
+    if job is None:
+        abort(404, f"Unknown job: {job_id}")
+    return job
+
+
+@app.route("/api/jobs/<job_id>")
+def api_job_status(job_id):
+    return jsonify(_job_or_404(job_id).to_dict())
+
+
+@app.route("/api/jobs/<job_id>/events")
+def api_job_events(job_id):
+    """Server-Sent Events stream of the job's progress messages, replayed from the oldest one kept.
+
+    A client that falls behind the kept messages gets a ``resync`` event with
+    the job's current status (as from :func:`api_job_status`) and continues
+    from the oldest message still kept.
+    """
+    job = _job_or_404(job_id)
+    try:
+        index = int(request.headers.get("Last-Event-ID", -1)) + 1
+    except ValueError:
+        index = 0
+
+    def generate(index):
+        while True:
+            start, messages = job.messages_since(index, timeout=SSE_KEEPALIVE_SECONDS)
+            if start > index:
+                data = json.dumps({"type": "resync", "missed": start - index, "status": job.to_dict()}, default=str)
+                yield f"event: resync\ndata: {data}\n\n"
+                index = start
+            if not messages:
+                if job.finished:
+                    return
+                yield ": keep-alive\n\n"
+                continue
+            for msg in messages:
+                data = json.dumps(msg, default=str)
+                yield f"id: {index}\nevent: {msg.get('type', 'message')}\ndata: {data}\n\n"
+                index += 1
+            if job.finished and index >= job.message_count:
+                return
+
+    return Response(
+        stream_with_context(generate(index)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/api/jobs/<job_id>/result")
+def api_job_result(job_id):
+    job = _job_or_404(job_id)
+    if not job.finished:
+        abort(409, "Job is still running.")
+    if not job.result_path or not os.path.exists(job.result_path):
+        abort(404, f"No report was produced (status: {job.status}).")
+    # The job stays available for retried downloads until it is evicted (JOB_TTL_SECONDS / MAX_FINISHED_JOBS).
+    return send_file(job.result_path, as_attachment=True, download_name=os.path.basename(job.result_path))
+
+
+@app.route("/api/jobs/<job_id>/cancel", methods=["POST"])
+def api_job_cancel(job_id):
+    job = _job_or_404(job_id)
+    job.cancel_event.set()
+    return jsonify(job.to_dict())
+
+
 if __name__ == "__main__":
-    app.run(host="127.0.0.1", port=5000)
+    app.run(host="127.0.0.1", port=5000, threaded=True)
@@ -13,6 +13,7 @@ setup(
     entry_points={
         "console_scripts": [
             "kyo-qa=launch:main",
+            "kyo-qa-watch=watch_folder:main",
         ],
     },
 )
@@ -56,3 +56,42 @@ def test_process_job_timeout(monkeypatch):
     monkeypatch.setattr(backend, "Queue", DummyQueue)
     with pytest.raises(RuntimeError):
         backend.process_job("t.xlsx", ["a.pdf"])
+
+
+def _finished_job(finished_at):
+    job = backend.Job("t.xlsx", ["a.pdf"])
+    job.put({"type": "finish", "status": "Complete"})
+    job.finished_at = finished_at
+    return job
+
+
+def test_finished_jobs_expire_and_are_capped(monkeypatch):
+    import time
+
+    monkeypatch.setattr(backend, "_jobs", {})
+    monkeypatch.setattr(backend, "JOB_TTL_SECONDS", 60)
+    monkeypatch.setattr(backend, "MAX_FINISHED_JOBS", 2)
+    now = time.time()
+    expired = _finished_job(now - 120)
+    old, newer, newest = _finished_job(now - 30), _finished_job(now - 20), _finished_job(now - 10)
+    running = backend.Job("t.xlsx", ["a.pdf"])
+    for job in (expired, old, newer, newest, running):
+        backend._jobs[job.id] = job
+
+    assert backend.get_job(expired.id) is None
+    assert backend.get_job(old.id) is None  # over the cap of two finished jobs
+    assert backend.get_job(newer.id) is newer and backend.get_job(newest.id) is newest
+    assert backend.get_job(running.id) is running
+
+
+def test_job_keeps_only_the_last_messages(monkeypatch):
+    monkeypatch.setattr(backend, "JOB_MAX_MESSAGES", 3)
+    job = backend.Job("t.xlsx", ["a.pdf"] * 5)
+    for i in range(5):
+        job.put({"type": "progress", "current": i + 1, "total": 5})
+
+    assert job.message_count == 5 and len(job.messages) == 3
+    start, messages = job.messages_since(0, timeout=0)
+    assert start == 2 and [m["current"] for m in messages] == [3, 4, 5]
+    assert job.messages_since(4, timeout=0) == (4, [{"type": "progress", "current": 5, "total": 5}])
+    assert job.to_dict()["current"] == 5
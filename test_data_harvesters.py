@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+import data_harvesters
+from data_harvesters import HARVEST_FIELDS, PatternRegistry, found_fields, harvest_all_data, harvest_models
+
+
+def test_registry_reloads_only_when_patterns_file_changes(tmp_path, monkeypatch):
+    patterns_file = tmp_path / "custom_patterns.py"
+    patterns_file.write_text("MODEL_PATTERNS = []\n", encoding="utf-8")
+    loads = []
+    monkeypatch.setattr(data_harvesters, "ensure_custom_patterns_file", lambda: loads.append(1) or True)
+
+    registry = PatternRegistry(patterns_file)
+    for _ in range(3):
+        registry.compiled("MODEL_PATTERNS", [r"\bQA-\d+"])
+    assert len(loads) == 1
+
+    # Touching the file without changing its content does not trigger a reload.
+    stat = patterns_file.stat()
+    os.utime(patterns_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    registry.compiled("MODEL_PATTERNS", [r"\bQA-\d+"])
+    assert len(loads) == 1
+
+    patterns_file.write_text("MODEL_PATTERNS = [r'\\bXX-\\d+']\n", encoding="utf-8")
+    os.utime(patterns_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2_000_000_000))
+    registry.compiled("MODEL_PATTERNS", [r"\bQA-\d+"])
+    assert len(loads) == 2
+
+
+def test_registry_returns_compiled_case_insensitive_patterns():
+    compiled = PatternRegistry().compiled("QA_NUMBER_PATTERNS", [r"\bQA-\d+"])
+    assert any(p.pattern == r"\bQA-\d+" and p.findall("see qa-123") == ["qa-123"] for p in compiled)
+
+
+def test_harvest_all_data_finds_models_and_author():
+    text = "Author: Jane Tech\nApplies to TASKalfa 8000i and ECOSYS P3055dn with PF-740.\n"
+    result = harvest_all_data(text, "QA-1234_bulletin.pdf")
+    models = result["models"].split(", ")
+    assert {"TASKalfa 8000i", "ECOSYS P3055dn", "PF-740"} <= set(models)
+    assert result["author"] == "Jane Tech"
+    assert "QA-1234" in result["qa_numbers"]
+
+
+def test_found_fields_reports_what_the_text_yields():
+    assert found_fields("Nothing to see here") == set()
+    assert found_fields("Author: Field Engineering\nFixes for the TASKalfa 3212i") == {"models", "author"}
+    assert found_fields("", "QA-12345 TASKalfa 3212i.pdf") == {"models", "qa_numbers"}
+    assert found_fields("Author: Jane Doe\nTASKalfa 3212i QA-12345") == HARVEST_FIELDS
+
+
+@pytest.mark.parametrize("text", ["TASKalfa 3212i", "ECOSYS P3055dn and PF-791", "Model: ab", "Nothing to see here"])
+def test_found_fields_agrees_with_harvest_models(text):
+    assert ("models" in found_fields(text)) == bool(harvest_models(text, "doc.pdf"))
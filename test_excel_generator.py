@@ -0,0 +1,338 @@
+from pathlib import Path
+
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+
+import excel_generator
+
+
+def _make_template(path: Path, rows: int):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["Short description", "Meta", "Author", "QA Numbers", "Other"])
+    for i in range(rows):
+        ws.append([f"Processed: doc{i}.pdf", "", "", "", f"x{i}"])
+    ws.append(["unmatched.pdf", "", "", "", "y"])
+    wb.save(path)
+
+
+def _results(count: int) -> list:
+    return [
+        {
+            "file_name": f"doc{i}.pdf",
+            "Meta": f"TASKalfa {i}",
+            "Author": "Tech",
+            "qa_numbers": f"QA-{i}",
+            "processing_status": "Success" if i % 2 else "Needs Review",
+        }
+        for i in range(count)
+    ]
+
+
+def test_streaming_output_merges_rows_and_styles(tmp_path):
+    template = tmp_path / "template.xlsx"
+    output = tmp_path / "out.xlsx"
+    _make_template(template, 3)
+
+    excel_generator.generate_excel(_results(3), output, template_path=template, streaming=True)
+
+    ws = openpyxl.load_workbook(output).active
+    rows = list(ws.iter_rows(values_only=True))
+    assert rows[0] == ("Short description", "Meta", "Author", "QA Numbers", "Other")
+    assert rows[2] == ("Processed: doc1.pdf", "TASKalfa 1", "Tech", "QA-1", "x1")
+    assert rows[4] == ("unmatched.pdf", None, None, None, "y")
+    assert ws["A1"].font.bold
+    assert ws["E2"].fill.start_color.rgb.endswith("FFEB9C")
+    assert ws["E3"].fill.start_color.rgb.endswith("C6EFCE")
+
+
+def test_standard_output_writes_qa_numbers_and_uses_last_duplicate(tmp_path):
+    template = tmp_path / "template.xlsx"
+    output = tmp_path / "out.xlsx"
+    _make_template(template, 3)
+    results = _results(3) + [dict(_results(2)[1], Meta="Reprocessed")]
+
+    excel_generator.generate_excel(results, output, template_path=template, streaming=False)
+
+    rows = list(openpyxl.load_workbook(output).active.iter_rows(values_only=True))
+    assert rows[1] == ("Processed: doc0.pdf", "TASKalfa 0", "Tech", "QA-0", "x0")
+    assert rows[2] == ("Processed: doc1.pdf", "Reprocessed", "Tech", "QA-1", "x1")
+
+
+def _make_dated_template(path: Path):
+    """A kb_knowledge-like template: a dated column and a second ``choice_values`` sheet."""
+    import datetime
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Page 1"
+    ws.append(["Short description", "Meta", "Published", "Valid to"])
+    for i in range(2):
+        ws.append([f"Processed: doc{i}.pdf", "", datetime.date(2024, 1, i + 1), datetime.datetime(2030, 12, 31)])
+        ws.cell(row=i + 2, column=3).number_format = "yyyy\\-mm\\-dd"
+        ws.cell(row=i + 2, column=4).number_format = "yyyy\\-mm\\-dd\\ hh:mm:ss"
+    choices = wb.create_sheet("choice_values")
+    choices.append([None, "HTML", "-- None --"])
+    choices.append([None, "Wiki", "General"])
+    wb.save(path)
+
+
+@pytest.mark.parametrize("streaming,style_mode", [(False, "fills"), (True, "fills"), (False, "conditional"),
+                                                   (True, "conditional")])
+def test_output_keeps_number_formats_and_other_sheets(tmp_path, streaming, style_mode):
+    import datetime
+
+    template = tmp_path / "template.xlsx"
+    output = tmp_path / "out.xlsx"
+    _make_dated_template(template)
+
+    excel_generator.generate_excel(_results(2), output, template_path=template, streaming=streaming,
+                                   style_mode=style_mode)
+
+    wb = openpyxl.load_workbook(output)
+    assert wb.sheetnames == ["Page 1", "choice_values"] and wb.active.title == "Page 1"
+    ws = wb["Page 1"]
+    assert ws["B2"].value == "TASKalfa 0 | QA-0"
+    assert ws["C3"].value == datetime.datetime(2024, 1, 2) and ws["C3"].number_format == "yyyy\\-mm\\-dd"
+    assert ws["D2"].number_format == "yyyy\\-mm\\-dd\\ hh:mm:ss"
+    assert list(wb["choice_values"].iter_rows(values_only=True)) == [(None, "HTML", "-- None --"), (None, "Wiki", "General")]
+
+
+def test_merge_report_lists_unmatched_rows_and_results():
+    header = ["Short description", "Meta", "Author", "QA Numbers", "Other"]
+    results = _results(3) + [dict(_results(1)[0], Meta="again"), {"file_name": "orphan.pdf", "Meta": "M"}]
+    merger = excel_generator.TemplateMerger(results, header)
+    rows = [(2, ["processed: doc0.pdf "]), (3, ["doc2.pdf", "old"]), (4, ["nothing.pdf"]), (5, [None])]
+
+    merged = list(merger.merge(rows))
+    report = merger.finish()
+
+    assert merged[0][2] == {1: "again", 2: "Tech", 3: "QA-0"}
+    assert merged[1][1] == ["doc2.pdf", "old", None, None, None] and merged[1][3] == "Needs Review"
+    assert merged[2][2] == {} and merged[2][3] is None
+    assert report.matched_rows == 2
+    assert report.unmatched_rows == [(4, "nothing.pdf")]
+    assert report.unmatched_results == ["doc1", "orphan"]
+    assert report.duplicate_keys == {"doc0": 2}
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_spilled_store_is_merged_in_chunks(tmp_path, monkeypatch, streaming):
+    from result_store import ResultSpillStore
+
+    template = tmp_path / "template.xlsx"
+    output = tmp_path / "out.xlsx"
+    _make_template(template, 5)
+    monkeypatch.setattr(excel_generator, "LOOKUP_CHUNK_ROWS", 2)
+
+    with ResultSpillStore(budget_mb=0, spill_dir=tmp_path) as store:
+        for result in _results(5):
+            store.append(result)
+        assert store.spilled
+        # Both modes look results up in the store LOOKUP_CHUNK_ROWS template rows at a time.
+        lookups = []
+        get_many = store.get_many
+        monkeypatch.setattr(store, "get_many", lambda keys: lookups.append(len(keys)) or get_many(keys))
+        excel_generator.generate_excel(store, output, template_path=template, streaming=streaming, patch=False)
+        assert max(lookups) <= 2
+
+    rows = list(openpyxl.load_workbook(output).active.iter_rows(values_only=True))
+    assert rows[1:6] == [(f"Processed: doc{i}.pdf", f"TASKalfa {i}", "Tech", f"QA-{i}", f"x{i}") for i in range(5)]
+    assert rows[6] == ("unmatched.pdf", None, None, None, "y")
+
+
+@pytest.mark.parametrize("patch", [True, False])
+def test_refresh_updates_only_changed_rows(tmp_path, monkeypatch, patch):
+    template = tmp_path / "template.xlsx"
+    previous = tmp_path / "previous.xlsx"
+    _make_template(template, 4)
+    excel_generator.generate_excel(_results(4), previous, template_path=template, streaming=True)
+
+    if patch:
+        monkeypatch.setattr(excel_generator, "_refresh_excel_openpyxl", None)  # must not be reached
+    changed = {"file_name": "doc2.pdf", "Meta": "ECOSYS P3055dn", "Author": "Field",
+               "qa_numbers": "QA-99", "processing_status": "Failed"}
+    output = tmp_path / "refreshed.xlsx"
+    excel_generator.refresh_excel(previous, [changed], output_path=output, patch=patch)
+
+    before = list(openpyxl.load_workbook(previous).active.iter_rows(values_only=True))
+    ws = openpyxl.load_workbook(output).active
+    after = list(ws.iter_rows(values_only=True))
+    assert after[3] == ("Processed: doc2.pdf", "ECOSYS P3055dn", "Field", "QA-99", "x2")
+    assert after[:3] == before[:3] and after[4:] == before[4:]
+    assert ws["E4"].fill.start_color.rgb.endswith("FFC7CE")
+    assert ws["E3"].fill.start_color.rgb.endswith("C6EFCE")
+
+
+@pytest.mark.parametrize("patch", [True, False])
+def test_refresh_keeps_qa_numbers_and_clears_stale_fills(tmp_path, patch):
+    template = tmp_path / "template.xlsx"
+    report = tmp_path / "report.xlsx"
+    _make_template(template, 2)
+    excel_generator.generate_excel(_results(2), report, template_path=template, streaming=True)
+
+    changed = {"file_name": "doc0.pdf", "Meta": "TASKalfa 0", "Author": "Tech",
+               "qa_numbers": "", "processing_status": "Queued"}
+    excel_generator.refresh_excel(report, [changed], patch=patch)
+
+    ws = openpyxl.load_workbook(report).active
+    assert ws["D2"].value == "QA-0"
+    assert ws["A2"].fill.fill_type is None
+    assert ws["A3"].fill.start_color.rgb.endswith("C6EFCE")
+
+
+def test_repeated_refreshes_reuse_status_styles(tmp_path):
+    import zipfile
+
+    template = tmp_path / "template.xlsx"
+    report = tmp_path / "report.xlsx"
+    _make_template(template, 4)
+    excel_generator.generate_excel(_results(4), report, template_path=template, streaming=True)
+
+    def styles_size():
+        with zipfile.ZipFile(report) as archive:
+            return len(archive.read("xl/styles.xml"))
+
+    sizes = []
+    for status in ("Failed", "Success", "Failed", "Success"):
+        changed = dict(_results(4)[1], processing_status=status)
+        excel_generator.refresh_excel(report, [changed])
+        sizes.append(styles_size())
+    # The first refreshes may add their fills once; after that nothing new is appended.
+    assert sizes[1] == sizes[2] == sizes[3]
+    assert openpyxl.load_workbook(report).active["A3"].fill.start_color.rgb.endswith("C6EFCE")
+
+
+def test_refresh_requires_previous_output(tmp_path):
+    with pytest.raises(excel_generator.ExcelGenerationError):
+        excel_generator.refresh_excel(tmp_path / "missing.xlsx", [])
+
+
+def test_read_template_keys_uses_the_active_sheet(tmp_path):
+    template = tmp_path / "template.xlsx"
+    wb = openpyxl.Workbook()
+    wb.active.append(["Short description"])
+    wb.active.append(["Processed: ignored.pdf"])
+    ws = wb.create_sheet("Articles")
+    ws.append(["Other", "Short description"])
+    ws.append(["a", "Processed: doc1.pdf"])
+    ws.append(["b", None])
+    ws.append(["c", "doc2"])
+    wb.active = 1
+    wb.save(template)
+
+    assert excel_generator.read_template_keys(template) == {"doc1", "doc2"}
+
+    files = [tmp_path / "doc1.pdf", tmp_path / "doc3.pdf", tmp_path / "doc2.pdf"]
+    used, skipped = excel_generator.filter_files_by_template(files, template)
+    assert used == [files[0], files[2]] and skipped == [files[1]]
+
+
+def test_read_template_keys_requires_short_description(tmp_path):
+    template = tmp_path / "template.xlsx"
+    wb = openpyxl.Workbook()
+    wb.active.append(["Meta"])
+    wb.save(template)
+
+    with pytest.raises(excel_generator.ExcelGenerationError):
+        excel_generator.read_template_keys(template)
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_conditional_style_mode_colours_rows_with_rules(tmp_path, streaming):
+    template = tmp_path / "template.xlsx"
+    output = tmp_path / "out.xlsx"
+    _make_template(template, 3)
+
+    excel_generator.generate_excel(_results(3), output, template_path=template, streaming=streaming,
+                                   style_mode="conditional")
+
+    wb = openpyxl.load_workbook(output)
+    ws = wb.active
+    rows = list(ws.iter_rows(values_only=True))
+    assert rows[0][-1] == "Processing Status"
+    assert [row[-1] for row in rows[1:]] == ["Needs Review", "Success", "Needs Review", None]
+    assert ws["B2"].fill.fill_type is None
+    assert ws["A2"].style == "kyo_cell" and ws["A1"].style == "kyo_header"
+
+    (cf,) = list(ws.conditional_formatting)
+    assert str(cf.sqref) == "A2:F5"
+    assert {rule.formula[0] for rule in cf.rules} == {f'$F2="{status}"' for status in excel_generator.STATUS_FILLS}
+
+
+def test_conditional_standard_mode_keeps_template_borders_and_fills(tmp_path):
+    from openpyxl.styles import Border, Side
+
+    template = tmp_path / "template.xlsx"
+    output = tmp_path / "out.xlsx"
+    _make_template(template, 2)
+    wb = openpyxl.load_workbook(template)
+    thin = Side(style="thin")
+    wb.active["E2"].border = Border(left=thin, right=thin)
+    wb.active["E2"].fill = openpyxl.styles.PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
+    wb.save(template)
+
+    excel_generator.generate_excel(_results(2), output, template_path=template, streaming=False,
+                                   style_mode="conditional")
+    ws = openpyxl.load_workbook(output).active
+    assert ws["E2"].border.left.style == "thin"
+    assert ws["E2"].fill.start_color.rgb.endswith("FFFF00")
+    assert ws["E2"].font.name == excel_generator.CELL_FONT.name
+
+    # An output used as the next template does not collect a second set of status rules.
+    again = tmp_path / "again.xlsx"
+    excel_generator.generate_excel(_results(2), again, template_path=output, streaming=False,
+                                   style_mode="conditional")
+    rules = [rule for cf in openpyxl.load_workbook(again).active.conditional_formatting for rule in cf.rules]
+    assert len(rules) == len(excel_generator.STATUS_FILLS)
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_conditional_style_mode_reuses_an_existing_status_column(tmp_path, streaming):
+    template = tmp_path / "template.xlsx"
+    output = tmp_path / "out.xlsx"
+    wb = openpyxl.Workbook()
+    wb.active.append(["Short description", "Meta", "Process Status", "Needs Review"])
+    for i in range(2):
+        wb.active.append([f"Processed: doc{i}.pdf", "", None, None])
+    wb.save(template)
+
+    excel_generator.generate_excel(_results(2), output, template_path=template, streaming=streaming,
+                                   style_mode="conditional")
+
+    ws = openpyxl.load_workbook(output).active
+    rows = list(ws.iter_rows(values_only=True))
+    assert rows[0] == ("Short description", "Meta", "Process Status", "Needs Review")
+    assert [row[2] for row in rows[1:]] == ["Needs Review", "Success"]
+    (cf,) = list(ws.conditional_formatting)
+    assert str(cf.sqref) == "A2:D3"
+    assert '$C2="Success"' in {rule.formula[0] for rule in cf.rules}
+
+
+@pytest.mark.parametrize("patch", [True, False])
+@pytest.mark.parametrize("streaming", [False, True])
+def test_refresh_updates_the_status_column_of_a_conditional_report(tmp_path, streaming, patch):
+    template = tmp_path / "template.xlsx"
+    report = tmp_path / "report.xlsx"
+    _make_template(template, 3)
+    excel_generator.generate_excel(_results(3), report, template_path=template, streaming=streaming,
+                                   style_mode="conditional")
+
+    changed = dict(_results(3)[2], processing_status="Success", qa_numbers="QA-77")
+    excel_generator.refresh_excel(report, [changed], patch=patch)
+
+    ws = openpyxl.load_workbook(report).active
+    assert [row[-1] for row in ws.iter_rows(min_row=2, values_only=True)] == [
+        "Needs Review", "Success", "Success", None
+    ]
+    assert ws["D4"].value == "QA-77"
+    assert ws["A4"].fill.fill_type is None
+    (cf,) = list(ws.conditional_formatting)
+    assert str(cf.sqref) == "A2:F5"
+
+
+def test_unknown_style_mode_is_rejected(tmp_path):
+    with pytest.raises(excel_generator.ExcelGenerationError):
+        excel_generator.generate_excel(_results(1), tmp_path / "out.xlsx", template_path=tmp_path / "t.xlsx",
+                                       style_mode="zebra")
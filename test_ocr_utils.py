@@ -0,0 +1,332 @@
+import pytest
+
+fitz = pytest.importorskip("fitz")
+ocr_utils = pytest.importorskip("ocr_utils")
+np = pytest.importorskip("numpy")
+
+TEXT_PAGE = "Service Bulletin QA-12345 for TASKalfa 3212i. " * 5
+
+
+@pytest.fixture(autouse=True)
+def isolated_page_cache(tmp_path, monkeypatch):
+    """Keep the page OCR cache out of the real cache folder; off unless a test turns it on."""
+    from result_cache import PageTextCache
+
+    monkeypatch.setattr(ocr_utils, "_page_cache", PageTextCache(tmp_path / "page_cache"))
+    monkeypatch.setattr(ocr_utils, "OCR_PAGE_CACHE", False)
+
+
+def _mixed_pdf(path):
+    """Three pages: text, blank (stands in for a scan), text."""
+    doc = fitz.open()
+    for text in (TEXT_PAGE, "", TEXT_PAGE.upper()):
+        page = doc.new_page()
+        if text:
+            page.insert_text((50, 72), text, fontsize=8)
+    doc.save(str(path))
+    doc.close()
+    return path
+
+
+def test_hybrid_mode_ocrs_only_thin_pages(tmp_path, monkeypatch):
+    pdf = _mixed_pdf(tmp_path / "mixed.pdf")
+    requested = []
+
+    def fake_ocr_pages(pdf_path, page_numbers, doc=None, workers=None, page_stats=None):
+        requested.extend(page_numbers)
+        return {page_num: f"OCR text of page {page_num + 1}" for page_num in page_numbers}
+
+    monkeypatch.setattr(ocr_utils, "TESSERACT_AVAILABLE", True)
+    monkeypatch.setattr(ocr_utils, "ocr_pages", fake_ocr_pages)
+
+    with ocr_utils.PDFDocumentSession(pdf, ocr_mode="hybrid") as session:
+        assert session.ocr_needed()
+        status, reason, text = session.extract_text()
+        assert session.ocr_page_count == 1
+
+    assert status == "success" and reason is None
+    assert requested == [1]
+    lines = text.split("\n")
+    assert lines[0].startswith("Service Bulletin") and lines[1] == "OCR text of page 2"
+    assert lines[2].startswith("SERVICE BULLETIN")
+
+
+def test_document_mode_keeps_native_text_without_ocr(tmp_path, monkeypatch):
+    pdf = _mixed_pdf(tmp_path / "mixed.pdf")
+    monkeypatch.setattr(ocr_utils, "ocr_pages", lambda *a, **k: pytest.fail("OCR should not run"))
+
+    with ocr_utils.PDFDocumentSession(pdf, ocr_mode="document") as session:
+        assert not session.ocr_needed()
+        status, _, text = session.extract_text()
+        assert session.ocr_page_count == 0
+    assert status == "success" and "TASKalfa 3212i" in text
+
+
+def test_hybrid_mode_without_tesseract_uses_native_text(tmp_path, monkeypatch):
+    pdf = _mixed_pdf(tmp_path / "mixed.pdf")
+    monkeypatch.setattr(ocr_utils, "TESSERACT_AVAILABLE", False)
+
+    with ocr_utils.PDFDocumentSession(pdf, ocr_mode="hybrid") as session:
+        status, _, text = session.extract_text()
+    assert status == "success" and "QA-12345" in text
+
+
+def _tess_data(words, conf):
+    """Minimal image_to_data dict: ``words`` as (block, par, line, text) on one page."""
+    data = {"text": [], "conf": [], "block_num": [], "par_num": [], "line_num": []}
+    for block, par, line, text in words:
+        for key, value in zip(("block_num", "par_num", "line_num", "text", "conf"), (block, par, line, text, conf)):
+            data[key].append(value)
+    data["text"].append("")  # structural row, ignored
+    data["conf"].append(-1)
+    for key in ("block_num", "par_num", "line_num"):
+        data[key].append(0)
+    return data
+
+
+def test_text_and_confidence_rebuilds_lines_and_paragraphs():
+    data = _tess_data([(1, 1, 1, "Service"), (1, 1, 1, "Bulletin"), (1, 1, 2, "QA-1"), (1, 2, 1, "Models")], 80)
+    text, confidence = ocr_utils._text_and_confidence(data)
+    assert text == "Service Bulletin\nQA-1\n\nModels"
+    assert confidence == 80
+
+
+def test_adaptive_dpi_escalates_only_while_confidence_is_low(tmp_path, monkeypatch):
+    confidences = {150: 40, 200: 85, 300: 95}
+    rendered = []
+
+    def fake_render(page, dpi):
+        rendered.append(dpi)
+        return dpi
+
+    monkeypatch.setattr(ocr_utils, "_render_for_ocr", fake_render)
+    monkeypatch.setattr(ocr_utils.pytesseract, "image_to_data",
+                        lambda dpi, **kwargs: _tess_data([(1, 1, 1, f"dpi{dpi}")], confidences[dpi]))
+    monkeypatch.setattr(ocr_utils, "OCR_DPI_STEPS", (150, 200, 300))
+    monkeypatch.setattr(ocr_utils, "OCR_MIN_CONFIDENCE", 70)
+
+    assert ocr_utils._ocr_page_adaptive(page=None) == ("dpi200", 200, 85)
+    assert rendered == [150, 200]
+
+
+FAKE_TESSERACT = """#!{python}
+import sys
+from pathlib import Path
+images = Path(sys.argv[1]).read_text().split()
+Path(sys.argv[2] + ".txt").write_text("".join(f"text of {{Path(p).stem}}\\f" for p in images))
+with open({calls!r}, "a") as f:
+    f.write(f"{{len(images)}}\\n")
+"""
+
+
+def _blank_pdf(path, pages):
+    doc = fitz.open()
+    for _ in range(pages):
+        doc.new_page(width=100, height=100)
+    doc.save(str(path))
+    doc.close()
+    return path
+
+
+def _fake_tesseract(tmp_path, monkeypatch):
+    """Install a stand-in tesseract that logs its batch sizes to the returned file."""
+    import sys
+
+    calls = tmp_path / "calls.txt"
+    script = tmp_path / "tesseract"
+    script.write_text(FAKE_TESSERACT.format(python=sys.executable, calls=str(calls)))
+    script.chmod(0o755)
+    monkeypatch.setattr(ocr_utils.pytesseract.pytesseract, "tesseract_cmd", str(script))
+    return calls
+
+
+def test_batched_ocr_runs_one_tesseract_per_batch(tmp_path, monkeypatch):
+    calls = _fake_tesseract(tmp_path, monkeypatch)
+    monkeypatch.setattr(ocr_utils, "OCR_BATCH_SIZE", 2)
+    monkeypatch.setattr(ocr_utils, "OCR_ADAPTIVE_DPI", False)
+    pdf = _blank_pdf(tmp_path / "scan.pdf", 5)
+
+    texts = ocr_utils.ocr_pages(pdf, range(5), workers=1)
+
+    assert texts == {i: f"text of page_{i % 2:04d}" for i in range(5)}
+    assert calls.read_text().split() == ["2", "2", "1"]
+
+
+def test_batched_ocr_falls_back_to_per_page(tmp_path, monkeypatch):
+    monkeypatch.setattr(ocr_utils.pytesseract.pytesseract, "tesseract_cmd", str(tmp_path / "missing"))
+    monkeypatch.setattr(ocr_utils, "OCR_BATCH_SIZE", 4)
+    monkeypatch.setattr(ocr_utils, "OCR_ADAPTIVE_DPI", False)
+    monkeypatch.setattr(ocr_utils, "_ocr_page", lambda page, **kwargs: f"page {page.number}")
+    pdf = _blank_pdf(tmp_path / "scan.pdf", 3)
+
+    assert ocr_utils.ocr_pages(pdf, [0, 2], workers=1) == {0: "page 0", 2: "page 2"}
+
+
+@pytest.mark.parametrize("threshold", ["adaptive", "otsu"])
+def test_preprocessor_reuses_buffers_and_binarizes(tmp_path, threshold):
+    pdf = _mixed_pdf(tmp_path / "mixed.pdf")
+    preprocessor = ocr_utils.PagePreprocessor(threshold)
+    with fitz.open(str(pdf)) as doc:
+        first = preprocessor.process(doc[0], 100)
+        assert first.ndim == 2 and set(np.unique(first)) <= {0, 255}
+        assert preprocessor.process(doc[2], 100) is first
+
+
+def test_preprocessor_rejects_unknown_threshold():
+    with pytest.raises(ValueError):
+        ocr_utils.PagePreprocessor("sauvola")
+
+
+def test_page_cache_serves_repeated_pages_without_tesseract(tmp_path, monkeypatch):
+    calls = _fake_tesseract(tmp_path, monkeypatch)
+    monkeypatch.setattr(ocr_utils, "OCR_PAGE_CACHE", True)
+    monkeypatch.setattr(ocr_utils, "OCR_BATCH_SIZE", 2)
+    monkeypatch.setattr(ocr_utils, "OCR_ADAPTIVE_DPI", False)
+    pdf = _blank_pdf(tmp_path / "scan.pdf", 4)  # four identical pages
+
+    stats = []
+    texts = ocr_utils.ocr_pages(pdf, range(4), workers=1, page_stats=stats)
+
+    assert calls.read_text().split() == ["2"]  # only the first batch reached tesseract
+    assert texts[2] == texts[3] == texts[1]  # identical images share one entry
+    assert [info["cache"] for info in stats] == ["miss", "miss", "hit", "hit"]
+    assert all(info["saved_s"] >= 0 for info in stats[2:])
+
+
+def _manual_pdf(path, pages):
+    """A manual whose first page carries every field and the rest is filler."""
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        text = "Author: Field Engineering\nModels: TASKalfa 3212i\nQA-12345" if page_num == 0 else "Filler text. " * 10
+        page.insert_text((50, 72), text, fontsize=8)
+    doc.save(str(path))
+    doc.close()
+    return path
+
+
+def test_lazy_extraction_stops_after_min_pages_once_enough(tmp_path):
+    pdf = _manual_pdf(tmp_path / "manual.pdf", 20)
+    seen = []
+
+    def enough(page_text):
+        seen.append(page_text)
+        return "TASKalfa" in "".join(seen)
+
+    with ocr_utils.PDFDocumentSession(pdf) as session:
+        status, _, text = session.extract_text_lazy(enough, min_pages=3)
+        assert session.pages_read == 3 and session.page_count == 20
+    assert status == "success" and text.startswith("Author: Field Engineering")
+
+
+def test_lazy_extraction_reads_everything_when_never_enough(tmp_path):
+    pdf = _manual_pdf(tmp_path / "manual.pdf", 5)
+    with ocr_utils.PDFDocumentSession(pdf) as session:
+        session.extract_text_lazy(lambda page_text: False, min_pages=1)
+        assert session.pages_read == 5
+
+
+def _corpus_pdf(tmp_path, kind, pages=2):
+    from benchmarks.corpus import build_pdf
+    import random
+
+    return tmp_path / build_pdf(tmp_path / f"{kind}.pdf", kind, random.Random(3), pages=pages)["file"]
+
+
+def test_session_reads_and_opens_the_file_once(tmp_path, monkeypatch):
+    pdf = _mixed_pdf(tmp_path / "mixed.pdf")
+    reads, opens = [], []
+    real_read_bytes, real_open = ocr_utils.Path.read_bytes, fitz.open
+
+    def counting_read_bytes(path):
+        reads.append(path)
+        return real_read_bytes(path)
+
+    def counting_open(*args, **kwargs):
+        opens.append(args)
+        return real_open(*args, **kwargs)
+
+    monkeypatch.setattr(ocr_utils.Path, "read_bytes", counting_read_bytes)
+    monkeypatch.setattr(fitz, "open", counting_open)
+
+    with ocr_utils.PDFDocumentSession(pdf) as session:
+        assert session.check_protection() == (False, "none", None)
+        assert not session.ocr_needed()
+        status, _, _ = session.extract_text()
+        session.page_texts()
+    assert status == "success"
+    assert len(reads) == 1 and len(opens) == 1
+
+
+@pytest.mark.parametrize("pikepdf_available", [True, False])
+def test_session_protection_matches_file_check(tmp_path, monkeypatch, pikepdf_available):
+    if pikepdf_available:
+        pytest.importorskip("pikepdf")
+    monkeypatch.setattr(ocr_utils, "PIKEPDF_AVAILABLE", pikepdf_available)
+    protected, plain = _corpus_pdf(tmp_path, "protected", 1), _corpus_pdf(tmp_path, "text")
+
+    for pdf in (protected, plain):
+        with ocr_utils.PDFDocumentSession(pdf) as session:
+            assert session.check_protection() == ocr_utils.check_pdf_protection(pdf)
+
+    with ocr_utils.PDFDocumentSession(protected) as session:
+        assert session.check_protection()[0]
+        status, reason, text = session.extract_text()
+    assert status == "protected" and reason.startswith("File is password protected") and text == ""
+
+
+def test_session_text_matches_direct_extraction(tmp_path):
+    pdf = _corpus_pdf(tmp_path, "text")
+    with fitz.open(str(pdf)) as doc:
+        expected = "".join(page.get_text() for page in doc)
+
+    status, reason, text = ocr_utils.process_single_document(pdf)
+    assert (status, reason, text) == ("success", None, expected)
+    assert ocr_utils.extract_text_from_pdf(pdf) == expected
+    assert not ocr_utils._is_ocr_needed(str(pdf))
+
+
+def test_session_scanned_pdf_needs_ocr_and_fails_without_tesseract(tmp_path, monkeypatch):
+    monkeypatch.setattr(ocr_utils, "TESSERACT_AVAILABLE", False)
+    pdf = _corpus_pdf(tmp_path, "scanned")
+
+    assert ocr_utils._is_ocr_needed(str(pdf))
+    status, reason, text = ocr_utils.process_single_document(pdf)
+    assert status == "ocr_failed" and "Tesseract" in reason and text == ""
+
+
+def _slow_fake_ocr_page(page, dpi=None, info=None):
+    """Later pages finish first, so results arrive out of page order."""
+    import time
+
+    time.sleep(0.02 * (6 - page.number))
+    if page.number == 4:
+        raise RuntimeError("unreadable page")
+    return f"page {page.number}"
+
+
+def test_parallel_ocr_keeps_page_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(ocr_utils, "TESSERACT_AVAILABLE", True)
+    monkeypatch.setattr(ocr_utils, "OCR_BATCH_SIZE", 0)
+    monkeypatch.setattr(ocr_utils, "OCR_ADAPTIVE_DPI", False)
+    monkeypatch.setattr(ocr_utils, "_ocr_page", _slow_fake_ocr_page)
+    pdf = _blank_pdf(tmp_path / "scan.pdf", 6)
+
+    page_results = ocr_utils._ocr_pages_parallel(str(pdf), [5, 0, 3, 1], workers=3)
+    assert [page_num for page_num, _, _ in page_results] == [0, 1, 3, 5]
+
+    stats = []
+    text, failure = ocr_utils.extract_text_with_ocr(pdf, workers=3, page_stats=stats)
+    assert failure is None
+    # The failing page is left out instead of aborting the rest of the document.
+    assert text == "\n\n".join(f"page {i}" for i in (0, 1, 2, 3, 5))
+    assert [info["page"] for info in stats] == [1, 2, 3, 4, 5, 6]
+
+
+def test_parallel_ocr_without_tesseract_is_skipped(tmp_path, monkeypatch):
+    monkeypatch.setattr(ocr_utils, "TESSERACT_AVAILABLE", False)
+    monkeypatch.setattr(ocr_utils, "ocr_pages", lambda *a, **k: pytest.fail("OCR should not run"))
+    pdf = _blank_pdf(tmp_path / "scan.pdf", 3)
+
+    text, failure = ocr_utils.extract_text_with_ocr(pdf, workers=2)
+    assert text == "" and "Tesseract" in failure
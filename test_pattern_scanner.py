@@ -0,0 +1,64 @@
+import random
+import re
+
+from config import MODEL_PATTERNS, QA_NUMBER_PATTERNS
+from pattern_scanner import PatternScanner
+import custom_patterns
+
+
+def _per_pattern(patterns, text):
+    return [(i, m) for i, p in enumerate(patterns) for m in p.findall(text)]
+
+
+def _compile(pattern_strings):
+    return [re.compile(p, re.IGNORECASE) for p in pattern_strings]
+
+
+def _assert_same_as_findall(patterns, text):
+    scanner = PatternScanner(patterns)
+    assert sorted(scanner.scan(text), key=repr) == sorted(_per_pattern(patterns, text), key=repr)
+    assert sorted(scanner.findall(text), key=repr) == sorted(
+        [m for p in patterns for m in p.findall(text)], key=repr
+    )
+
+
+def test_matches_per_pattern_findall_on_shipped_patterns():
+    patterns = _compile(custom_patterns.MODEL_PATTERNS + MODEL_PATTERNS + QA_NUMBER_PATTERNS)
+    text = (
+        "TASKalfa 8000i and taskalfa-3212i share PF-740, DF-780; ECOSYS P3055dn, ECOSYS MA2100cfx.\n"
+        "FS-C8025DN KM-2560 KM-C2520E M3655idnf P6235cdn Vi9 QA-12345 SB_678 xQA-1 PF-7a-b\n"
+        "Also mentioned: MK-726, DV-1150 (see QA_2024-01) and JS-5 / AK-740."
+    )
+    _assert_same_as_findall(patterns, text)
+
+
+def test_overlapping_groups_and_unindexed_patterns():
+    patterns = _compile([
+        r"\bKM-\d+",          # literal prefix of the next pattern
+        r"\bKM-C\d+",
+        r"M-C\d",              # starts inside the matches above, no boundary
+        r"\b(PF|DF)-\d+",      # group: findall reports the group
+        r"(\d+)(i|dn)\b",      # no literal prefix: scanned on its own
+        r"^Author:",           # anchored
+        r"C\d",
+    ])
+    text = "Author: KM-C2520 KM-2560 PF-740 xDF-780 8000i 3055dn KM-C3KM-C4"
+    _assert_same_as_findall(patterns, text)
+
+
+def test_random_texts_match_findall():
+    rng = random.Random(7)
+    patterns = _compile(custom_patterns.MODEL_PATTERNS + MODEL_PATTERNS + QA_NUMBER_PATTERNS)
+    pieces = ["TASKalfa", "ECOSYS", "KM-", "C", "FS-", "PF-", "QA", "SB_", "-", " ", "\n", "3", "25", "i",
+              "dn", "cdn", "M", "P", "Vi", "idnf", "x", "_"]
+    for _ in range(200):
+        text = "".join(rng.choice(pieces) for _ in range(rng.randint(1, 60)))
+        _assert_same_as_findall(patterns, text)
+
+
+def test_unicode_case_folding_matches_findall():
+    patterns = _compile([r"\bTASKalfa\s+\d+", r"\bKM-\d+", r"\bSB-\d+", r"\bQA[-_]?[\w-]+"])
+    # U+212A KELVIN SIGN and U+017F LONG S match "k"/"s" under IGNORECASE.
+    _assert_same_as_findall(patterns, "KM-100 ſB-7 TASKalfa 300 qa-1")
+    # U+0130 lower-cases to two characters, which forces the fallback prefilter.
+    _assert_same_as_findall(patterns, "İ KM-100 TASKalfa 8000 QA_İx SB-7")
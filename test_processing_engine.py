@@ -0,0 +1,98 @@
+import importlib
+import queue
+import random
+import sys
+import threading
+
+import pytest
+
+pytest.importorskip("fitz")
+
+from benchmarks.corpus import build_pdf  # noqa: E402
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    """The real processing_engine (test_backend stubs it out) with its folders in ``tmp_path``."""
+    from result_cache import open_result_cache
+
+    monkeypatch.delitem(sys.modules, "processing_engine", raising=False)
+    engine = importlib.import_module("processing_engine")
+    for name in ("cache", "review", "output"):
+        (tmp_path / name).mkdir()
+    monkeypatch.setattr(engine, "_result_cache", open_result_cache(tmp_path / "cache", backend="json"))
+    monkeypatch.setattr(engine, "PDF_TXT_DIR", tmp_path / "review")
+    monkeypatch.setattr(engine, "OUTPUT_DIR", tmp_path / "output")
+    return engine
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    """A manual listed first, then small bulletins, so completion order differs from input order."""
+    rng = random.Random(7)
+    pdf_dir = tmp_path / "pdfs"
+    pdf_dir.mkdir()
+    plan = [("manual", 40)] + [("text", 2)] * 4 + [("protected", 1)]
+    return [pdf_dir / build_pdf(pdf_dir / f"{kind}_{i}.pdf", kind, rng, pages=pages)["file"]
+            for i, (kind, pages) in enumerate(plan)]
+
+
+def _drain(progress_queue) -> list:
+    messages = []
+    while True:
+        try:
+            messages.append(progress_queue.get_nowait())
+        except queue.Empty:
+            return messages
+
+
+def test_parallel_results_keep_input_order(engine, corpus):
+    progress = queue.Queue()
+    results = engine.process_files_parallel(corpus, progress, threading.Event(), threading.Event(), workers=2)
+
+    assert [r["file_name"] for r in results] == [p.name for p in corpus]
+    statuses = {r["file_name"]: r["processing_status"] for r in results}
+    assert statuses["protected_5.pdf"] == "Protected"
+    assert statuses["text_1.pdf"] == "Success"
+
+
+def test_parallel_worker_messages_reach_the_progress_queue(engine, corpus):
+    progress = queue.Queue()
+    engine.process_files_parallel(corpus, progress, threading.Event(), threading.Event(), workers=2)
+    messages = _drain(progress)
+
+    # file_complete and stage_timings are sent from inside the worker processes.
+    assert sum(1 for m in messages if m["type"] == "file_complete") == len(corpus)
+    assert {m["file"] for m in messages if m["type"] == "stage_timings"} == {p.name for p in corpus}
+    progress_counts = [m["current"] for m in messages if m["type"] == "progress"]
+    assert progress_counts == list(range(1, len(corpus) + 1))
+
+
+def test_parallel_cancel_stops_submitting_files(engine, corpus):
+    cancel_event = threading.Event()
+
+    class CancelAfterFirstFile(queue.Queue):
+        def put(self, msg, *args, **kwargs):
+            if msg.get("type") == "progress":
+                cancel_event.set()
+            super().put(msg, *args, **kwargs)
+
+    progress = CancelAfterFirstFile()
+    results = engine.process_files_parallel(corpus, progress, cancel_event, threading.Event(), workers=1)
+    messages = _drain(progress)
+
+    # One worker has at most two files in flight, so the rest are never submitted.
+    assert 1 <= len(results) <= 2
+    assert any(m.get("msg") == "Job cancelled." for m in messages)
+    assert sum(1 for m in messages if m["type"] == "stage_timings") <= 2
+
+
+def test_parallel_results_go_to_a_store_by_input_index(engine, corpus):
+    from result_store import ResultSpillStore
+
+    with ResultSpillStore(budget_mb=0) as store:
+        returned = engine.process_files_parallel(
+            corpus, queue.Queue(), threading.Event(), threading.Event(), workers=2, store=store
+        )
+        assert returned is store and store.spilled
+        assert [r["file_name"] for r in store] == [p.name for p in corpus]
@@ -0,0 +1,174 @@
+import json
+import multiprocessing
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from result_cache import ResultCache, SQLiteCacheStore, content_hash
+
+
+def test_identical_content_shares_cache_entry(tmp_path):
+    cache = ResultCache(tmp_path / "cache")
+    first = tmp_path / "bulletin.pdf"
+    renamed = tmp_path / "uploads" / "renamed.pdf"
+    renamed.parent.mkdir()
+    first.write_bytes(b"%PDF-1.4 same content")
+    renamed.write_bytes(b"%PDF-1.4 same content")
+
+    cache.put(first, {"file_name": first.name, "processing_status": "Success"})
+
+    assert cache.path_for(renamed) == cache.path_for(first)
+    assert cache.get(renamed)["processing_status"] == "Success"
+
+
+def test_same_name_and_size_do_not_collide(tmp_path):
+    cache = ResultCache(tmp_path / "cache")
+    a = tmp_path / "a" / "bulletin.pdf"
+    b = tmp_path / "b" / "bulletin.pdf"
+    a.parent.mkdir()
+    b.parent.mkdir()
+    a.write_bytes(b"%PDF-1.4 AAAA")
+    b.write_bytes(b"%PDF-1.4 BBBB")
+
+    cache.put(a, {"file_name": a.name})
+
+    assert cache.path_for(a) != cache.path_for(b)
+    assert cache.get(b) is None
+
+
+def test_fingerprint_avoids_rehashing(tmp_path, monkeypatch):
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4 content")
+    expected = content_hash(pdf)
+
+    assert ResultCache(tmp_path / "cache").hash_for(pdf) == expected
+
+    import result_cache
+    def fail(_):
+        raise AssertionError("file was re-hashed")
+    monkeypatch.setattr(result_cache, "content_hash", fail)
+
+    # A fresh instance has no in-memory memo, so this must come from the fingerprint file.
+    assert ResultCache(tmp_path / "cache").hash_for(pdf) == expected
+
+
+def test_uploads_get_no_stored_fingerprint(tmp_path):
+    import tempfile
+
+    upload_dir = Path(tempfile.mkdtemp(prefix="qa_tool_"))
+    try:
+        pdf = upload_dir / "upload.pdf"
+        pdf.write_bytes(b"%PDF-1.4 uploaded")
+        cache = ResultCache(tmp_path / "cache")
+        store = SQLiteCacheStore(tmp_path / "cache.sqlite3")
+        assert cache.hash_for(pdf) == store.hash_for(pdf) == content_hash(pdf)
+        store.put(pdf, {"file_name": "upload.pdf"})
+
+        assert not (tmp_path / "cache" / "fingerprints").exists()
+        assert store._connect().execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0] == 0
+        assert store.get(pdf) == {"file_name": "upload.pdf"}
+    finally:
+        shutil.rmtree(upload_dir)
+
+
+def test_sqlite_store_round_trip_and_batched_lookup(tmp_path):
+    store = SQLiteCacheStore(tmp_path / "cache.sqlite3")
+    pdfs = []
+    for i in range(3):
+        pdf = tmp_path / f"doc{i}.pdf"
+        pdf.write_bytes(f"%PDF-1.4 doc {i}".encode())
+        pdfs.append(pdf)
+    store.put(pdfs[0], {"file_name": "doc0.pdf", "processing_status": "Success"})
+    store.put(pdfs[2], {"file_name": "doc2.pdf", "processing_status": "Failed"})
+
+    found = store.get_many(pdfs)
+    assert set(found) == {pdfs[0], pdfs[2]}
+    assert store.get(pdfs[1]) is None
+
+    fresh = SQLiteCacheStore(tmp_path / "cache.sqlite3")
+    assert fresh.prefetch(pdfs) == 2
+    assert fresh.get(pdfs[2])["processing_status"] == "Failed"
+    # The next batch replaces whatever the previous one left unread.
+    assert fresh.prefetch(pdfs[1:2]) == 0
+    assert fresh._prefetched == {}
+    journal_mode = fresh._connect().execute("PRAGMA journal_mode").fetchone()[0]
+    assert journal_mode.lower() == "wal"
+
+
+def _put_many(db_path, pdf_dir, worker):
+    store = SQLiteCacheStore(db_path)
+    for i in range(20):
+        pdf = pdf_dir / f"w{worker}_{i}.pdf"
+        pdf.write_bytes(f"%PDF-1.4 {worker} {i}".encode())
+        store.put(pdf, {"file_name": pdf.name})
+    return worker
+
+
+def test_sqlite_store_accepts_writes_from_many_processes(tmp_path):
+    db_path = tmp_path / "cache.sqlite3"
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        list(executor.map(_put_many, [db_path] * 4, [tmp_path] * 4, range(4)))
+    count = SQLiteCacheStore(db_path)._connect().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+    assert count == 80
+
+
+def test_json_cache_is_migrated_into_new_database(tmp_path):
+    cache_dir = tmp_path / "cache"
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4 legacy")
+    legacy = ResultCache(cache_dir)
+    legacy.put(pdf, {"file_name": "doc.pdf", "processing_status": "Success"})
+    (cache_dir / "pages" / "ab").mkdir(parents=True)
+    (cache_dir / "pages" / "ab" / ("ab" + "0" * 62 + ".json")).write_text(json.dumps({"text": "cover"}))
+
+    store = SQLiteCacheStore(cache_dir / "cache.sqlite3", migrate_from=cache_dir)
+    assert store.get(pdf)["processing_status"] == "Success"
+    assert store.get_page("ab" + "0" * 62) == {"text": "cover"}
+
+    # The JSON files are kept unless removal is asked for explicitly.
+    assert len(list(cache_dir.glob("*.json"))) == 1
+    counts = SQLiteCacheStore(cache_dir / "other.sqlite3").migrate_json_cache(cache_dir, remove=True)
+    assert counts == {"results": 1, "fingerprints": 1, "pages": 1}
+    assert not list(cache_dir.glob("*.json"))
+    assert not list((cache_dir / "pages").glob("*/*.json"))
+
+
+_inherited = {}
+
+
+def _get_in_worker(pdf):
+    return _inherited["store"].get(pdf)["processing_status"]
+
+
+def test_json_cache_is_migrated_once_across_processes(tmp_path):
+    cache_dir = tmp_path / "cache"
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4 legacy")
+    ResultCache(cache_dir).put(pdf, {"file_name": "doc.pdf", "processing_status": "Success"})
+
+    # Created before any connection and inherited by the forked workers, like the engine's shared store.
+    _inherited["store"] = SQLiteCacheStore(cache_dir / "cache.sqlite3", migrate_from=cache_dir)
+    late = SQLiteCacheStore(cache_dir / "cache.sqlite3", migrate_from=cache_dir)
+    with ProcessPoolExecutor(max_workers=4, mp_context=multiprocessing.get_context("fork")) as executor:
+        assert list(executor.map(_get_in_worker, [pdf] * 4)) == ["Success"] * 4
+
+    conn = late._connect()
+    assert late._migrate_once(conn, cache_dir) is None
+    assert conn.execute("SELECT COUNT(*) FROM settings").fetchone()[0] == 1
+    assert (cache_dir / f"{content_hash(pdf)}.json").exists()
+
+
+def test_hash_memo_keeps_only_recent_fingerprints(tmp_path, monkeypatch):
+    import result_cache
+
+    monkeypatch.setattr(result_cache, "HASH_MEMO_SIZE", 2)
+    cache = ResultCache(tmp_path / "cache")
+    pdfs = []
+    for i in range(3):
+        pdfs.append(tmp_path / f"doc{i}.pdf")
+        pdfs[-1].write_bytes(b"%PDF-1.4 " + bytes([i]))
+    digests = [cache.hash_for(pdf) for pdf in pdfs]
+
+    assert len(cache._hashes) == 2
+    assert result_cache.file_fingerprint(pdfs[0]) not in cache._hashes
+    assert cache.hash_for(pdfs[0]) == digests[0]  # read back from its fingerprint file
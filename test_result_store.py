@@ -0,0 +1,48 @@
+from result_store import ResultSpillStore
+
+
+def _result(i: int, **extra) -> dict:
+    return {"file_name": f"doc{i}.pdf", "Meta": f"M{i}", "processing_status": "Success",
+            "page_count": 2, "full_text": "x" * 1000, **extra}
+
+
+def test_small_job_stays_in_memory(tmp_path):
+    with ResultSpillStore(budget_mb=1, spill_dir=tmp_path) as store:
+        for i in range(3):
+            store.append(_result(i))
+        assert not store.spilled and len(store) == 3
+        rows = list(store)
+    assert [row["file_name"] for row in rows] == ["doc0.pdf", "doc1.pdf", "doc2.pdf"]
+    # Only the fields the report and the job summary read are kept.
+    assert "full_text" not in rows[0] and rows[0]["page_count"] == 2
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_spills_past_budget_and_reads_back_in_index_order(tmp_path):
+    store = ResultSpillStore(budget_mb=200 / 2**20, spill_dir=tmp_path)
+    for i in reversed(range(10)):
+        store.append(_result(i), index=i)
+    assert store.spilled and store.db_path.parent == tmp_path
+    assert len(store) == 10
+
+    chunks = list(store.iter_chunks(4))
+    assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+    assert [row["Meta"] for chunk in chunks for row in chunk] == [f"M{i}" for i in range(10)]
+
+    store.close()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_get_many_prefers_the_highest_index_for_duplicate_names(tmp_path):
+    for budget in (1, 0):
+        with ResultSpillStore(budget_mb=budget, spill_dir=tmp_path) as store:
+            store.append(_result(1, Meta="later"), index=5)
+            store.append(_result(1, Meta="earlier"), index=2)
+            store.append(_result(2), index=3)
+            found = store.get_many(["doc1", "doc2", "missing"])
+            assert store.spilled is (budget == 0)
+        assert found == {"doc1": _project("later", 1), "doc2": _project("M2", 2)}
+
+
+def _project(meta: str, i: int) -> dict:
+    return {"file_name": f"doc{i}.pdf", "Meta": meta, "processing_status": "Success", "page_count": 2}
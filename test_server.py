@@ -39,3 +39,68 @@ def test_index_page():
     text = resp.get_data(as_text=True)
     assert "QA Tool" in text
     assert "app.js" in text
+
+
+def test_job_api_streams_progress_and_serves_result(monkeypatch, tmp_path):
+    import backend
+
+    report = tmp_path / "Processed_template.xlsx"
+    report.write_bytes(b"report")
+
+    def fake_run_processing_job(job_info, q, cancel_event, pause_event):
+        q.put({"type": "progress", "current": 1, "total": 1})
+        q.put({"type": "status", "msg": "Processing: a.pdf", "led": "Processing"})
+        q.put({"type": "file_complete", "status": "Success"})
+        q.put({"type": "result_path", "path": str(report)})
+        q.put({"type": "finish", "status": "Complete"})
+
+    monkeypatch.setattr(backend, "run_processing_job", fake_run_processing_job)
+
+    client = server.app.test_client()
+    data = {
+        "excel": (io.BytesIO(b"excel"), "template.xlsx"),
+        "pdfs[]": [(io.BytesIO(b"pdf1"), "a.pdf")],
+    }
+    resp = client.post("/api/jobs", data=data, content_type="multipart/form-data")
+    assert resp.status_code == 202
+    job = resp.get_json()
+
+    events = client.get(job["events_url"]).get_data(as_text=True)
+    assert "event: progress" in events
+    assert "event: file_complete" in events
+    assert events.rstrip().endswith('data: {"type": "finish", "status": "Complete"}')
+
+    status = client.get(job["status_url"]).get_json()
+    assert status["state"] == "finished"
+    assert status["completed"] == 1
+    assert status["result_ready"] is True
+
+    result = client.get(job["result_url"])
+    assert result.status_code == 200
+    assert result.data == b"report"
+
+    # A retried download still works; finished jobs are only dropped by eviction.
+    assert client.get(job["result_url"]).data == b"report"
+    assert client.get(job["status_url"]).status_code == 200
+
+
+def test_job_api_unknown_job():
+    client = server.app.test_client()
+    assert client.get("/api/jobs/missing").status_code == 404
+
+
+def test_job_events_resync_a_stream_that_fell_behind(monkeypatch):
+    import backend
+
+    monkeypatch.setattr(backend, "JOB_MAX_MESSAGES", 2)
+    job = backend.Job("t.xlsx", ["a.pdf"] * 3)
+    for i in range(3):
+        job.put({"type": "progress", "current": i + 1, "total": 3})
+    job.put({"type": "finish", "status": "Complete"})
+    monkeypatch.setattr(server, "get_job", lambda job_id: job)
+
+    events = server.app.test_client().get(f"/api/jobs/{job.id}/events").get_data(as_text=True)
+    assert events.startswith("event: resync\n")
+    assert '"missed": 2' in events and '"current": 3' in events
+    assert "id: 2\nevent: progress" in events
+    assert events.rstrip().endswith('data: {"type": "finish", "status": "Complete"}')
@@ -0,0 +1,63 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from lazy_imports import LazyModule, module_available
+
+ROOT = Path(__file__).resolve().parent
+HEAVY_MODULES = ("fitz", "cv2", "numpy", "pytesseract", "PIL", "pikepdf", "openpyxl", "pandas")
+# Seconds our own modules may add to a cold import, on top of Flask itself.
+IMPORT_BUDGET_S = 0.5
+
+_PROBE = """
+import json, sys, time
+baseline = {baseline!r}
+if baseline:
+    __import__(baseline)
+start = time.perf_counter()
+module = __import__({module!r})
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "elapsed": elapsed,
+    "loaded": [name for name in {heavy!r} if name in sys.modules],
+    "tesseract": getattr(sys.modules.get("ocr_utils"), "TESSERACT_AVAILABLE", "not imported"),
+}}))
+"""
+
+
+def _cold_import(module: str, baseline: str = "") -> dict:
+    """Import ``module`` in a fresh interpreter; ``baseline`` is imported first and not timed."""
+    code = _PROBE.format(module=module, baseline=baseline, heavy=HEAVY_MODULES)
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_server_cold_import_is_light():
+    pytest.importorskip("flask")
+    probe = _cold_import("server", baseline="flask")
+    assert probe["loaded"] == []
+    assert probe["elapsed"] < IMPORT_BUDGET_S
+
+
+def test_engine_import_defers_ocr_libraries_and_tesseract():
+    probe = _cold_import("processing_engine")
+    assert probe["loaded"] == []  # openpyxl included: excel_generator is imported when a job runs.
+    assert probe["tesseract"] is None
+    assert probe["elapsed"] < IMPORT_BUDGET_S
+
+
+def test_lazy_module_imports_on_first_use(monkeypatch):
+    monkeypatch.delitem(sys.modules, "colorsys", raising=False)
+    colorsys = LazyModule("colorsys")
+    assert not colorsys.loaded and "colorsys" not in sys.modules
+    assert colorsys.rgb_to_hsv(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0)
+    assert colorsys.loaded and "colorsys" in sys.modules
+
+    monkeypatch.setattr(colorsys, "ONE_THIRD", 0.5)
+    assert sys.modules["colorsys"].ONE_THIRD == 0.5
+
+    assert module_available("colorsys")
+    assert not module_available("no_such_module_here")
@@ -0,0 +1,26 @@
+import time
+
+from timing_utils import StageTimer, sum_stage_timings
+
+
+def test_nested_stages_are_not_double_counted():
+    timer = StageTimer()
+    with timer.stage("outer"):
+        time.sleep(0.01)
+        with timer.stage("inner"):
+            time.sleep(0.02)
+    assert timer.timings["inner"] >= 0.02
+    assert 0.01 <= timer.timings["outer"] < 0.02 + 0.01
+
+
+def test_repeated_stage_accumulates():
+    timer = StageTimer()
+    for _ in range(3):
+        with timer.stage("step"):
+            pass
+    assert set(timer.timings) == {"step"}
+
+
+def test_sum_stage_timings_skips_missing():
+    results = [{"stage_timings": {"ocr": 1.0, "harvest": 0.5}}, {"stage_timings": {"ocr": 2.0}}, {}]
+    assert sum_stage_timings(results) == {"ocr": 3.0, "harvest": 0.5}
@@ -0,0 +1,169 @@
+import sys
+import threading
+
+import pytest
+
+import watch_folder
+from watch_folder import PollingWatcher, WatchFolder
+
+
+class Recorder:
+    def __init__(self):
+        self.processed = []
+        self.reports = []
+        self.refreshes = []
+
+    def process(self, path, queue):
+        self.processed.append(path.name)
+        return {"file_name": path.name, "processing_status": "Success"}
+
+    def write_report(self, results, output_path, template_path):
+        self.reports.append([r["file_name"] for r in results])
+        output_path.write_bytes(b"report")
+
+    def refresh_report(self, previous_output, results):
+        self.refreshes.append([r["file_name"] for r in results])
+
+
+def _daemon(tmp_path, recorder, **kwargs):
+    kwargs.setdefault("settle_seconds", 0)
+    kwargs.setdefault("flush_seconds", 0)
+    return WatchFolder(
+        tmp_path / "in", tmp_path / "template.xlsx", tmp_path / "out.xlsx",
+        state_path=tmp_path / "state.sqlite3", watcher=PollingWatcher(),
+        process=recorder.process, write_report=recorder.write_report,
+        refresh_report=recorder.refresh_report, **kwargs,
+    )
+
+
+def test_new_files_are_processed_once_settled_and_never_again(tmp_path):
+    (tmp_path / "in").mkdir()
+    (tmp_path / "in" / "a.pdf").write_bytes(b"%PDF-1.4 a")
+    (tmp_path / "in" / "notes.txt").write_text("ignored")
+    recorder = Recorder()
+    daemon = _daemon(tmp_path, recorder)
+
+    assert daemon.run_once() == 0  # First sighting only starts the settle clock.
+    assert daemon.run_once() == 1
+    assert recorder.processed == ["a.pdf"] and recorder.reports == [["a.pdf"]]
+
+    assert daemon.run_once() == 0
+    assert recorder.processed == ["a.pdf"]
+
+    # A restarted daemon picks up the state and still skips the unchanged file.
+    restarted = _daemon(tmp_path, recorder)
+    restarted.run_once()
+    restarted.run_once()
+    assert recorder.processed == ["a.pdf"]
+
+
+def test_changed_and_deleted_files_update_the_report(tmp_path):
+    (tmp_path / "in").mkdir()
+    a, b = tmp_path / "in" / "a.pdf", tmp_path / "in" / "b.pdf"
+    a.write_bytes(b"%PDF-1.4 a")
+    b.write_bytes(b"%PDF-1.4 b")
+    recorder = Recorder()
+    daemon = _daemon(tmp_path, recorder)
+    daemon.run_once()
+    daemon.run_once()
+
+    a.write_bytes(b"%PDF-1.4 a, second revision")
+    daemon.run_once()
+    daemon.run_once()
+    assert recorder.processed == ["a.pdf", "b.pdf", "a.pdf"]
+    assert recorder.reports == [["a.pdf", "b.pdf"]]
+    assert recorder.refreshes == [["a.pdf"]]  # Only the changed row is refreshed.
+
+    b.unlink()
+    daemon.run_once()
+    assert recorder.reports[-1] == ["a.pdf"]  # A deletion needs the full rewrite.
+
+
+def test_files_still_being_written_wait_for_the_settle_time(tmp_path):
+    (tmp_path / "in").mkdir()
+    (tmp_path / "in" / "a.pdf").write_bytes(b"%PDF")
+    recorder = Recorder()
+    daemon = _daemon(tmp_path, recorder, settle_seconds=3600)
+    daemon.run_once()
+    daemon.run_once()
+    assert recorder.processed == []
+
+
+def test_failed_files_are_retried_without_a_new_event(tmp_path):
+    (tmp_path / "in").mkdir()
+    (tmp_path / "in" / "a.pdf").write_bytes(b"%PDF-1.4 a")
+    recorder = Recorder()
+    attempts = []
+
+    def flaky(path, queue):
+        attempts.append(path.name)
+        if len(attempts) == 1:
+            raise OSError("file is locked")
+        return recorder.process(path, queue)
+
+    daemon = _daemon(tmp_path, recorder)
+    daemon._process = flaky
+    daemon.run_once()
+    assert daemon.run_once() == 0 and "a.pdf" in daemon._pending
+
+    # Only the files already pending are checked, as after an inotify wake-up with no events.
+    assert daemon.run_once(changed_names=[]) == 1
+    assert attempts == ["a.pdf", "a.pdf"] and recorder.reports == [["a.pdf"]]
+    assert daemon._pending == {}
+
+
+def test_state_is_saved_per_file_and_survives_a_restart(tmp_path):
+    (tmp_path / "in").mkdir()
+    for name in ("a.pdf", "b.pdf"):
+        (tmp_path / "in" / name).write_bytes(b"%PDF-1.4 " + name.encode())
+    recorder = Recorder()
+    daemon = _daemon(tmp_path, recorder, flush_seconds=3600)
+    daemon.run_once()
+    daemon.run_once()  # a and b are processed and written to the report
+    assert recorder.reports == [["a.pdf", "b.pdf"]]
+    (tmp_path / "in" / "c.pdf").write_bytes(b"%PDF-1.4 c")
+    daemon.run_once()
+    daemon.run_once()  # c is processed and stored; the flush interval has not passed
+    daemon.close()
+
+    files, unflushed, full_rewrite = watch_folder.WatchState(tmp_path / "state.sqlite3").load()
+    assert sorted(files) == ["a.pdf", "b.pdf", "c.pdf"]
+    assert files["c.pdf"]["result"] == {"file_name": "c.pdf", "processing_status": "Success"}
+    assert unflushed == {"c.pdf"} and not full_rewrite
+
+    restarted = _daemon(tmp_path, recorder)
+    restarted.run_once()
+    assert recorder.refreshes[-1] == ["c.pdf"]
+    assert recorder.processed == ["a.pdf", "b.pdf", "c.pdf"]
+
+
+def test_json_state_from_an_earlier_version_is_imported(tmp_path):
+    import json
+
+    (tmp_path / "in").mkdir()
+    pdf = tmp_path / "in" / "a.pdf"
+    pdf.write_bytes(b"%PDF-1.4 a")
+    stat = pdf.stat()
+    legacy = tmp_path / "state.json"
+    legacy.write_text(json.dumps({
+        "files": {"a.pdf": {"signature": [stat.st_size, stat.st_mtime_ns], "result": {"file_name": "a.pdf"}}},
+        "unflushed": [], "full_rewrite": False,
+    }))
+    recorder = Recorder()
+    daemon = _daemon(tmp_path, recorder)
+    daemon.run_once()
+    daemon.run_once()
+
+    assert recorder.processed == [] and not legacy.exists()
+    assert list(daemon.files) == ["a.pdf"]
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux only")
+def test_inotify_watcher_reports_changed_names(tmp_path):
+    watcher = watch_folder.InotifyWatcher(tmp_path)
+    try:
+        assert watcher.wait(0) == set()
+        threading.Timer(0.05, (tmp_path / "new.pdf").write_bytes, args=(b"%PDF",)).start()
+        assert "new.pdf" in watcher.wait(5)
+    finally:
+        watcher.close()
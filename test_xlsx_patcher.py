@@ -0,0 +1,91 @@
+import re
+import zipfile
+from pathlib import Path
+
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+
+import excel_generator
+from custom_exceptions import XlsxPatchError
+from xlsx_patcher import column_index, column_letters, patch_workbook
+
+SAMPLE_TEMPLATE = Path(__file__).parent / "Sample_Set" / "kb_knowledge_Ref.xlsx"
+ROW_RE = re.compile(rb'<row r="(\d+)".*?</row>', re.DOTALL)
+
+
+def _rows(data: bytes) -> dict:
+    return {int(m.group(1)): m.group(0) for m in ROW_RE.finditer(data)}
+
+
+def test_column_names_round_trip():
+    for index in (0, 25, 26, 29, 701, 702):
+        assert column_index(column_letters(index)) == index
+    assert column_letters(29) == "AD"
+
+
+def test_patch_rewrites_only_matched_rows_of_the_sample_template(tmp_path):
+    ws = openpyxl.load_workbook(SAMPLE_TEMPLATE).active
+    header = [c.value for c in ws[1]]
+    desc = ws.cell(row=3, column=header.index("Short description") + 1).value
+    output = tmp_path / "out.xlsx"
+    result = {"file_name": f"{desc}.pdf", "Meta": "TASKalfa 8000i <new>", "Author": "Field & Co",
+              "qa_numbers": "QA-1", "processing_status": "Success"}
+
+    excel_generator.generate_excel([result], output, template_path=SAMPLE_TEMPLATE, patch=True)
+
+    with zipfile.ZipFile(SAMPLE_TEMPLATE) as before, zipfile.ZipFile(output) as after:
+        assert before.namelist() == after.namelist()
+        changed = [n for n in before.namelist() if before.read(n) != after.read(n)]
+        assert changed == ["xl/worksheets/sheet1.xml", "xl/styles.xml", "xl/sharedStrings.xml"]
+        old_rows = _rows(before.read("xl/worksheets/sheet1.xml"))
+        new_rows = _rows(after.read("xl/worksheets/sheet1.xml"))
+    assert [n for n in old_rows if old_rows[n] != new_rows[n]] == [3]
+
+    ws = openpyxl.load_workbook(output).active
+    row = {h: c for h, c in zip(header, ws[3])}
+    assert row["Meta"].value == "TASKalfa 8000i <new> | QA-1"  # no QA Numbers column
+    assert row["Author"].value == "Field & Co"
+    assert row["Short description"].value == desc
+    assert row["Active"].value is True
+    assert all(c.fill.start_color.rgb.endswith("C6EFCE") for c in ws[3])
+    # The row keeps its own styles apart from the fill.
+    original = openpyxl.load_workbook(SAMPLE_TEMPLATE).active
+    assert ws.cell(row=3, column=2).alignment.vertical == original.cell(row=3, column=2).alignment.vertical
+    assert ws.cell(row=2, column=16).value == original.cell(row=2, column=16).value
+
+
+def test_patch_uses_inline_strings_without_shared_strings(tmp_path):
+    template = tmp_path / "template.xlsx"
+    wb = openpyxl.Workbook()
+    wb.active.append(["Short description", "Meta", "QA Numbers"])
+    wb.active.append(["Processed: doc1.pdf", "old", None])
+    wb.active.append(["Processed: doc2.pdf", None, None])
+    wb.save(template)
+    output = tmp_path / "out.xlsx"
+
+    merger = patch_workbook(template, output,
+                            lambda header: excel_generator.TemplateMerger(
+                                [{"file_name": "doc2.pdf", "Meta": " spaced ", "qa_numbers": "QA-2"}], header))
+
+    assert merger.finish().matched_rows == 1
+    rows = list(openpyxl.load_workbook(output).active.iter_rows(values_only=True))
+    assert rows[1] == ("Processed: doc1.pdf", "old", None)
+    assert rows[2] == ("Processed: doc2.pdf", " spaced ", "QA-2")
+
+
+def test_unpatchable_template_falls_back_to_openpyxl(tmp_path, monkeypatch):
+    template = tmp_path / "template.xlsx"
+    wb = openpyxl.Workbook()
+    wb.active.append(["Short description", "Meta"])
+    wb.active.append(["doc1", None])
+    wb.save(template)
+
+    def refuse(*args, **kwargs):
+        raise XlsxPatchError("unsupported")
+
+    monkeypatch.setattr(excel_generator, "patch_workbook", refuse)
+    output = tmp_path / "out.xlsx"
+    excel_generator.generate_excel([{"file_name": "doc1.pdf", "Meta": "M", "processing_status": "Success"}],
+                                   output, template_path=template, patch=True)
+    assert openpyxl.load_workbook(output).active["B2"].value == "M"
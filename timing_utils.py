@@ -0,0 +1,38 @@
+# timing_utils.py - Lightweight per-stage timing for the processing pipeline.
+import time
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """
+    Accumulates wall-clock seconds per named stage.
+
+    Stages may nest; time spent in an inner stage is only counted there, so
+    the per-stage figures add up to the total without double counting.
+    """
+
+    def __init__(self):
+        self.timings = {}
+        self._nested = []
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        self._nested.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            inner = self._nested.pop()
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed - inner
+            if self._nested:
+                self._nested[-1] += elapsed
+
+
+def sum_stage_timings(results) -> dict:
+    """Add up the ``stage_timings`` of many results into one dict."""
+    totals = {}
+    for result in results:
+        for stage, seconds in (result.get("stage_timings") or {}).items():
+            totals[stage] = totals.get(stage, 0.0) + seconds
+    return totals
@@ -0,0 +1,450 @@
+# watch_folder.py - Watch an intake folder and keep a rolling report up to date.
+# New or changed PDFs are processed through process_single_pdf as soon as they
+# have finished copying (same size and mtime for WATCH_SETTLE_SECONDS), and the
+# output workbook is updated at most every WATCH_FLUSH_SECONDS (only the rows
+# of changed files, via refresh_excel, once it exists). The size and mtime of
+# every processed file are kept in a SQLite state database together with its
+# result, one row per file, so unchanged files are never processed again, even
+# after a restart, and saving state costs one row write per changed file.
+import argparse
+import ctypes
+import ctypes.util
+import hashlib
+import json
+import os
+import select
+import signal
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+
+from config import (
+    CACHE_DIR, OUTPUT_DIR, WATCH_POLL_SECONDS, WATCH_SETTLE_SECONDS, WATCH_FLUSH_SECONDS,
+)
+from logging_utils import setup_logger, log_info, log_warning, log_error
+from result_cache import SQLITE_BUSY_TIMEOUT_S
+
+logger = setup_logger("watch_folder")
+
+# inotify(7) event bits used here.
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class PollingWatcher:
+    """Fallback watcher: sleeps for the timeout and asks for a full rescan."""
+
+    def wait(self, timeout: float):
+        """Return the names that changed, or ``None`` when the whole folder must be rescanned."""
+        time.sleep(timeout)
+        return None
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Linux inotify watcher for one folder, used through ctypes (no extra dependency)."""
+
+    def __init__(self, folder):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self._fd, os.fsencode(str(folder)), WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f"inotify_add_watch failed for {folder}")
+
+    def wait(self, timeout: float):
+        """Return the names that changed within ``timeout`` seconds, or ``None`` after a queue overflow."""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        names = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return names
+            offset = 0
+            while offset < len(data):
+                _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if name:
+                    names.add(os.fsdecode(name))
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def create_watcher(folder, use_inotify: bool | None = None):
+    """Return an :class:`InotifyWatcher` where available, else a :class:`PollingWatcher`."""
+    if use_inotify is None:
+        use_inotify = sys.platform.startswith("linux")
+    if use_inotify:
+        try:
+            return InotifyWatcher(folder)
+        except (OSError, AttributeError) as e:
+            log_warning(logger, f"inotify unavailable ({e}); falling back to polling")
+    return PollingWatcher()
+
+
+class _LogQueue:
+    """Progress queue for the daemon: pipeline log messages go to the log file."""
+
+    def put(self, msg: dict):
+        if msg.get("type") != "log":
+            return
+        if msg.get("tag") == "error":
+            log_error(logger, msg["msg"])
+        else:
+            log_info(logger, msg["msg"])
+
+
+def _signature(stat) -> list:
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def default_state_path(input_dir) -> Path:
+    """State database for ``input_dir`` under ``CACHE_DIR / "watch"``."""
+    key = hashlib.sha1(str(Path(input_dir).resolve()).encode("utf-8")).hexdigest()[:16]
+    return CACHE_DIR / "watch" / f"{key}.sqlite3"
+
+
+_STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    name TEXT PRIMARY KEY,
+    signature TEXT NOT NULL,
+    result TEXT NOT NULL,
+    unflushed INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class WatchState:
+    """
+    The daemon's persistent state: one row per processed file in a SQLite database (WAL mode).
+
+    Every change is written on its own, so saving after a batch costs a row
+    per changed file instead of rewriting the results of every file seen.
+    A JSON state file from an earlier version next to ``db_path`` (same name,
+    ``.json`` suffix) is imported when the database is created, then removed.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        is_new = not self.db_path.exists()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), timeout=SQLITE_BUSY_TIMEOUT_S)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_STATE_SCHEMA)
+        legacy_path = self.db_path.with_suffix(".json")
+        if is_new and legacy_path != self.db_path and legacy_path.exists():
+            self._import_json(legacy_path)
+
+    def _import_json(self, path: Path):
+        try:
+            state = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        unflushed = set(state.get("unflushed", []))
+        with self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", (
+                (name, json.dumps(entry["signature"]), json.dumps(entry["result"]), int(name in unflushed))
+                for name, entry in state.get("files", {}).items()
+            ))
+        self.set_full_rewrite(bool(state.get("full_rewrite")))
+        path.unlink(missing_ok=True)
+        log_info(logger, f"Imported watch state from {path.name} into {self.db_path.name}")
+
+    def load(self) -> tuple:
+        """Return ``(files, unflushed names, full_rewrite)``; ``files`` as kept by :class:`WatchFolder`."""
+        files, unflushed = {}, set()
+        for name, signature, result, pending in self._conn.execute("SELECT * FROM files"):
+            files[name] = {"signature": json.loads(signature), "result": json.loads(result)}
+            if pending:
+                unflushed.add(name)
+        row = self._conn.execute("SELECT value FROM settings WHERE key = 'full_rewrite'").fetchone()
+        return files, unflushed, bool(row and row[0] == "1")
+
+    def record(self, entries):
+        """Store ``(name, signature, result)`` entries as processed but not yet in the workbook."""
+        with self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, 1)", (
+                (name, json.dumps(signature), json.dumps(result, default=str)) for name, signature, result in entries
+            ))
+
+    def remove(self, names):
+        with self._conn:
+            self._conn.executemany("DELETE FROM files WHERE name = ?", ((name,) for name in names))
+
+    def set_full_rewrite(self, value: bool):
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO settings VALUES ('full_rewrite', ?)", ("1" if value else "0",))
+
+    def mark_flushed(self):
+        """Every stored result is in the workbook now."""
+        with self._conn:
+            self._conn.execute("UPDATE files SET unflushed = 0 WHERE unflushed = 1")
+            self._conn.execute("INSERT OR REPLACE INTO settings VALUES ('full_rewrite', '0')")
+
+    def close(self):
+        self._conn.close()
+
+
+class WatchFolder:
+    """
+    Incrementally process the PDFs of ``input_dir`` into a rolling workbook.
+
+    ``process``, ``write_report`` and ``refresh_report`` default to
+    ``process_single_pdf``, ``generate_excel`` and ``refresh_excel``; they are
+    imported on first use. The workbook is written in full the first time and
+    after a file is deleted; otherwise only the changed rows are refreshed.
+    """
+
+    def __init__(self, input_dir, template_path, output_path=None, *, state_path=None,
+                 poll_seconds=WATCH_POLL_SECONDS, settle_seconds=WATCH_SETTLE_SECONDS,
+                 flush_seconds=WATCH_FLUSH_SECONDS, watcher=None, process=None, write_report=None,
+                 refresh_report=None):
+        self.input_dir = Path(input_dir)
+        self.template_path = Path(template_path)
+        self.output_path = Path(output_path) if output_path else OUTPUT_DIR / f"Rolling_{self.template_path.stem}.xlsx"
+        self.state_path = Path(state_path) if state_path else default_state_path(self.input_dir)
+        self.poll_seconds = poll_seconds
+        self.settle_seconds = settle_seconds
+        self.flush_seconds = flush_seconds
+        self.watcher = watcher
+        self._process = process
+        self._write_report = write_report
+        self._refresh_report = refresh_report
+        self.files = {}  # file name -> {"signature": [size, mtime_ns], "result": {...}}
+        self._pending = {}  # file name -> (signature, monotonic time it was first seen)
+        self._changed = set()  # processed since the last flush
+        self._full_rewrite = False
+        self._last_flush = 0.0
+        self._load_state()
+
+    # --- state ---
+
+    def _load_state(self):
+        self.state = WatchState(self.state_path)
+        # Unflushed names are results processed before a restart that never made it into the workbook.
+        self.files, self._changed, self._full_rewrite = self.state.load()
+        if self.files:
+            log_info(logger, f"Loaded watch state for {len(self.files)} files from {self.state_path}")
+
+    def close(self):
+        """Close the state database."""
+        self.state.close()
+
+    # --- scanning ---
+
+    def _stat_pdfs(self, names=None) -> dict:
+        """Return ``name -> signature`` for the PDFs in the folder (or just ``names``)."""
+        found = {}
+        if names is None:
+            with os.scandir(self.input_dir) as entries:
+                for entry in entries:
+                    if entry.name.lower().endswith(".pdf") and entry.is_file():
+                        found[entry.name] = _signature(entry.stat())
+            return found
+        for name in names:
+            if name.lower().endswith(".pdf"):
+                try:
+                    found[name] = _signature((self.input_dir / name).stat())
+                except FileNotFoundError:
+                    pass
+        return found
+
+    def scan(self, changed_names=None) -> list:
+        """
+        Update the pending set and return the names whose files have settled.
+
+        ``changed_names`` limits the check to those files plus the ones already
+        pending; ``None`` rescans the whole folder and also drops deleted files.
+        """
+        now = time.monotonic()
+        names = None if changed_names is None else set(changed_names) | set(self._pending)
+        current = self._stat_pdfs(names)
+
+        checked = current.keys() if names is None else names
+        if names is None:
+            removed = [name for name in self.files if name not in current]
+        else:
+            removed = [name for name in names if name not in current and name in self.files]
+        for name in removed:
+            del self.files[name]
+            self._changed.discard(name)
+            self._full_rewrite = True  # Its row has to go back to the template's values.
+        if removed:
+            self.state.remove(removed)
+            self.state.set_full_rewrite(True)
+        for name in list(self._pending):
+            if name not in current and (names is None or name in names):
+                del self._pending[name]
+
+        ready = []
+        for name in checked:
+            signature = current.get(name)
+            if signature is None:
+                continue
+            known = self.files.get(name)
+            if known and known["signature"] == signature:
+                self._pending.pop(name, None)
+                continue
+            pending = self._pending.get(name)
+            if pending is None or pending[0] != signature:
+                self._pending[name] = (signature, now)  # New or still being written: restart the clock.
+            elif now - pending[1] >= self.settle_seconds:
+                ready.append(name)
+        return sorted(ready)
+
+    # --- processing ---
+
+    def process_ready(self, names) -> int:
+        """Run the pipeline on ``names`` and record their results."""
+        if self._process is None:
+            from processing_engine import process_single_pdf
+            self._process = process_single_pdf
+        processed = []
+        for name in names:
+            signature, _ = self._pending[name]
+            path = self.input_dir / name
+            log_info(logger, f"Processing {name}")
+            try:
+                result = self._process(path, _LogQueue())
+            except Exception as e:
+                # It stays pending, so it is tried again after another settle period
+                # even if no new file event arrives for it.
+                log_error(logger, f"Processing failed for {name}: {e}; retrying in {self.settle_seconds}s")
+                self._pending[name] = (signature, time.monotonic())
+                continue
+            try:
+                current = _signature(path.stat())
+            except FileNotFoundError:
+                self._pending.pop(name, None)
+                continue
+            if current != signature:
+                self._pending[name] = (current, time.monotonic())
+                continue  # Changed while it was processed; do it again once settled.
+            self._pending.pop(name, None)
+            self.files[name] = {"signature": signature, "result": result}
+            self._changed.add(name)
+            processed.append((name, signature, result))
+        if processed:
+            self.state.record(processed)
+        return len(processed)
+
+    def flush(self, force: bool = False) -> bool:
+        """Update the rolling workbook if results changed and the flush interval has passed."""
+        if not (self._changed or self._full_rewrite) or not self.files:
+            return False
+        if not force and time.monotonic() - self._last_flush < self.flush_seconds:
+            return False
+        full = self._full_rewrite or not self.output_path.exists()
+        try:
+            if full:
+                if self._write_report is None:
+                    from excel_generator import generate_excel
+                    self._write_report = generate_excel
+                results = [entry["result"] for _, entry in sorted(self.files.items())]
+                self._write_report(results, self.output_path, template_path=self.template_path)
+            else:
+                if self._refresh_report is None:
+                    from excel_generator import refresh_excel
+                    self._refresh_report = refresh_excel
+                results = [self.files[name]["result"] for name in sorted(self._changed)]
+                self._refresh_report(self.output_path, results)
+        except Exception as e:
+            log_error(logger, f"Could not update {self.output_path.name}: {e}")
+            return False
+        self._changed.clear()
+        self._full_rewrite = False
+        self.state.mark_flushed()
+        self._last_flush = time.monotonic()
+        log_info(logger, f"{'Wrote' if full else 'Refreshed'} {self.output_path} with {len(results)} results")
+        return True
+
+    def run_once(self, changed_names=None) -> int:
+        """One scan / process / flush cycle; returns the number of files processed."""
+        processed = self.process_ready(self.scan(changed_names))
+        self.flush()
+        return processed
+
+    def run(self, stop_event=None):
+        """Watch until ``stop_event`` is set (or forever)."""
+        stop_event = stop_event or threading.Event()
+        self.input_dir.mkdir(parents=True, exist_ok=True)
+        watcher = self.watcher or create_watcher(self.input_dir)
+        log_info(logger, f"Watching {self.input_dir} ({type(watcher).__name__}); report: {self.output_path}")
+        changed = None  # Full scan first.
+        try:
+            while not stop_event.is_set():
+                self.run_once(changed)
+                # Wake up early enough to pick up files that are settling.
+                timeout = min(self.poll_seconds, self.settle_seconds) if self._pending else self.poll_seconds
+                changed = watcher.wait(timeout)
+        finally:
+            self.flush(force=True)
+            if watcher is not self.watcher:
+                watcher.close()
+            self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Watch a folder and keep a rolling KYO QA report up to date.")
+    parser.add_argument("input_dir", help="Folder that receives the PDFs")
+    parser.add_argument("--template", required=True, help="kb_knowledge template workbook")
+    parser.add_argument("--output", help="Rolling report (default: output/Rolling_<template>.xlsx)")
+    parser.add_argument("--state", help="State database (default: under the cache folder)")
+    parser.add_argument("--poll", type=float, default=WATCH_POLL_SECONDS)
+    parser.add_argument("--settle", type=float, default=WATCH_SETTLE_SECONDS)
+    parser.add_argument("--flush", type=float, default=WATCH_FLUSH_SECONDS)
+    parser.add_argument("--polling", action="store_true", help="Poll even where inotify is available")
+    parser.add_argument("--once", action="store_true", help="Process what is there now, write the report and exit")
+    args = parser.parse_args(argv)
+
+    daemon = WatchFolder(
+        args.input_dir, args.template, args.output, state_path=args.state,
+        poll_seconds=args.poll, settle_seconds=args.settle, flush_seconds=args.flush,
+        watcher=PollingWatcher() if args.polling else None,
+    )
+    if args.once:
+        daemon.settle_seconds = 0
+        daemon.scan()  # First sighting of every file ...
+        daemon.process_ready(daemon.scan())  # ... and they count as settled on the second.
+        daemon.flush(force=True)
+        daemon.close()
+        return
+
+    stop_event = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop_event.set())
+    daemon.run(stop_event)
+
+
+if __name__ == "__main__":
+    main()
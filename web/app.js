@@ -2,30 +2,79 @@ document.getElementById("jobForm")
   .addEventListener("submit", async e => {
     e.preventDefault();
     const status = document.getElementById("status");
-    status.textContent = "Processing... please wait.";
+    const button = e.target.querySelector("button[type=submit]");
+    status.textContent = "Uploading...";
+    button.disabled = true;
     try {
-      const resp = await fetch("/api/process", {
+      const resp = await fetch("/api/jobs", {
         method: "POST",
         body: new FormData(e.target),
       });
       if (!resp.ok) {
         status.textContent = `Error: ${await resp.text()}`;
+        button.disabled = false;
         return;
       }
-      const blob = await resp.blob();
-      const url = URL.createObjectURL(blob);
-      const a = document.createElement("a");
-      a.href = url;
-      if (e.target.excel && e.target.excel.files && e.target.excel.files.length > 0) {
-        a.download = e.target.excel.files[0].name;
-        a.textContent = `Download ${a.download}`;
-      } else {
-        status.textContent = "Error: No file selected.";
-        return;
-      }
-      status.innerHTML = "";
-      status.appendChild(a);
+      const job = await resp.json();
+      followJob(job, status, button);
     } catch (err) {
       status.textContent = `Error: ${err.message}`;
+      button.disabled = false;
+    }
+  });
+
+function followJob(job, status, button) {
+  const progress = { current: 0, total: 0, text: "Processing..." };
+  const render = () => {
+    const count = progress.total ? ` (${progress.current}/${progress.total})` : "";
+    status.textContent = `${progress.text}${count}`;
+  };
+  render();
+
+  const events = new EventSource(job.events_url);
+  events.addEventListener("progress", ev => {
+    const msg = JSON.parse(ev.data);
+    progress.current = msg.current;
+    progress.total = msg.total;
+    render();
+  });
+  events.addEventListener("status", ev => {
+    progress.text = JSON.parse(ev.data).msg;
+    render();
+  });
+  // Sent when older messages were dropped before this stream read them.
+  events.addEventListener("resync", ev => {
+    const state = JSON.parse(ev.data).status;
+    progress.current = state.current;
+    progress.total = state.total;
+    render();
+  });
+  const finish = (jobStatus, resultReady) => {
+    events.close();
+    button.disabled = false;
+    if (!resultReady) {
+      status.textContent = `Finished: ${jobStatus}`;
+      return;
     }
+    const a = document.createElement("a");
+    a.href = job.result_url;
+    a.textContent = "Download report";
+    status.innerHTML = "";
+    status.appendChild(a);
+  };
+  events.addEventListener("finish", ev => {
+    const msg = JSON.parse(ev.data);
+    finish(msg.status, msg.status === "Complete");
   });
+  events.onerror = () => {
+    // The browser reconnects on its own; fall back to polling if the job is already done.
+    fetch(job.status_url)
+      .then(resp => resp.json())
+      .then(state => {
+        if (state.state === "finished" && events.readyState !== EventSource.OPEN) {
+          finish(state.status, state.result_ready);
+        }
+      })
+      .catch(() => {});
+  };
+}
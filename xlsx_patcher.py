@@ -0,0 +1,431 @@
+# xlsx_patcher.py - Write results into a copy of the template at the XML level.
+# A kb_knowledge template is a plain sheet where only Meta, Author, QA Numbers
+# and the status fill of matched rows change. Instead of loading it into
+# openpyxl and re-serializing every part, patch_workbook() streams the active
+# sheet's XML row by row, rewrites only the cells that change, appends new
+# strings to sharedStrings.xml and the status fills to styles.xml, and copies
+# every other part of the package unchanged.
+import re
+import shutil
+import tempfile
+import xml.etree.ElementTree as ET
+import zipfile
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from custom_exceptions import XlsxPatchError
+
+SHEET_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+SHARED_STRINGS_PART = "xl/sharedStrings.xml"
+STYLES_PART = "xl/styles.xml"
+READ_CHUNK_BYTES = 1024 * 1024
+
+_ROW_RE = re.compile(r"<row\b([^>]*?)(?:/>|>(.*?)</row>)", re.DOTALL)
+_CELL_RE = re.compile(r"<c\b([^>]*?)(?:/>|>(.*?)</c>)", re.DOTALL)
+_ATTR_RE = re.compile(r'([\w:]+)="([^"]*)"')
+_REF_RE = re.compile(r"([A-Z]+)(\d+)")
+_TEXT_RE = re.compile(r"<t\b[^>]*?(?:/>|>(.*?)</t>)", re.DOTALL)
+_PHONETIC_RE = re.compile(r"<rPh\b.*?</rPh>", re.DOTALL)
+_VALUE_RE = re.compile(r"<v>(.*?)</v>", re.DOTALL)
+_COL_RE = re.compile(r"<col\b([^>]*?)/?>")
+
+
+def active_sheet_part(archive) -> str:
+    """Return the zip member of the workbook's active sheet (what openpyxl's ``active`` opens)."""
+    try:
+        workbook = ET.fromstring(archive.read("xl/workbook.xml"))
+        view = workbook.find(f"{SHEET_NS}bookViews/{SHEET_NS}workbookView")
+        active = int(view.get("activeTab", 0)) if view is not None else 0
+        sheets = workbook.findall(f"{SHEET_NS}sheets/{SHEET_NS}sheet")
+        rel_id = sheets[active].get(f"{_REL_NS}id")
+        rels = ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+        for rel in rels.iter(f"{_PKG_REL_NS}Relationship"):
+            if rel.get("Id") == rel_id:
+                target = rel.get("Target")
+                return target.lstrip("/") if target.startswith("/") else f"xl/{target}"
+    except (KeyError, IndexError, ValueError):
+        pass
+    return "xl/worksheets/sheet1.xml"
+
+
+def has_conditional_formatting(path) -> bool:
+    """Whether the active sheet of the workbook at ``path`` has conditional formatting; the sheet is scanned, not parsed."""
+    marker = b"<conditionalFormatting"
+    with zipfile.ZipFile(path) as archive, archive.open(active_sheet_part(archive)) as sheet:
+        tail = b""
+        while chunk := sheet.read(READ_CHUNK_BYTES):
+            if marker in tail + chunk:
+                return True
+            tail = chunk[-len(marker):]
+    return False
+
+
+def read_shared_strings(archive) -> list:
+    """Return the workbook's shared strings in index order (empty without a sharedStrings part)."""
+    if SHARED_STRINGS_PART not in archive.namelist():
+        return []
+    strings = []
+    with archive.open(SHARED_STRINGS_PART) as part:
+        for _, item in ET.iterparse(part):
+            if item.tag == f"{SHEET_NS}si":
+                # Rich text splits one string over several runs; phonetic hints are not part of it.
+                runs = [item.find(f"{SHEET_NS}t")] + [r.find(f"{SHEET_NS}t") for r in item.findall(f"{SHEET_NS}r")]
+                strings.append("".join(t.text or "" for t in runs if t is not None))
+                item.clear()
+    return strings
+
+
+def column_index(letters: str) -> int:
+    """Zero-based index of a column name such as ``"AD"``."""
+    index = 0
+    for char in letters:
+        index = index * 26 + ord(char) - 64
+    return index - 1
+
+
+def column_letters(index: int) -> str:
+    """Column name of a zero-based column index."""
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def _attrs(text: str) -> dict:
+    return dict(_ATTR_RE.findall(text))
+
+
+def _format_attrs(attrs: dict) -> str:
+    return "".join(f' {name}="{value}"' for name, value in attrs.items())
+
+
+def _unescape(text: str) -> str:
+    return text.replace("&lt;", "<").replace("&gt;", ">").replace("&quot;", '"').replace("&apos;", "'").replace("&amp;", "&")
+
+
+class _SheetPatcher:
+    """Rewrites matched rows of one sheet; collects the new strings and styles it needs."""
+
+    def __init__(self, merger_factory, shared_strings, use_shared_strings: bool, styles):
+        self.merger_factory = merger_factory
+        self.merger = None
+        self.header = None
+        self.shared_strings = shared_strings
+        self.use_shared_strings = use_shared_strings
+        self.string_index = None
+        self.new_strings = []
+        self.string_refs = 0
+        self.styles = styles
+        self.column_styles = {}
+
+    def read_columns(self, prefix: str):
+        """Note the default style of each column from the sheet's ``<cols>``, used for cells that are added."""
+        for col in _COL_RE.finditer(prefix):
+            attrs = _attrs(col.group(1))
+            if "style" in attrs:
+                for index in range(int(attrs["min"]) - 1, int(attrs["max"])):
+                    self.column_styles[index] = attrs["style"]
+
+    def _decode_cell(self, attrs: dict, body: str):
+        kind = attrs.get("t", "n")
+        if kind == "inlineStr":
+            return _unescape("".join(t or "" for t in _TEXT_RE.findall(_PHONETIC_RE.sub("", body))))
+        value = _VALUE_RE.search(body or "")
+        if value is None:
+            return None
+        if kind == "s":
+            return self.shared_strings[int(value.group(1))]
+        return _unescape(value.group(1))
+
+    def _parse_cells(self, row_body: str) -> list:
+        """Return ``[(column, attrs, xml, body)]`` for the cells of a row."""
+        cells, column = [], -1
+        for match in _CELL_RE.finditer(row_body or ""):
+            attrs = _attrs(match.group(1))
+            ref = _REF_RE.fullmatch(attrs.get("r", ""))
+            column = column_index(ref.group(1)) if ref else column + 1
+            cells.append((column, attrs, match.group(0), match.group(2)))
+        return cells
+
+    def _string_value(self, text: str) -> str:
+        if not self.use_shared_strings:
+            space = ' xml:space="preserve"' if text != text.strip() else ""
+            return f'<is><t{space}>{escape(text)}</t></is>'
+        if self.string_index is None:
+            self.string_index = {}
+            for index, value in enumerate(self.shared_strings):
+                self.string_index.setdefault(value, index)
+        index = self.string_index.get(text)
+        if index is None:
+            index = len(self.shared_strings) + len(self.new_strings)
+            self.string_index[text] = index
+            self.new_strings.append(text)
+        self.string_refs += 1
+        return f"<v>{index}</v>"
+
+    def _cell_xml(self, attrs: dict, value) -> str:
+        attrs = {name: v for name, v in attrs.items() if name not in ("t", "cm", "vm", "ph")}
+        if value is None or value == "":
+            return f"<c{_format_attrs(attrs)}/>"
+        if isinstance(value, bool):
+            attrs["t"] = "b"
+            return f"<c{_format_attrs(attrs)}><v>{int(value)}</v></c>"
+        if isinstance(value, (int, float)):
+            return f"<c{_format_attrs(attrs)}><v>{value}</v></c>"
+        attrs["t"] = "s" if self.use_shared_strings else "inlineStr"
+        return f"<c{_format_attrs(attrs)}>{self._string_value(str(value))}</c>"
+
+    def patch_segment(self, segment: str) -> str:
+        """Patch every complete ``<row>`` in ``segment``; text between rows is kept as is."""
+        rows = []
+        for match in _ROW_RE.finditer(segment):
+            row_num = _attrs(match.group(1)).get("r")
+            if row_num is None:
+                raise XlsxPatchError("sheet rows without row numbers are not supported")
+            rows.append((match, int(row_num)))
+        if self.header is None and rows:
+            first, _ = rows[0]
+            values = {}
+            for column, attrs, _, body in self._parse_cells(first.group(2)):
+                values[column] = self._decode_cell(attrs, body)
+            self.header = [values.get(i) for i in range(max(values, default=-1) + 1)]
+            self.merger = self.merger_factory(self.header)
+            rows = rows[1:]
+
+        cells_by_row, row_values = {}, []
+        for match, row_num in rows:
+            cells = self._parse_cells(match.group(2))
+            values = [None] * len(self.header)
+            for column, attrs, _, body in cells:
+                if column < len(values):
+                    values[column] = self._decode_cell(attrs, body)
+            cells_by_row[row_num] = cells
+            row_values.append((row_num, values))
+
+        replacements = {}
+        for row_num, _, updates, status in self.merger.merge(row_values):
+            if updates or self.styles.colors(status):
+                replacements[row_num] = (updates, status)
+
+        out, position = [], 0
+        for match, row_num in rows:
+            if row_num not in replacements:
+                continue
+            out.append(segment[position:match.start()])
+            out.append(self._patch_row(match, row_num, cells_by_row[row_num], *replacements[row_num]))
+            position = match.end()
+        out.append(segment[position:])
+        return "".join(out)
+
+    def _patch_row(self, match, row_num: int, cells: list, updates: dict, status) -> str:
+        row_attrs = _attrs(match.group(1))
+        row_attrs.pop("spans", None)  # an optional hint; cells may be added past it
+        row_style = row_attrs.get("s") if row_attrs.get("customFormat") in ("1", "true") else None
+        fill = self.styles.colors(status)
+        by_column = {column: (attrs, xml, body) for column, attrs, xml, body in cells}
+        columns = set(by_column) | set(updates)
+        if fill:
+            columns |= set(range(len(self.header)))
+
+        out = []
+        for column in sorted(columns):
+            attrs, xml, body = by_column.get(column, (None, None, None))
+            if attrs is None:
+                attrs = {"r": f"{column_letters(column)}{row_num}"}
+                base = row_style or self.column_styles.get(column)
+                if base is not None:
+                    attrs["s"] = base
+            if fill:
+                attrs = dict(attrs, s=self.styles.style_for(attrs.get("s"), status))
+            if column in updates:
+                out.append(self._cell_xml(attrs, updates[column]))
+            elif xml is not None and not fill:
+                out.append(xml)
+            else:
+                inner = f">{body}</c>" if body else "/>"
+                out.append(f"<c{_format_attrs(attrs)}{inner}")
+        return f"<row{_format_attrs(row_attrs)}>{''.join(out)}</row>"
+
+
+class _StatusStyles:
+    """
+    Status fill variants of the template's cell styles, appended to ``styles.xml``.
+
+    A cell keeps its own font, border and number format; it is pointed at a
+    copy of its style (``cellXfs`` entry) whose fill is the status colour. A
+    status whose colour is ``None`` points at the "no fill" entry instead.
+    Fills and styles that ``styles.xml`` already holds - such as those added
+    by an earlier patch of the same workbook - are reused, not appended again.
+    """
+
+    def __init__(self, styles_xml: str | None, status_colors: dict):
+        self.xml = styles_xml
+        self.status_colors = status_colors if styles_xml is not None else {}
+        self.fill_ids = {}  # status -> fillId of its fill
+        self.new_fills = []
+        self.xf_ids = {}  # (base style index, status) -> index of its cellXfs entry
+        self.new_xfs = []
+        if self.status_colors:
+            self.fills = self._items("fills", "fill")
+            self.xfs = self._items("cellXfs", "xf")
+
+    def _items(self, tag: str, item: str) -> list:
+        match = re.search(rf"<{tag}\b[^>]*>(.*?)</{tag}>", self.xml, re.DOTALL)
+        if match is None:
+            raise XlsxPatchError(f"styles.xml has no <{tag}> list")
+        return re.findall(rf"<{item}\b[^>]*?(?:/>|>.*?</{item}>)", match.group(1), re.DOTALL)
+
+    def colors(self, status) -> bool:
+        return status in self.status_colors
+
+    @staticmethod
+    def _index(items: list, new_items: list, item: str) -> int:
+        """Index of ``item`` among the existing and new entries, appending it if it is not there."""
+        all_items = items + new_items
+        if item in all_items:
+            return all_items.index(item)
+        new_items.append(item)
+        return len(all_items)
+
+    def style_for(self, base, status: str) -> str:
+        """Return the index of ``base`` with the fill of ``status``, adding it on first use."""
+        key = (int(base or 0), status)
+        if key not in self.xf_ids:
+            if key[0] >= len(self.xfs):
+                raise XlsxPatchError(f"cell style {key[0]} is not in styles.xml")
+            if status not in self.fill_ids:
+                color = self.status_colors[status]
+                if color is None:
+                    self.fill_ids[status] = 0  # the patternType="none" fill every styles.xml starts with
+                else:
+                    self.fill_ids[status] = self._index(
+                        self.fills,
+                        self.new_fills,
+                        f'<fill><patternFill patternType="solid"><fgColor rgb="{color}"/>'
+                        f'<bgColor rgb="{color}"/></patternFill></fill>',
+                    )
+            xf = self.xfs[key[0]]
+            tag_end = re.match(r"<xf\b[^>]*?(?=/?>)", xf).end()
+            attrs = _attrs(xf[:tag_end])
+            attrs.update(fillId=str(self.fill_ids[status]), applyFill="1")
+            self.xf_ids[key] = self._index(self.xfs, self.new_xfs, f"<xf{_format_attrs(attrs)}{xf[tag_end:]}")
+        return str(self.xf_ids[key])
+
+    def patched_xml(self) -> str | None:
+        """``styles.xml`` with the new fills and styles, or ``None`` if nothing was added."""
+        if not self.new_xfs:
+            return None
+        xml = _append_items(self.xml, "fills", len(self.fills), self.new_fills)
+        return _append_items(xml, "cellXfs", len(self.xfs), self.new_xfs)
+
+
+def _append_items(xml: str, tag: str, existing: int, items: list) -> str:
+    """Append ``items`` to the ``<tag>`` list in ``xml`` and update its count."""
+    match = re.search(rf"<{tag}\b([^>]*)>(.*?)</{tag}>", xml, re.DOTALL)
+    attrs = _attrs(match.group(1))
+    attrs["count"] = str(existing + len(items))
+    replacement = f"<{tag}{_format_attrs(attrs)}>{match.group(2)}{''.join(items)}</{tag}>"
+    return xml[:match.start()] + replacement + xml[match.end():]
+
+
+def _patch_sheet(archive, part: str, patcher: _SheetPatcher, output):
+    """Stream ``part`` through ``patcher`` into the binary file ``output``, one block of rows at a time."""
+    with archive.open(part) as sheet:
+        buffer, in_rows = b"", False
+        while True:
+            chunk = sheet.read(READ_CHUNK_BYTES)
+            buffer += chunk
+            if not in_rows:
+                start = buffer.find(b"<sheetData")
+                if start == -1:
+                    if chunk:
+                        continue
+                    raise XlsxPatchError(f"{part} has no <sheetData>")
+                patcher.read_columns(buffer[:start].decode("utf-8"))
+                output.write(buffer[:start])
+                buffer, in_rows = buffer[start:], True
+            if not chunk:
+                output.write(patcher.patch_segment(buffer.decode("utf-8")).encode("utf-8"))
+                break
+            end = buffer.rfind(b"</row>")
+            if end != -1:
+                end += len(b"</row>")
+                output.write(patcher.patch_segment(buffer[:end].decode("utf-8")).encode("utf-8"))
+                buffer = buffer[end:]
+    if patcher.header is None:
+        raise XlsxPatchError(f"{part} has no header row")
+
+
+def _patch_shared_strings(xml: str, patcher: _SheetPatcher) -> str:
+    """Append the patcher's new strings to ``sharedStrings.xml`` and update its counts."""
+    if not patcher.string_refs:
+        return xml
+    match = re.search(r"<sst\b[^>]*>", xml)
+    if match is None or "</sst>" not in xml:
+        raise XlsxPatchError("sharedStrings.xml has an unexpected layout")
+    attrs = _attrs(match.group(0))
+    if "uniqueCount" in attrs:
+        attrs["uniqueCount"] = str(int(attrs["uniqueCount"]) + len(patcher.new_strings))
+    if "count" in attrs:
+        # Overwritten cells are still counted; Excel treats the total as a hint.
+        attrs["count"] = str(int(attrs["count"]) + patcher.string_refs)
+    items = []
+    for text in patcher.new_strings:
+        space = ' xml:space="preserve"' if text != text.strip() else ""
+        items.append(f"<si><t{space}>{escape(text)}</t></si>")
+    close = xml.rindex("</sst>")
+    return f"{xml[:match.start()]}<sst{_format_attrs(attrs)}>{xml[match.end():close]}{''.join(items)}{xml[close:]}"
+
+
+def patch_workbook(template_path, output_path, merger_factory, status_colors=None):
+    """
+    Copy ``template_path`` to ``output_path`` with results merged into its active sheet.
+
+    ``merger_factory(header)`` is called with the header row's values and
+    returns an object whose ``merge(rows)`` takes ``(row_num, values)`` pairs
+    and yields ``(row_num, values, updates, status)`` like
+    :meth:`excel_generator.TemplateMerger.merge`; ``updates`` maps column
+    indexes to new cell values. Rows whose ``status`` is in ``status_colors``
+    (status -> ARGB colour) get that solid fill on every cell up to the header
+    width. Rows without changes and every other part of the package are
+    copied unchanged. Returns the merger.
+
+    Raises:
+        XlsxPatchError: the template uses a layout the patcher does not handle
+    """
+    output_path = str(output_path)
+    tmp_output = f"{output_path}.tmp"
+    with zipfile.ZipFile(template_path) as archive:
+        names = archive.namelist()
+        sheet_part = active_sheet_part(archive)
+        styles = _StatusStyles(
+            archive.read(STYLES_PART).decode("utf-8") if STYLES_PART in names else None, status_colors or {}
+        )
+        patcher = _SheetPatcher(merger_factory, read_shared_strings(archive), SHARED_STRINGS_PART in names, styles)
+
+        with tempfile.TemporaryFile() as patched_sheet:
+            _patch_sheet(archive, sheet_part, patcher, patched_sheet)
+            styles_xml = styles.patched_xml()
+            try:
+                with zipfile.ZipFile(tmp_output, "w", zipfile.ZIP_DEFLATED) as out:
+                    for info in archive.infolist():
+                        if info.filename == sheet_part:
+                            patched_sheet.seek(0)
+                            with out.open(info, "w") as target:
+                                shutil.copyfileobj(patched_sheet, target)
+                        elif info.filename == SHARED_STRINGS_PART:
+                            out.writestr(info, _patch_shared_strings(archive.read(info).decode("utf-8"), patcher))
+                        elif info.filename == STYLES_PART and styles_xml is not None:
+                            out.writestr(info, styles_xml)
+                        else:
+                            with archive.open(info) as source, out.open(info, "w") as target:
+                                shutil.copyfileobj(source, target)
+            except BaseException:
+                Path(tmp_output).unlink(missing_ok=True)
+                raise
+    Path(tmp_output).replace(output_path)
+    return patcher.merger